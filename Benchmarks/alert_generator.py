@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+"""
+Генератор синтетических корпусов алертов АС Рефлекс для бенчмарков.
+
+Алерты повторяют форматы из TestAlerts/:
+- one_line   - однострочные алерты "ПРОМ | АС Рефлекс OPEN P-... | Уровень ..." (multiple_alerts.txt);
+- multi_line - многострочные алерты "АС Рефлекс / Stand: ПРОМ / RESOLVED | Problem Status:P-..." (sample_alert.txt);
+- mixed      - однострочные алерты, в которых проблемы сначала открываются, а затем закрываются (OPEN/RESOLVED);
+- noisy      - однострочные алерты с длинными URL с параметрами и мусорными пробелами.
+
+Корпус пишется в файл потоково, поэтому память не зависит от числа алертов (от 10 до 1 000 000).
+
+Запуск: python Benchmarks/alert_generator.py --count 10000 --format mixed --out /tmp/alerts.txt
+"""
+import os
+import sys
+import random
+import argparse
+from datetime import datetime, timedelta
+
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+FORMATS = ('one_line', 'multi_line', 'mixed', 'noisy')
+
+SERVICES = [
+    'CI02858346_cccore_общий_main_metric',
+    'CI05272529_skillflow_pod_failed',
+    'CI04534432_cccore_request_count_failed',
+    'CI02799551_ufs_session_master',
+    'CI03112233_operator_chats_latency',
+]
+
+LEVELS = ['CUSTOM_ALERT', 'ERROR', 'AVAILABILITY', 'PERFORMANCE']
+
+HTTP_CODES = ['500', '502', '503', '504', '404', '429']
+
+METHODS = ['POST', 'GET']
+
+# Пути запросов по умолчанию, если каталог эндпоинтов недоступен
+DEFAULT_PATHS = [
+    '/api/operator/v1/all_chats_status',
+    '/ufs-session-master-direct/rest/v3/inner/getSessionsMetadata',
+    '/paramsv2/5.0/configuration/get',
+]
+
+
+def load_endpoint_paths() -> list[str]:
+    """Пути запросов из каталога эндпоинтов, чтобы алерты ссылались на реальные API."""
+    try:
+        import json
+        with open(os.path.join(project_dir, 'Data/integration_endpoints.json'), 'r', encoding='utf-8') as f:
+            paths = [endpoint['request'] for endpoint in json.load(f) if endpoint.get('request')]
+        return paths or DEFAULT_PATHS
+    except (OSError, ValueError):
+        return DEFAULT_PATHS
+
+
+def _format_time(moment: datetime) -> str:
+    return f"{moment:%H:%M} (MSK) {moment:%d.%m.%Y}"
+
+
+def _reflex_url(rng: random.Random) -> str:
+    return (f"https://reflex-prom2.ca.sbrf.ru/e/c2be9ac2-9884-4120-973a-a7d485a8b497/"
+            f"#problems/problemdetails;pid={rng.getrandbits(60)}_{rng.getrandbits(40)}V2")
+
+
+def _noisy_url(rng: random.Random) -> str:
+    params = '&'.join(f"p{i}={rng.getrandbits(32):x}%20{rng.choice(SERVICES)}" for i in range(rng.randint(3, 8)))
+    return (f"https://console-openshift-console.apps.prom-terra{rng.randint(0, 999999):06d}-i39s.ocp.ca.sbrf.ru"
+            f"/k8s/cluster/projects/ci{rng.randint(0, 99999999):08d}-prom-cccore?{params}")
+
+
+def one_line_alert(rng: random.Random, problem_id: int, status: str, detected_at: datetime,
+                   path: str, noisy: bool = False) -> str:
+    """Однострочный алерт в формате multiple_alerts.txt."""
+    service = rng.choice(SERVICES)
+    level = rng.choice(LEVELS)
+    detected = _format_time(detected_at)
+    if status == 'RESOLVED':
+        detected += f" - {_format_time(detected_at + timedelta(minutes=rng.randint(1, 600)))}"
+    urls = ' '.join(_noisy_url(rng) for _ in range(rng.randint(2, 5))) if noisy else _noisy_url(rng).split('?')[0]
+    gap = '   ' if noisy else ' '
+    return (
+        f"ПРОМ | АС Рефлекс {status} P-{problem_id} | Уровень {level} {service} on Web request service default web request"
+        f" -----{gap}{service}: {status} Custom Alert P-{problem_id} in environment Sber PROM2"
+        f" Problem detected at: {detected} 1 impacted service Web request service default web request {service}"
+        f" The {rng.choice(SERVICES)} value was above normal behavior. CCCORE {urls}"
+        f" Request: Dimension={path} {rng.choice(HTTP_CODES)} {rng.choice(METHODS)} ,{gap}dt.entity.service.name=default web request,"
+        f" dt.entity.service=SERVICE-{rng.getrandbits(64):016X} Stand: default web request threshold: {rng.randint(1, 100)}"
+        f" Root cause Based on our dependency analysis all incidents are part of the same overall problem. {_reflex_url(rng)}"
+    )
+
+
+def multi_line_alert(rng: random.Random, problem_id: int, status: str, detected_at: datetime, path: str) -> str:
+    """Многострочный алерт в формате sample_alert.txt (с пустыми строками из пробела)."""
+    service = rng.choice(SERVICES)
+    level = rng.choice(LEVELS)
+    detected = _format_time(detected_at)
+    if status == 'RESOLVED':
+        detected += f" - {_format_time(detected_at + timedelta(minutes=rng.randint(1, 600)))} (was open for {rng.randint(1, 59)} min)"
+    lines = [
+        "АС Рефлекс", "", "Stand: ПРОМ", "",
+        f"{status} | Problem Status:P-{problem_id} | Уровень {level}", "",
+        f"{service} for Environment Sber PROM2", "", " ", "", "-----", "",
+        f"{service}: {status} Custom Alert P-{problem_id} in environment Sber PROM2", "",
+        f"Problem detected at: {detected}", "", " ", "",
+        "Environment impacted", "", " ", "",
+        f"Request: {path} HTTP error {rng.choice(HTTP_CODES)}", "",
+        f"threshold: {rng.randint(1, 100) / 10}", "", " ", "",
+        "Root cause", "", " ", "",
+        "Based on our dependency analysis all incidents are part of the same overall problem.", "", " ", "",
+        _reflex_url(rng), "", " ", "",
+    ]
+    return '\n'.join(lines)
+
+
+def iter_corpus(count: int, alert_format: str = 'one_line', seed: int = 42):
+    """
+    Выдает count синтетических алертов заданного формата.
+    Для формата mixed часть проблем повторяется: сначала OPEN, позже RESOLVED с тем же номером.
+    """
+    if alert_format not in FORMATS:
+        raise ValueError(f"Неизвестный формат корпуса: {alert_format}. Допустимые: {', '.join(FORMATS)}")
+
+    rng = random.Random(seed)
+    paths = load_endpoint_paths()
+    start = datetime(2025, 4, 10, 13, 47)
+    # Открытые проблемы формата mixed, которые будут закрыты позже
+    open_problems = []
+    for index in range(count):
+        problem_id = 250000000 + index
+        status = 'OPEN' if rng.random() < 0.5 else 'RESOLVED'
+        detected_at = start + timedelta(minutes=index)
+        path = rng.choice(paths)
+
+        if alert_format == 'mixed':
+            if open_problems and rng.random() < 0.4:
+                problem_id, detected_at, path = open_problems.pop(rng.randrange(len(open_problems)))
+                status = 'RESOLVED'
+            elif status == 'OPEN':
+                open_problems.append((problem_id, detected_at, path))
+
+        if alert_format == 'multi_line':
+            yield multi_line_alert(rng, problem_id, status, detected_at, path)
+        else:
+            yield one_line_alert(rng, problem_id, status, detected_at, path, noisy=alert_format == 'noisy')
+
+
+def write_corpus(file_path: str, count: int, alert_format: str = 'one_line', seed: int = 42) -> int:
+    """
+    Записывает корпус в файл потоково (UTF-8).
+
+    Returns:
+        int: Размер файла в байтах
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        for alert in iter_corpus(count, alert_format, seed):
+            f.write(alert)
+            f.write('\n')
+    return os.path.getsize(file_path)
+
+
+def main():
+    """
+    Основная функция скрипта
+    """
+    parser = argparse.ArgumentParser(description="Генератор синтетических алертов АС Рефлекс")
+    parser.add_argument('--count', type=int, default=1000, help="Количество алертов (10 - 1000000)")
+    parser.add_argument('--format', choices=FORMATS, default='one_line', help="Формат алертов")
+    parser.add_argument('--seed', type=int, default=42, help="Начальное значение генератора случайных чисел")
+    parser.add_argument('--out', required=True, help="Путь к выходному файлу")
+    args = parser.parse_args()
+
+    size = write_corpus(args.out, args.count, args.format, args.seed)
+    print(f"✅ Записано {args.count} алертов ({args.format}) в {args.out}: {size / 1024 / 1024:.1f} МБ")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
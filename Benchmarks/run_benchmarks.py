@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+"""
+Офлайн-бенчмарки обработки алертов (без обращений к модели).
+
+Для каждого размера корпуса генерируются синтетические алерты (Benchmarks/alert_generator.py)
+и замеряются:
+- split        - деление файла на алерты, как в analyze_file_alert (iter_alerts);
+- parse_group  - разбор алертов и группировка по номеру проблемы;
+- single       - analyze_single_alert без анализа бота;
+- one_line     - format_alert_to_one_line для многострочного корпуса;
+- endpoint     - find_endpoint_info по путям, словам описания и запросам с опечатками.
+
+Для каждого замера выводятся время, пропускная способность (элементов и МБ в секунду)
+и пиковое потребление памяти Python (tracemalloc). С --json результаты сохраняются
+в файл, с --baseline сравниваются с прошлым запуском, чтобы регрессии были видны.
+
+Запуск: python Benchmarks/run_benchmarks.py --sizes 10 1000 100000 --json Logs/bench.json
+"""
+import os
+import sys
+import gc
+import json
+import time
+import logging
+import argparse
+import tempfile
+import tracemalloc
+
+# Добавляем директорию проекта в пути поиска модулей
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_dir)
+
+from Benchmarks.alert_generator import write_corpus, load_endpoint_paths
+from Source.alert_reader import iter_alerts
+from Source.alert_parser import alert_parser
+from Source.alert_groups import group_alerts_by_problem
+from Source.alert_formatter import format_alert_to_one_line
+from Source.tools import analyze_single_alert, find_endpoint_info
+
+DEFAULT_SIZES = [10, 1000, 10000]
+
+# Ограничение числа алертов для analyze_single_alert и числа поисковых запросов,
+# чтобы прогон на миллионе алертов не занимал часы
+SINGLE_ALERT_LIMIT = 10000
+ENDPOINT_QUERY_LIMIT = 2000
+
+# Регрессия, если замер стал медленнее базового больше чем на эту долю.
+# Замеры короче MIN_COMPARABLE_SECONDS слишком шумные для сравнения
+REGRESSION_THRESHOLD = 0.2
+MIN_COMPARABLE_SECONDS = 0.05
+
+
+def measure(name, size, func, items=None, data_bytes=0):
+    """
+    Выполняет func дважды: сначала замеряет время, затем пиковое потребление
+    памяти Python (tracemalloc сам замедляет код, поэтому проходы раздельные).
+    func возвращает число обработанных элементов (если items не задан заранее).
+    """
+    gc.collect()
+    started = time.perf_counter()
+    processed = func()
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    items = processed if items is None else items
+    return {
+        'benchmark': name,
+        'size': size,
+        'items': items,
+        'seconds': elapsed,
+        'items_per_sec': items / elapsed if elapsed else 0.0,
+        'mb_per_sec': data_bytes / 1024 / 1024 / elapsed if elapsed and data_bytes else 0.0,
+        'peak_mb': peak / 1024 / 1024,
+    }
+
+
+def bench_split(file_path):
+    return sum(1 for _ in iter_alerts(file_path))
+
+
+def bench_parse_group(file_path):
+    groups = group_alerts_by_problem((alert_parser.parse(alert) for alert in iter_alerts(file_path)), keep_records=3)
+    return sum(group.fragment_count for group in groups)
+
+
+def bench_single(alerts):
+    for alert in alerts:
+        analyze_single_alert(alert, include_bot_analysis=False)
+    return len(alerts)
+
+
+def bench_one_line(input_path, output_path):
+    if not format_alert_to_one_line(input_path, output_path):
+        raise RuntimeError(f"format_alert_to_one_line не смог преобразовать {input_path}")
+    return 1
+
+
+def endpoint_queries(count):
+    """Запросы к каталогу: полные пути, последние сегменты пути и сегменты с опечаткой."""
+    queries = []
+    paths = load_endpoint_paths()
+    while len(queries) < count:
+        for path in paths:
+            segment = [part for part in path.split('/') if part][-1]
+            typo = segment[:-2] + segment[-1:] if len(segment) > 4 else segment + 'x'
+            queries.extend((path, segment, typo))
+    return queries[:count]
+
+
+def bench_endpoint(queries):
+    for query in queries:
+        find_endpoint_info(query)
+    return len(queries)
+
+
+def run_size(size, work_dir, alert_format):
+    """Все замеры для корпуса заданного размера."""
+    corpus_path = os.path.join(work_dir, f'alerts_{alert_format}_{size}.txt')
+    multi_line_path = os.path.join(work_dir, f'alerts_multi_line_{size}.txt')
+    one_line_path = os.path.join(work_dir, f'one_line_{size}.txt')
+
+    corpus_bytes = write_corpus(corpus_path, size, alert_format)
+    multi_line_bytes = write_corpus(multi_line_path, size, 'multi_line')
+
+    # Алерты для analyze_single_alert читаются заранее, чтобы не смешивать замер с чтением файла
+    single_alerts = []
+    for alert in iter_alerts(corpus_path):
+        single_alerts.append(alert)
+        if len(single_alerts) >= SINGLE_ALERT_LIMIT:
+            break
+    queries = endpoint_queries(min(size, ENDPOINT_QUERY_LIMIT))
+
+    results = [
+        measure('split', size, lambda: bench_split(corpus_path), data_bytes=corpus_bytes),
+        measure('parse_group', size, lambda: bench_parse_group(corpus_path), data_bytes=corpus_bytes),
+        measure('single', size, lambda: bench_single(single_alerts)),
+        measure('one_line', size, lambda: bench_one_line(multi_line_path, one_line_path),
+                items=size, data_bytes=multi_line_bytes),
+        measure('endpoint', size, lambda: bench_endpoint(queries)),
+    ]
+
+    for path in (corpus_path, multi_line_path, one_line_path):
+        if os.path.exists(path):
+            os.remove(path)
+    return results
+
+
+def print_results(results, baseline=None):
+    """Таблица результатов; при наличии базового прогона - изменение времени на элемент."""
+    baseline_index = {(row['benchmark'], row['size']): row for row in baseline or []}
+    print(f"\n{'Замер':<12} {'Размер':>8} {'Элементов':>10} {'Время, с':>10} {'Эл./с':>12} {'МБ/с':>8} {'Пик, МБ':>8}  Изменение")
+    print("-" * 90)
+    regressions = []
+    for row in results:
+        change = ""
+        base = baseline_index.get((row['benchmark'], row['size']))
+        if base and base['items_per_sec'] and row['items_per_sec']:
+            ratio = base['items_per_sec'] / row['items_per_sec'] - 1
+            change = f"{ratio:+.0%}"
+            if ratio > REGRESSION_THRESHOLD and base['seconds'] >= MIN_COMPARABLE_SECONDS:
+                change += " ⚠️"
+                regressions.append(row)
+        print(f"{row['benchmark']:<12} {row['size']:>8} {row['items']:>10} {row['seconds']:>10.3f} "
+              f"{row['items_per_sec']:>12.0f} {row['mb_per_sec']:>8.1f} {row['peak_mb']:>8.1f}  {change}")
+    return regressions
+
+
+def main():
+    """
+    Основная функция скрипта
+    """
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарки обработки алертов")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Размеры корпусов (число алертов, от 10 до 1000000)")
+    parser.add_argument('--format', default='mixed', help="Формат основного корпуса (см. alert_generator.py)")
+    parser.add_argument('--json', help="Сохранить результаты в JSON-файл")
+    parser.add_argument('--baseline', help="JSON-файл прошлого прогона для сравнения")
+    args = parser.parse_args()
+
+    # Логи инструментов на каждый алерт искажают замеры
+    logging.disable(logging.INFO)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='alert_bench_') as work_dir:
+        for size in args.sizes:
+            print(f"⏱ Корпус из {size} алертов ({args.format})...")
+            results.extend(run_size(size, work_dir, args.format))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    regressions = print_results(results, baseline)
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'created_at': time.strftime('%Y-%m-%d %H:%M:%S'), 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Результаты сохранены в {args.json}")
+
+    if regressions:
+        names = ', '.join(f"{row['benchmark']}@{row['size']}" for row in regressions)
+        print(f"\n❌ Замедление больше {REGRESSION_THRESHOLD:.0%}: {names}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
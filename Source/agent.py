@@ -1,30 +1,144 @@
 import os
-from rich.console import Console
-from rich.panel import Panel
-from rich.table import Table
-from langchain_gigachat.chat_models import GigaChat
-from langchain_core.messages import HumanMessage, AIMessage
-from dotenv import load_dotenv
-from langgraph.prebuilt import create_react_agent
-from langgraph.checkpoint.memory import MemorySaver
+import asyncio
+import threading
 from Source.prompts import system_prompt  # Импортируем наш системный промпт
-from Source.tools import get_data_alert, find_endpoint_info, analyze_file_alert
+from Source.utils import response_cache, metrics, settings, root_dir, llm_client
+from Source.llm_client import CircuitOpenError, model_options
 
 # Загрузка переменных окружения
 # load_dotenv('proj_v.00001/Config/demo_env.env')
 
+# Модель и агент создаются лениво при первом обращении: тяжелые импорты
+# LangChain/LangGraph и настройка клиента GigaChat не нужны скриптам,
+# которые используют только разбор алертов.
+_model = None
+_agent = None
+_init_lock = threading.RLock()
 
-# Инициализация модели GigaChat
-#model = GigaChat(
-    #credentials=os.getenv("GIGACHAT_API_CREDENTIALS"),
-    #scope=os.getenv("GIGACHAT_API_SCOPE"),
-    #model=GigaChat-Max,
-model = GigaChat(
-              model="GigaChat-2",
-              credentials ="ZTlkOGQxOTgtYTFlYy00MDkzLWEyNDUtNjlhYThkN2EzZDRkOjYyMmM1OTM2LTc5NDAtNGFkMC1hZDczLTMxMzEwOWNlZjQ1ZQ==",
-              scope="GIGACHAT_API_PERS",
-              verify_ssl_certs=False
-              )
+
+def _create_gigachat():
+    """
+    Создает клиент GigaChat.
+    """
+    from langchain_gigachat.chat_models import GigaChat
+    
+    # Инициализация модели GigaChat
+    #model = GigaChat(
+        #credentials=os.getenv("GIGACHAT_API_CREDENTIALS"),
+        #scope=os.getenv("GIGACHAT_API_SCOPE"),
+        #model=GigaChat-Max,
+    # Один клиент на процесс: соединения с API переиспользуются (keep-alive),
+    # размер пула, таймаут и адрес API задаются в разделе llm настроек
+    return GigaChat(
+                  credentials ="ZTlkOGQxOTgtYTFlYy00MDkzLWEyNDUtNjlhYThkN2EzZDRkOjYyMmM1OTM2LTc5NDAtNGFkMC1hZDczLTMxMzEwOWNlZjQ1ZQ==",
+                  scope="GIGACHAT_API_PERS",
+                  **model_options(settings.get("llm", {}))
+                  )
+
+
+def get_model():
+    """
+    Возвращает модель чата, создавая ее при первом вызове. По умолчанию это GigaChat;
+    для запусков без сети - запись/воспроизведение кассеты или модель-заглушка
+    (параметр backend раздела llm или переменная окружения LLM_BACKEND).
+    """
+    global _model
+    if _model is None:
+        with _init_lock:
+            if _model is None:
+                from Source.llm_backends import create_chat_model
+                _model = create_chat_model(settings.get("llm", {}), root_dir, _create_gigachat)
+    return _model
+
+
+def get_agent():
+    """
+    Возвращает ReAct-агента, создавая его (и модель) при первом вызове.
+    """
+    global _agent
+    if _agent is None:
+        with _init_lock:
+            if _agent is None:
+                from langgraph.prebuilt import create_react_agent
+                from Source.conversation import create_checkpointer, make_history_hook
+                from Source.alert_context import AlertContextState, last_alert
+                from Source.tools import get_agent_tools
+                
+                conversation_settings = settings.get("conversation", {})
+                _agent = create_react_agent(
+                    model=get_model(),
+                    tools=[*get_agent_tools(), last_alert],
+                    prompt=system_prompt,  # Подключаем системный контекст
+                    # В состоянии диалога хранятся и краткие сведения о последнем алерте
+                    state_schema=AlertContextState,
+                    # Старые ходы диалога заменяются кратким содержанием перед вызовом модели
+                    pre_model_hook=make_history_hook(
+                        max_turns=conversation_settings.get("max_turns", 12),
+                        keep_last_turns=conversation_settings.get("keep_last_turns", 8),
+                        summary_max_chars=conversation_settings.get("summary_max_chars", 2000),
+                    ),
+                    # Диалоги сохраняются в SQLite и переживают перезапуск (раздел conversation в настройках)
+                    checkpointer=create_checkpointer(conversation_settings, root_dir)
+                )
+    return _agent
+
+
+def __getattr__(name):
+    """
+    Совместимость со старым импортом `from Source.agent import agent, model`:
+    объекты создаются при первом обращении к атрибуту.
+    """
+    if name == "model":
+        return get_model()
+    if name == "agent":
+        return get_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Поля данных алерта, которые влияют на текст запроса к модели (см. _enhance_prompt)
+PROMPT_ALERT_FIELDS = ('status', 'http_code', 'service')
+
+# Ответ вместо анализа, пока API модели недоступен (выключатель разомкнут)
+UNAVAILABLE_MESSAGE = "Анализ ботом пропущен: API GigaChat временно недоступен."
+
+# Выполняющиеся асинхронные запросы по ключу кэша
+_pending_requests = {}
+
+
+def _cache_key(prompt: str, max_tokens: int, alert_data: dict = None) -> str:
+    """
+    Ключ кэша ответа: промпт и только те данные алерта, что попадают в запрос.
+    Время алерта в ключ не входит, поэтому повторы одного алерта совпадают.
+    """
+    prompt_data = {field: alert_data.get(field) for field in PROMPT_ALERT_FIELDS} if alert_data else None
+    return response_cache.make_key(prompt, prompt_data, max_tokens=max_tokens)
+
+
+def _enhance_prompt(prompt: str, alert_data: dict = None) -> str:
+    """
+    Дополняет промпт краткой информацией из структурированных данных алерта.
+    """
+    enhanced_prompt = prompt
+    
+    # Если предоставлены структурированные данные, дополняем запрос
+    if alert_data:
+        additional_context = "\n\nКраткая информация об алерте:\n"
+        
+        # Добавляем только самые важные технические детали
+        if alert_data.get('status'):
+            additional_context += f"- Статус: {alert_data['status']}\n"
+        
+        if alert_data.get('http_code'):
+            additional_context += f"- HTTP код: {alert_data['http_code']}\n"
+            
+        if alert_data.get('service'):
+            additional_context += f"- Сервис: {alert_data['service']}\n"
+            
+        # Упрощенный запрос на анализ
+        additional_context += "\nКратко опиши проблему и причину (не более 100 слов).\n"
+        
+        enhanced_prompt += additional_context
+    return enhanced_prompt
 
 
 def get_bot_response(prompt: str, max_tokens: int = 500, alert_data: dict = None) -> str:
@@ -40,40 +154,72 @@ def get_bot_response(prompt: str, max_tokens: int = 500, alert_data: dict = None
     Returns:
         Ответ бота с углубленным анализом
     """
-    try:
-        enhanced_prompt = prompt
+    with metrics.track("get_bot_response", kind="llm") as call:
+        # Одинаковые запросы (частые при шторме алертов) берем из кэша
+        cache_key = _cache_key(prompt, max_tokens, alert_data)
+        cached_response = response_cache.get(cache_key)
+        if cached_response is not None:
+            call["outcome"] = "cache_hit"
+            return cached_response
         
-        # Если предоставлены структурированные данные, дополняем запрос
-        if alert_data:
-            additional_context = "\n\nКраткая информация об алерте:\n"
-            
-            # Добавляем только самые важные технические детали
-            if alert_data.get('status'):
-                additional_context += f"- Статус: {alert_data['status']}\n"
-            
-            if alert_data.get('http_code'):
-                additional_context += f"- HTTP код: {alert_data['http_code']}\n"
-                
-            if alert_data.get('service'):
-                additional_context += f"- Сервис: {alert_data['service']}\n"
-                
-            # Упрощенный запрос на анализ
-            additional_context += "\nКратко опиши проблему и причину (не более 100 слов).\n"
+        try:
+            enhanced_prompt = _enhance_prompt(prompt, alert_data)
             
-            enhanced_prompt += additional_context
+            # Вызываем модель с расширенным промптом (с повторами при недоступности API)
+            from langchain_core.messages import HumanMessage
+            response = llm_client.call(get_model().invoke, [HumanMessage(content=enhanced_prompt)])
+            metrics.record_llm_response("get_bot_response", response)
+            response_cache.set(cache_key, response.content)
+            return response.content
+        except CircuitOpenError:
+            call["outcome"] = "circuit_open"
+            return UNAVAILABLE_MESSAGE
+        except Exception as e:
+            call["outcome"] = "error"
+            return f"Ошибка анализа: {str(e)}"
+
+
+async def aget_bot_response(prompt: str, max_tokens: int = 500, alert_data: dict = None) -> str:
+    """
+    Асинхронный вариант get_bot_response на основе model.ainvoke.
+    Позволяет выполнять несколько запросов к модели параллельно.
+    """
+    with metrics.track("aget_bot_response", kind="llm") as call:
+        cache_key = _cache_key(prompt, max_tokens, alert_data)
+        cached_response = response_cache.get(cache_key)
+        if cached_response is not None:
+            call["outcome"] = "cache_hit"
+            return cached_response
         
-        # Вызываем модель с расширенным промптом
-        response = model.invoke([HumanMessage(content=enhanced_prompt)])
-        return response.content
-    except Exception as e:
-        return f"Ошибка анализа: {str(e)}"
-
-
-agent = create_react_agent(
-    model=model,
-    tools=[get_data_alert, find_endpoint_info, analyze_file_alert],
-    state_modifier=system_prompt,  # Подключаем системный контекст
-    checkpointer=MemorySaver()  # Добавляем объект из библиотеки LangGraph для сохранения памяти агента
-)
+        # Такой же запрос уже выполняется - дожидаемся его ответа вместо повторного вызова модели
+        pending = _pending_requests.get(cache_key)
+        if pending is not None:
+            call["outcome"] = "coalesced"
+            return await asyncio.shield(pending)
+        
+        pending = asyncio.get_running_loop().create_future()
+        _pending_requests[cache_key] = pending
+        try:
+            try:
+                enhanced_prompt = _enhance_prompt(prompt, alert_data)
+                from langchain_core.messages import HumanMessage
+                response = await llm_client.acall(get_model().ainvoke, [HumanMessage(content=enhanced_prompt)])
+                metrics.record_llm_response("aget_bot_response", response)
+                response_cache.set(cache_key, response.content)
+                result = response.content
+            except CircuitOpenError:
+                call["outcome"] = "circuit_open"
+                result = UNAVAILABLE_MESSAGE
+            except Exception as e:
+                call["outcome"] = "error"
+                result = f"Ошибка анализа: {str(e)}"
+            pending.set_result(result)
+            return result
+        finally:
+            _pending_requests.pop(cache_key, None)
+            # Если запрос отменен, ожидающие его дубликаты тоже отменяются
+            if not pending.done():
+                pending.cancel()
+
 if __name__ == "__main__":
     chat('SberAX_consultant')
@@ -0,0 +1,105 @@
+"""Краткие сведения о последнем проанализированном алерте в состоянии диалога агента."""
+
+import os
+import logging
+from datetime import datetime
+from typing import Annotated, Optional
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langgraph.prebuilt import InjectedState
+from langgraph.prebuilt.chat_agent_executor import AgentState
+from typing_extensions import NotRequired
+
+logger = logging.getLogger('tool_logger')
+
+# Длина текста ошибки в кратких сведениях об алерте
+ERROR_MESSAGE_CHARS = 300
+
+
+class AlertContextState(AgentState):
+    """Состояние агента: сообщения диалога и краткие сведения о последнем проанализированном алерте."""
+    last_alert: NotRequired[dict]
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat(timespec='minutes') if value else None
+
+
+def summarize_alert_groups(file_path: str, groups: list, max_problems: int) -> dict:
+    """
+    Краткие сведения о файле алертов для состояния диалога по группам проблем,
+    уже разобранным при анализе файла: счетчики и ключевые поля первых max_problems
+    проблем. Текст алертов и отчет целиком не сохраняются.
+    """
+    status_counts = {}
+    for group in groups:
+        status_counts[group.latest_status] = status_counts.get(group.latest_status, 0) + 1
+
+    problems = []
+    for group in groups[:max_problems]:
+        record = group.latest_record
+        error_message = record.error_message
+        if error_message and len(error_message) > ERROR_MESSAGE_CHARS:
+            error_message = error_message[:ERROR_MESSAGE_CHARS - 1] + "…"
+        problems.append({
+            'problem_id': group.problem_id,
+            'status': group.latest_status,
+            'service': record.service,
+            'alert_type': record.alert_type,
+            'http_code': record.http_code,
+            'error_message': error_message,
+            'first_seen': _iso(group.first_seen),
+            'last_seen': _iso(group.last_seen),
+            'fragments': group.fragment_count,
+        })
+
+    return {
+        'file': os.path.basename(file_path),
+        'analyzed_at': datetime.now().isoformat(timespec='seconds'),
+        'alerts_count': sum(group.fragment_count for group in groups),
+        'problems_count': len(groups),
+        'status_counts': status_counts,
+        'problems': problems,
+    }
+
+
+def remember_alert(agent, config: dict, summary: dict) -> None:
+    """
+    Записывает сведения об алерте в состояние диалога без обращения к модели.
+    В историю добавляется только короткое сообщение, сами сведения доступны
+    через инструмент Last Alert.
+    """
+    note = (f"Проанализирован файл {summary['file']}: алертов {summary['alerts_count']}, "
+            f"проблем {summary['problems_count']}. Подробности - инструмент Last Alert.")
+    agent.update_state(config, {'last_alert': summary, 'messages': [AIMessage(content=note)]}, as_node="agent")
+    logger.info(f"Сведения об алерте из файла {summary['file']} записаны в состояние диалога")
+
+
+def render_alert_summary(summary: Optional[dict]) -> str:
+    """Текст кратких сведений об алерте для модели."""
+    if not summary:
+        return "В этом диалоге еще не анализировался ни один алерт."
+
+    statuses = ", ".join(f"{status}: {count}" for status, count in summary['status_counts'].items())
+    lines = [
+        f"Файл: {summary['file']} (анализ {summary['analyzed_at'].replace('T', ' ')})",
+        f"Алертов: {summary['alerts_count']}, проблем: {summary['problems_count']} ({statuses})",
+    ]
+    for i, problem in enumerate(summary['problems'], 1):
+        lines.append(f"\n{i}. {problem['problem_id'] or 'Без номера проблемы'} - {problem['status']}")
+        for label, key in (("Сервис", 'service'), ("Тип", 'alert_type'), ("HTTP код", 'http_code'),
+                           ("Ошибка", 'error_message'), ("Обнаружено", 'first_seen'), ("До", 'last_seen')):
+            if problem.get(key):
+                lines.append(f"   {label}: {problem[key]}")
+        if problem['fragments'] > 1:
+            lines.append(f"   Фрагментов: {problem['fragments']}")
+    if summary['problems_count'] > len(summary['problems']):
+        lines.append(f"\n...и еще {summary['problems_count'] - len(summary['problems'])} проблем")
+    return "\n".join(lines)
+
+
+@tool("Last Alert")
+def last_alert(state: Annotated[dict, InjectedState]) -> str:
+    """Возвращаю краткие сведения о последнем проанализированном в диалоге алерте: проблемы, статусы, сервисы, HTTP коды, время."""
+    return render_alert_summary(state.get('last_alert'))
@@ -0,0 +1,261 @@
+"""Режим слежения за файлом алертов: из дописанной части файла выдаются только новые завершенные алерты."""
+
+import os
+import json
+import mmap
+import time
+import logging
+import threading
+from typing import Iterator, Optional
+
+from Source.alert_reader import (
+    SNIFF_SIZE, alert_start_patterns, decode_alert_bytes, sniff_encoding, _code_unit_size,
+)
+
+# Логи слежения пишутся в общий лог инструментов
+logger = logging.getLogger('tool_logger')
+
+
+class FollowState:
+    """
+    Сохраняемые смещения файлов между запусками.
+
+    Для каждого файла (по абсолютному пути) хранится смещение в байтах,
+    до которого алерты уже выданы, а также устройство и inode файла,
+    по которым определяется ротация. Состояние записывается в JSON атомарно.
+    """
+
+    def __init__(self, state_path: Optional[str] = None):
+        self.state_path = state_path
+        self._files = {}
+        self._lock = threading.Lock()
+        if self.state_path:
+            self._load()
+
+    def get(self, file_path: str) -> Optional[dict]:
+        """Сохраненное состояние файла или None."""
+        with self._lock:
+            entry = self._files.get(os.path.abspath(file_path))
+            return dict(entry) if entry else None
+
+    def set(self, file_path: str, offset: int, device: int, inode: int) -> None:
+        """Запоминает смещение файла и сохраняет состояние на диск."""
+        with self._lock:
+            self._files[os.path.abspath(file_path)] = {'offset': offset, 'device': device, 'inode': inode}
+            if self.state_path:
+                self._save()
+
+    def _load(self) -> None:
+        """Загружает состояние из файла, если он есть."""
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self._files = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Не удалось загрузить состояние слежения из {self.state_path}: {str(e)}")
+
+    def _save(self) -> None:
+        """Атомарно записывает состояние в файл (через временный файл)."""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._files, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.error(f"Не удалось сохранить состояние слежения в {self.state_path}: {str(e)}")
+
+
+class AlertFollower:
+    """
+    Следит за файлом алертов, как tail -F, и выдает только новые завершенные алерты.
+
+    Алерт считается завершенным, когда после него в файле появилось начало
+    следующего алерта, либо когда файл не менялся idle_flush_seconds секунд.
+    Смещение сдвигается только за обработанные алерты (после того как потребитель
+    запросил следующий), поэтому недописанный алерт перечитывается на следующем
+    опросе, алерт, анализ которого прервали, выдается повторно после перезапуска,
+    а стоимость опроса не зависит от размера уже обработанной части файла.
+
+    Обрабатываются:
+    - усечение (размер файла стал меньше смещения) - чтение с начала файла;
+    - ротация (по пути появился новый файл) - остаток старого файла
+      дочитывается через открытый дескриптор, затем чтение нового с начала.
+
+    Кодировка (UTF-8, cp1251, UTF-16, UTF-32) определяется по началу файла, как в
+    iter_alerts; в UTF-16/32 границы алертов выравниваются по кодовым единицам.
+    """
+
+    def __init__(self, file_path: str, state: Optional[FollowState] = None,
+                 idle_flush_seconds: Optional[float] = 5.0, start_from_end: bool = False):
+        self.file_path = file_path
+        self.state = state or FollowState()
+        self.idle_flush_seconds = idle_flush_seconds
+        self.start_from_end = start_from_end
+        self._file = None
+        self._device = None
+        self._inode = None
+        # Кодировка и длина BOM определяются по началу файла, когда в нем появятся данные
+        self._encoding = None
+        self._bom_length = 0
+        self._encoding_known = False
+        self.offset = 0
+        # Размер файла при последнем опросе и время его последнего изменения
+        self._last_size = None
+        self._last_growth = time.monotonic()
+
+    def close(self) -> None:
+        """Закрывает файл."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _open(self, from_start: bool = False) -> bool:
+        """
+        Открывает файл по пути и восстанавливает смещение из состояния
+        (from_start - читать с начала, например после ротации). False, если файла нет.
+        """
+        try:
+            self._file = open(self.file_path, 'rb')
+        except FileNotFoundError:
+            return False
+        stat = os.fstat(self._file.fileno())
+        self._device, self._inode = stat.st_dev, stat.st_ino
+
+        saved = None if from_start else self.state.get(self.file_path)
+        if from_start:
+            self.offset = 0
+        elif saved and (saved['device'], saved['inode']) == (self._device, self._inode) and saved['offset'] <= stat.st_size:
+            self.offset = saved['offset']
+        elif saved:
+            logger.info(f"Файл {self.file_path} заменен или усечен с момента прошлого запуска, чтение с начала")
+            self.offset = 0
+        else:
+            self.offset = stat.st_size if self.start_from_end else 0
+        self._last_size = None
+        self._encoding_known = False
+        self._save_offset()
+        return True
+
+    def _save_offset(self) -> None:
+        self.state.set(self.file_path, self.offset, self._device, self._inode)
+
+    def _is_rotated(self) -> bool:
+        """По пути файла теперь другой файл (или файл удален)."""
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            return True
+        return (stat.st_dev, stat.st_ino) != (self._device, self._inode)
+
+    def _detect_encoding(self, size: int) -> None:
+        """Определяет кодировку по началу файла; смещение не может указывать внутрь BOM."""
+        if self._encoding_known or size == 0:
+            return
+        self._encoding, self._bom_length = sniff_encoding(os.pread(self._file.fileno(), SNIFF_SIZE, 0))
+        self._encoding_known = True
+        if self._encoding is not None:
+            logger.info(f"Кодировка файла {self.file_path}: {self._encoding}")
+        if self.offset < self._bom_length:
+            self.offset = self._bom_length
+
+    def _read_new_alerts(self, flush: bool) -> Iterator[str]:
+        """
+        Выдает завершенные алерты от текущего смещения до конца файла.
+        При flush последний (недописанный) алерт тоже считается завершенным.
+        """
+        size = os.fstat(self._file.fileno()).st_size
+        if size < self.offset:
+            logger.warning(f"Файл {self.file_path} усечен ({size} < {self.offset} байт), чтение с начала")
+            self.offset = 0
+            self._encoding_known = False
+            self._save_offset()
+        self._detect_encoding(size)
+
+        if size != self._last_size:
+            self._last_size = size
+            self._last_growth = time.monotonic()
+        elif not flush and self.idle_flush_seconds is not None:
+            flush = time.monotonic() - self._last_growth >= self.idle_flush_seconds
+
+        if size == self.offset:
+            return
+
+        # Границы ищутся по отображению файла в память, а фрагменты читаются обычным чтением,
+        # чтобы усечение файла во время обработки алерта не обращалось к уже не существующим страницам
+        with mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ) as mm:
+            unit = _code_unit_size(self._encoding)
+            boundaries = []
+            for pattern in alert_start_patterns(self._encoding):
+                boundaries = [match.start() for match in pattern.finditer(mm, self.offset, size)
+                              if (match.start() - self._bom_length) % unit == 0]
+                if boundaries:
+                    break
+            if flush:
+                # Недописанный символ в конце файла остается до следующего опроса
+                boundaries.append(size - (size - self._bom_length) % unit)
+            if not boundaries:
+                return
+            if boundaries[0] > self.offset and not decode_alert_bytes(mm[self.offset:boundaries[0]], self._encoding).strip():
+                # Перед первым алертом только пустые строки - пропускаем их
+                boundaries[0] = self.offset
+            elif boundaries[0] > self.offset:
+                # Текст без начала алерта (например, файл без стандартных заголовков) считаем отдельным алертом
+                boundaries.insert(0, self.offset)
+
+        for start, end in zip(boundaries, boundaries[1:]):
+            self._file.seek(start)
+            fragment = decode_alert_bytes(self._file.read(end - start), self._encoding).strip()
+            if fragment:
+                # Смещение сохраняется, когда потребитель вернулся за следующим алертом, то есть
+                # обработал этот: при остановке во время анализа алерт будет выдан повторно
+                yield fragment
+            self.offset = end
+            self._save_offset()
+
+    def poll(self) -> Iterator[str]:
+        """Один опрос файла: выдает новые завершенные алерты."""
+        if self._file is None and not self._open():
+            return
+        if self._is_rotated():
+            # Дочитываем старый файл до конца: после ротации он больше не дописывается
+            logger.info(f"Обнаружена ротация файла {self.file_path}")
+            yield from self._read_new_alerts(flush=True)
+            self.close()
+            if not self._open(from_start=True):
+                return
+        yield from self._read_new_alerts(flush=False)
+
+    def follow(self, poll_interval: float = 1.0, stop_event: Optional[threading.Event] = None) -> Iterator[str]:
+        """
+        Бесконечно опрашивает файл и выдает новые алерты, пока не установлен stop_event.
+        """
+        stop_event = stop_event or threading.Event()
+        logger.info(f"Начато слежение за файлом {self.file_path}")
+        try:
+            while not stop_event.is_set():
+                yield from self.poll()
+                stop_event.wait(poll_interval)
+        finally:
+            self.close()
+            logger.info(f"Слежение за файлом {self.file_path} завершено")
+
+
+def create_follower(file_path: str, follow_settings: dict, root_dir: str) -> AlertFollower:
+    """Создает AlertFollower по разделу follow из настроек. Относительный путь состояния считается от корня проекта."""
+    state_path = follow_settings.get("state_path")
+    if state_path and not os.path.isabs(state_path):
+        state_path = os.path.join(root_dir, state_path)
+    return AlertFollower(
+        file_path,
+        state=FollowState(state_path),
+        idle_flush_seconds=follow_settings.get("idle_flush_seconds", 5.0),
+        start_from_end=follow_settings.get("start_from_end", False),
+    )
@@ -1,24 +1,78 @@
 #!/usr/bin/env python
 """
 Скрипт для преобразования многострочного формата алерта в однострочный.
-Читает данные из TestAlerts/sample_alert.txt и записывает в TestAlerts/one_line_alert.txt
+Читает данные из TestAlerts/sample_alert.txt и записывает в TestAlerts/one_line_alert.txt.
+Файл с несколькими алертами делится по их границам: каждый алерт - отдельная строка.
+Также можно преобразовать все файлы каталога (--dir).
 """
 import os
+import sys
+import glob
 import logging
+import argparse
 from datetime import datetime
 
+# Общий загрузчик файлов алертов (определение кодировки по BOM, UTF-16, деление на алерты)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from Source.alert_reader import iter_alerts
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO,
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('alert_formatter')
 
+def normalize_whitespace(text: str) -> str:
+    """
+    Схлопывает любые последовательности пробельных символов (включая переводы строк)
+    в один пробел за один проход по тексту.
+    """
+    return ' '.join(text.split())
+
+def iter_one_line_alerts(input_file_path):
+    """
+    Генератор однострочных алертов из файла: алерты читаются по одному
+    на границах ПРОМ/PROM/DEV или "АС Рефлекс", пустые пропускаются.
+    """
+    for alert in iter_alerts(input_file_path):
+        one_line_alert = normalize_whitespace(alert)
+        if one_line_alert:
+            yield one_line_alert
+
+def convert_alert_file(input_file_path, output_file_path) -> int:
+    """
+    Потоково преобразует файл с алертами в однострочный формат: каждый алерт
+    записывается отдельной строкой сразу после чтения. Запись идет во временный
+    файл, который затем атомарно заменяет выходной.
+    
+    Returns:
+        int: Количество записанных алертов
+    """
+    output_dir = os.path.dirname(output_file_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    alerts_count = 0
+    tmp_path = f"{output_file_path}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as outfile:
+            for one_line_alert in iter_one_line_alerts(input_file_path):
+                if alerts_count:
+                    outfile.write('\n')
+                outfile.write(one_line_alert)
+                alerts_count += 1
+        os.replace(tmp_path, output_file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return alerts_count
+
 def format_alert_to_one_line(input_file_path, output_file_path):
     """
     Преобразует алерт из многострочного формата в однострочный
     
     Args:
-        input_file_path: Путь к входному файлу с многострочным алертом
-        output_file_path: Путь к выходному файлу для записи однострочного алерта
+        input_file_path: Путь к входному файлу с многострочным алертом (или несколькими алертами)
+        output_file_path: Путь к выходному файлу для записи однострочных алертов (по одному на строку)
     
     Returns:
         bool: True, если преобразование прошло успешно, иначе False
@@ -29,29 +83,8 @@ def format_alert_to_one_line(input_file_path, output_file_path):
             logger.error(f"Входной файл не найден: {input_file_path}")
             return False
         
-        # Читаем содержимое входного файла как список строк
-        with open(input_file_path, 'r', encoding='utf-8') as infile:
-            lines = infile.readlines()
-        
-        logger.info(f"Прочитано {len(lines)} строк из файла {input_file_path}")
-        
-        # Объединяем все строки в одну, заменяя переносы строк на пробелы
-        # Игнорируем пустые строки и строки, содержащие только пробельные символы
-        one_line_alert = ' '.join([line.strip() for line in lines if line.strip()])
-        
-        # Удаляем последовательности из нескольких пробелов
-        while '  ' in one_line_alert:
-            one_line_alert = one_line_alert.replace('  ', ' ')
-        
-        logger.info(f"Создан однострочный алерт длиной {len(one_line_alert)} символов")
-        
-        # Создаем директорию для выходного файла, если она не существует
-        os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
-        
-        # Записываем преобразованный алерт в выходной файл
-        with open(output_file_path, 'w', encoding='utf-8') as outfile:
-            outfile.write(one_line_alert)
-        
+        alerts_count = convert_alert_file(input_file_path, output_file_path)
+        logger.info(f"Преобразовано {alerts_count} алертов из файла {input_file_path}")
         logger.info(f"Преобразованный алерт успешно записан в файл {output_file_path}")
         logger.info(f"Размер выходного файла: {os.path.getsize(output_file_path)} байт")
         
@@ -61,6 +94,31 @@ def format_alert_to_one_line(input_file_path, output_file_path):
         logger.error(f"Ошибка при преобразовании алерта: {str(e)}", exc_info=True)
         return False
 
+def convert_directory(input_dir, output_dir, pattern='*.txt'):
+    """
+    Преобразует все файлы каталога, подходящие под шаблон, в однострочный формат.
+    Выходные файлы получают те же имена в output_dir.
+    
+    Returns:
+        dict: Путь входного файла -> количество алертов (None, если преобразование не удалось)
+    """
+    results = {}
+    for input_file_path in sorted(glob.glob(os.path.join(input_dir, pattern))):
+        if not os.path.isfile(input_file_path):
+            continue
+        output_file_path = os.path.join(output_dir, os.path.basename(input_file_path))
+        if os.path.abspath(output_file_path) == os.path.abspath(input_file_path):
+            logger.error(f"Выходной файл совпадает с входным, пропускаем: {input_file_path}")
+            results[input_file_path] = None
+            continue
+        try:
+            results[input_file_path] = convert_alert_file(input_file_path, output_file_path)
+        except Exception as e:
+            logger.error(f"Ошибка при преобразовании файла {input_file_path}: {str(e)}", exc_info=True)
+            results[input_file_path] = None
+    logger.info(f"Преобразовано файлов: {sum(1 for count in results.values() if count is not None)} из {len(results)}")
+    return results
+
 def main():
     """
     Основная функция скрипта
@@ -68,9 +126,30 @@ def main():
     # Определяем путь к директории проекта
     project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
     
-    # Формируем пути к файлам
-    input_file_path = os.path.join(project_dir, 'TestAlerts/sample_alert.txt')
-    output_file_path = os.path.join(project_dir, 'TestAlerts/one_line_alert.txt')
+    parser = argparse.ArgumentParser(description="Преобразование многострочных алертов в однострочный формат")
+    parser.add_argument('--input', default=os.path.join(project_dir, 'TestAlerts/sample_alert.txt'),
+                        help="Входной файл с алертами")
+    parser.add_argument('--output', default=os.path.join(project_dir, 'TestAlerts/one_line_alert.txt'),
+                        help="Выходной файл")
+    parser.add_argument('--dir', help="Преобразовать все файлы каталога (вместо --input)")
+    parser.add_argument('--out-dir', help="Каталог для результатов преобразования каталога")
+    parser.add_argument('--pattern', default='*.txt', help="Шаблон имен файлов каталога")
+    args = parser.parse_args()
+    
+    if args.dir:
+        out_dir = args.out_dir or os.path.join(args.dir, 'one_line')
+        print(f"Исходный каталог: {args.dir}")
+        print(f"Целевой каталог: {out_dir}")
+        results = convert_directory(args.dir, out_dir, args.pattern)
+        for input_file_path, alerts_count in results.items():
+            if alerts_count is None:
+                print(f"❌ {os.path.basename(input_file_path)}: не удалось преобразовать")
+            else:
+                print(f"✅ {os.path.basename(input_file_path)}: {alerts_count} алертов")
+        return
+    
+    input_file_path = args.input
+    output_file_path = args.output
     
     print(f"Исходный файл: {input_file_path}")
     print(f"Целевой файл: {output_file_path}")
@@ -85,7 +164,7 @@ def main():
         try:
             with open(output_file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
-                print("\nСодержимое файла one_line_alert.txt:")
+                print(f"\nСодержимое файла {os.path.basename(output_file_path)}:")
                 print(f"{content[:100]}..." if len(content) > 100 else content)
         except Exception as e:
             print(f"Ошибка при чтении файла: {str(e)}")
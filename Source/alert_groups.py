@@ -0,0 +1,65 @@
+"""Группировка фрагментов алертов по номеру проблемы (P-...)."""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional
+
+from Source.alert_parser import AlertRecord
+
+
+@dataclass
+class ProblemGroup:
+    """
+    Состояние одной проблемы по всем ее фрагментам в файле.
+
+    latest_status и latest_record относятся к последнему по порядку фрагменту
+    (например, RESOLVED после OPEN). first_seen/last_seen - крайние времена
+    обнаружения и окончания проблемы по всем фрагментам. first_index - номер
+    первого фрагмента в файле, position - порядковый номер группы.
+    """
+    problem_id: Optional[str]
+    first_index: int
+    position: int = 0
+    latest_status: str = "UNKNOWN"
+    fragment_count: int = 0
+    first_seen: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
+    latest_record: Optional[AlertRecord] = None
+
+    def add(self, record: AlertRecord, keep_record: bool = True) -> None:
+        """Учитывает очередной фрагмент проблемы."""
+        self.fragment_count += 1
+        self.latest_status = record.status
+        if keep_record:
+            self.latest_record = record
+        for moment in (record.detected_at, record.detected_until):
+            if moment is None:
+                continue
+            if self.first_seen is None or moment < self.first_seen:
+                self.first_seen = moment
+            if self.last_seen is None or moment > self.last_seen:
+                self.last_seen = moment
+
+
+def group_alerts_by_problem(records: Iterable[AlertRecord], keep_records: Optional[int] = None) -> list[ProblemGroup]:
+    """
+    Группирует разобранные алерты по номеру проблемы в порядке первого появления.
+    Алерты без номера проблемы образуют отдельные группы.
+
+    Args:
+        records: Разобранные алерты в порядке файла
+        keep_records: Для скольких первых групп хранить последний фрагмент целиком
+            (None - для всех). Остальные группы хранят только счетчики.
+
+    Returns:
+        Список групп в порядке первого появления проблемы
+    """
+    groups = {}
+    for index, record in enumerate(records):
+        key = record.problem_id if record.problem_id is not None else ('no-id', index)
+        group = groups.get(key)
+        if group is None:
+            group = ProblemGroup(problem_id=record.problem_id, first_index=index, position=len(groups))
+            groups[key] = group
+        group.add(record, keep_record=keep_records is None or group.position < keep_records)
+    return list(groups.values())
@@ -0,0 +1,345 @@
+"""История разобранных алертов в локальной базе SQLite с индексами для агрегатных запросов."""
+
+import os
+import re
+import sqlite3
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional
+
+logger = logging.getLogger('tool_logger')
+
+# Поля, по которым можно группировать результаты запроса, и соответствующие выражения SQL
+GROUP_BY_COLUMNS = {
+    'service': 'service_key',
+    'status': 'status',
+    'http_code': 'http_code',
+    'problem_id': 'problem_id',
+    'alert_type': 'alert_type',
+    'day': 'substr(detected_at, 1, 10)',
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY,
+    alert_hash TEXT NOT NULL UNIQUE,
+    problem_id TEXT,
+    status TEXT NOT NULL,
+    service TEXT,
+    service_key TEXT,
+    alert_type TEXT,
+    http_code TEXT,
+    detected_at TEXT,
+    detected_until TEXT,
+    error_message TEXT,
+    source TEXT,
+    recorded_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS alert_service_tokens (
+    token TEXT NOT NULL,
+    alert_id INTEGER NOT NULL,
+    PRIMARY KEY (token, alert_id)
+) WITHOUT ROWID;
+"""
+
+# Индексы создаются после добавления новых столбцов в базу прежней версии
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_alerts_problem_id ON alerts(problem_id);
+CREATE INDEX IF NOT EXISTS idx_alerts_status ON alerts(status);
+DROP INDEX IF EXISTS idx_alerts_service;
+DROP INDEX IF EXISTS idx_alerts_service_lc;
+CREATE INDEX IF NOT EXISTS idx_alerts_service_key ON alerts(service_key);
+CREATE INDEX IF NOT EXISTS idx_alerts_http_code ON alerts(http_code);
+CREATE INDEX IF NOT EXISTS idx_alerts_detected_at ON alerts(detected_at);
+"""
+
+# Столбцы, которых нет в базах прежних версий
+_ADDED_COLUMNS = {'service_key': 'TEXT'}
+
+_INSERT = """
+INSERT OR IGNORE INTO alerts (alert_hash, problem_id, status, service, service_key, alert_type,
+                              http_code, detected_at, detected_until, error_message, source, recorded_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Токены ключа сервиса привязываются к алерту по его хэшу (повторная вставка игнорируется)
+_INSERT_TOKEN = """
+INSERT OR IGNORE INTO alert_service_tokens (token, alert_id)
+SELECT ?, id FROM alerts WHERE alert_hash = ?
+"""
+
+# Ключ сервиса делится на токены по всему, кроме букв и цифр: "CI05272529_skillflow_pod_failed"
+_TOKEN_SEPARATORS_RE = re.compile(r'[\W_]+')
+
+# Период запроса: 24h, 7d, 2w
+_PERIOD_RE = re.compile(r'^(\d+)([hdw])$')
+_PERIOD_UNITS = {'h': 'hours', 'd': 'days', 'w': 'weeks'}
+
+# Символ больше любого другого: верхняя граница диапазона строк с заданным началом
+_MAX_CHAR = '\U0010ffff'
+
+
+def alert_hash(text: str) -> str:
+    """Хэш текста алерта: повторный анализ того же алерта не создает дубликат в истории."""
+    return hashlib.sha1(' '.join(text.split()).encode('utf-8')).hexdigest()
+
+
+def service_tokens(service_key: Optional[str]) -> list[str]:
+    """Токены ключа сервиса в нижнем регистре без повторов."""
+    if not service_key:
+        return []
+    return list(dict.fromkeys(token for token in _TOKEN_SEPARATORS_RE.split(service_key.lower()) if token))
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat(timespec='seconds') if isinstance(value, datetime) else value
+
+
+class AlertHistory:
+    """
+    Хранилище истории алертов в SQLite (режим WAL).
+
+    Соединение открывается при первом обращении. Записи добавляются пакетами
+    в одной транзакции; повтор алерта с тем же текстом игнорируется.
+    Индексы по номеру проблемы, статусу, ключу сервиса, HTTP-коду и времени
+    обнаружения, а также таблица токенов ключа сервиса позволяют отвечать
+    на агрегатные вопросы без полного перебора.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 500, enabled: bool = True):
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.enabled = enabled and bool(db_path)
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            if self.db_path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(alerts)")}
+            for column, column_type in _ADDED_COLUMNS.items():
+                if column not in columns:
+                    # Алерты, сохраненные до появления столбца, в фильтр по сервису не попадают
+                    connection.execute(f"ALTER TABLE alerts ADD COLUMN {column} {column_type}")
+            connection.executescript(_INDEXES)
+            self._connection = connection
+        return self._connection
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _insert_rows(self, rows: list[tuple]) -> int:
+        """Вставляет строки и токены их ключей сервиса одной транзакцией, возвращает число новых записей."""
+        if not rows:
+            return 0
+        tokens = [(token, row[0]) for row in rows for token in service_tokens(row[4])]
+        with self._lock:
+            connection = self._connect()
+            before = connection.total_changes
+            with connection:
+                connection.executemany(_INSERT, rows)
+                inserted = connection.total_changes - before
+                connection.executemany(_INSERT_TOKEN, tokens)
+            return inserted
+
+    @staticmethod
+    def _row(data: dict, source: Optional[str], recorded_at: str) -> tuple:
+        return (
+            data['alert_hash'], data.get('problem_id'), data.get('status') or 'UNKNOWN',
+            data.get('service'), data.get('service_key'), data.get('alert_type'),
+            data.get('http_code'), _iso(data.get('detected_at')), _iso(data.get('detected_until')),
+            data.get('error_message'), source, recorded_at,
+        )
+
+    def add_records(self, records: Iterable, source: Optional[str] = None) -> int:
+        """
+        Сохраняет разобранные алерты (AlertRecord) пакетами по batch_size.
+
+        Returns:
+            int: Количество новых записей
+        """
+        return self.add_dicts((
+            {
+                'alert_hash': alert_hash(record.text),
+                'problem_id': record.problem_id, 'status': record.status, 'service': record.service,
+                'service_key': record.service_key,
+                'alert_type': record.alert_type, 'http_code': record.http_code,
+                'detected_at': record.detected_at, 'detected_until': record.detected_until,
+                'error_message': record.error_message,
+            }
+            for record in records
+        ), source)
+
+    def add_dicts(self, records: Iterable[dict], source: Optional[str] = None) -> int:
+        """Сохраняет алерты в виде словарей (как записи пакетного анализа, с полем alert_hash)."""
+        if not self.enabled:
+            return 0
+        recorded_at = datetime.now().isoformat(timespec='seconds')
+        inserted = 0
+        rows = []
+        for data in records:
+            rows.append(self._row(data, data.get('file', source) if source is None else source, recorded_at))
+            if len(rows) >= self.batch_size:
+                inserted += self._insert_rows(rows)
+                rows = []
+        return inserted + self._insert_rows(rows)
+
+    def record_stream(self, records: Iterable, source: Optional[str] = None) -> Iterator:
+        """
+        Пропускает поток разобранных алертов дальше без изменений, по пути сохраняя
+        их в историю пакетами по batch_size. Остаток сохраняется по окончании потока.
+        """
+        batch = []
+        try:
+            for record in records:
+                if self.enabled:
+                    batch.append(record)
+                    if len(batch) >= self.batch_size:
+                        self.save(batch, source)
+                        batch = []
+                yield record
+        finally:
+            self.save(batch, source)
+
+    def save(self, records: list, source: Optional[str] = None) -> None:
+        """Сохраняет разобранные алерты; ошибка записи истории не прерывает анализ, а только логируется."""
+        if not records:
+            return
+        try:
+            self.add_records(records, source)
+        except sqlite3.Error as e:
+            logger.error(f"Не удалось сохранить {len(records)} алертов в историю {self.db_path}: {str(e)}")
+
+    def query(self, service: Optional[str] = None, status: Optional[str] = None,
+              http_code: Optional[str] = None, problem_id: Optional[str] = None,
+              since: Optional[datetime] = None, until: Optional[datetime] = None,
+              group_by: Optional[str] = None, limit: int = 10) -> dict:
+        """
+        Агрегатный запрос к истории.
+
+        Args:
+            service: Имя сервиса или его части (без учета регистра): каждое слово запроса
+                должно быть началом одного из токенов ключа сервиса ("skillflow" находит
+                "skillflow-smartapp" и "CI05272529_skillflow_pod_failed")
+            status, http_code, problem_id: Точные значения полей
+            since, until: Границы времени обнаружения
+            group_by: Поле группировки (см. GROUP_BY_COLUMNS)
+            limit: Сколько групп вернуть
+
+        Returns:
+            dict: total, by_status, first_detected, last_detected, groups [(значение, количество)]
+        """
+        conditions, params = [], []
+        if service:
+            # Каждое слово ищется диапазоном по первичному ключу таблицы токенов
+            for token in service_tokens(service):
+                conditions.append("id IN (SELECT alert_id FROM alert_service_tokens WHERE token >= ? AND token < ?)")
+                params.extend((token, token + _MAX_CHAR))
+        for column, value in (('status', status.upper() if status else None),
+                              ('http_code', http_code), ('problem_id', problem_id)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            conditions.append("detected_at >= ?")
+            params.append(_iso(since))
+        if until:
+            conditions.append("detected_at < ?")
+            params.append(_iso(until))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self._lock:
+            connection = self._connect()
+            by_status = dict(connection.execute(
+                f"SELECT status, COUNT(*) FROM alerts {where} GROUP BY status", params).fetchall())
+            first_detected, last_detected = connection.execute(
+                f"SELECT MIN(detected_at), MAX(detected_at) FROM alerts {where}", params).fetchone()
+            groups = []
+            if group_by:
+                expression = GROUP_BY_COLUMNS[group_by]
+                groups = connection.execute(
+                    f"SELECT {expression} AS value, COUNT(*) AS alerts_count FROM alerts {where} "
+                    f"GROUP BY value ORDER BY alerts_count DESC, value LIMIT ?", params + [limit]).fetchall()
+        return {
+            'total': sum(by_status.values()),
+            'by_status': by_status,
+            'first_detected': first_detected,
+            'last_detected': last_detected,
+            'groups': groups,
+        }
+
+
+def parse_history_query(query: str, now: Optional[datetime] = None) -> dict:
+    """
+    Разбирает запрос инструмента истории вида
+    "service=skillflow period=7d status=OPEN group_by=http_code".
+
+    Поддерживаемые ключи: service, status, http_code (или code), problem_id (или problem),
+    period (24h, 7d, 2w, all), since и until (ДД.ММ.ГГГГ или ГГГГ-ММ-ДД), group_by, limit.
+    Слова без ключа считаются именем сервиса (см. AlertHistory.query).
+    """
+    now = now or datetime.now()
+    params = {}
+    free_words = []
+    for token in re.split(r'[\s,;]+', query.strip()):
+        if not token:
+            continue
+        key, separator, value = token.partition('=')
+        if not separator:
+            free_words.append(token)
+            continue
+        key = key.lower()
+        if key in ('service', 'status', 'group_by'):
+            params[key] = value
+        elif key in ('http_code', 'code'):
+            params['http_code'] = value
+        elif key in ('problem_id', 'problem'):
+            params['problem_id'] = value if value.upper().startswith('P-') else f"P-{value}"
+        elif key == 'period':
+            match = _PERIOD_RE.match(value.lower())
+            if match:
+                params['since'] = now - timedelta(**{_PERIOD_UNITS[match.group(2)]: int(match.group(1))})
+            elif value.lower() != 'all':
+                raise ValueError(f"Неизвестный период: {value}. Примеры: 24h, 7d, 2w, all")
+        elif key in ('since', 'until'):
+            params[key] = _parse_date(value)
+        elif key == 'limit':
+            params['limit'] = int(value)
+        else:
+            raise ValueError(f"Неизвестный параметр запроса: {key}")
+    if free_words and 'service' not in params:
+        params['service'] = ' '.join(free_words)
+    if params.get('group_by') and params['group_by'] not in GROUP_BY_COLUMNS:
+        raise ValueError(f"Группировка возможна по полям: {', '.join(GROUP_BY_COLUMNS)}")
+    return params
+
+
+def _parse_date(value: str) -> datetime:
+    for date_format in ('%d.%m.%Y', '%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M'):
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    raise ValueError(f"Неверный формат даты: {value}. Используйте ДД.ММ.ГГГГ или ГГГГ-ММ-ДД")
+
+
+def create_alert_history(history_settings: dict, root_dir: str) -> AlertHistory:
+    """Создает хранилище истории по разделу history из настроек. Относительный путь считается от корня проекта."""
+    db_path = history_settings.get("db_path")
+    if db_path and db_path != ':memory:' and not os.path.isabs(db_path):
+        db_path = os.path.join(root_dir, db_path)
+    return AlertHistory(
+        db_path,
+        batch_size=history_settings.get("batch_size", 500),
+        enabled=history_settings.get("enabled", True),
+    )
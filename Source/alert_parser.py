@@ -0,0 +1,264 @@
+"""Однопроходный разбор текста алерта на структурированные поля."""
+
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+# Регулярные выражения компилируются один раз при импорте модуля.
+# Регистронезависимые поля ищутся по копии текста в нижнем регистре, а шаблоны
+# начинаются с литерала: так re пропускает текст быстрым поиском по префиксу,
+# вместо того чтобы пробовать шаблон в каждой позиции (как с re.IGNORECASE
+# или шаблоном, начинающимся с \d).
+SERVICE_RE = re.compile(r'(?:ПРОМ|PROM|DEV) \| ([^|]+)')
+ALERT_TYPE_RE = re.compile(r'\| ([^|]+) \|')
+HTTP_CODE_RE = re.compile(r'http (?:error )?(\d{3})')
+POST_RE = re.compile(r' post')
+TIMESTAMP_TAIL_RE = re.compile(r'\.\d{4} \d{2}:\d{2}:\d{2}')
+OPEN_STATUS_RE = re.compile(r'open|active')
+RESOLVED_STATUS_RE = re.compile(r'resolved|closed')
+ERROR_MESSAGE_RE = re.compile(r'error message: (.*?)(?:\n|$)')
+# Номер проблемы - отдельное слово: "HTTP-500" или "APP-123" номером проблемы не считаются
+PROBLEM_ID_RE = re.compile(r'\bP-(\d+)\b')
+# Предмет алерта - текст после уровня ("Уровень CUSTOM_ALERT ...") до разделителя "-----".
+# Ключ сервиса в нем: имя CI ("CI05272529_skillflow_pod_failed"), рабочая нагрузка
+# Kubernetes ("workload uwptextapp"), процесс ("on Process envoy skillflow-smartapp-*")
+# или первое слово-идентификатор ("uwptextapp_memory_issues on Web request ...")
+SUBJECT_LEVEL_RE = re.compile(r'(?:Уровень|Level) \w+')
+SUBJECT_END = '-----'
+SUBJECT_MAX_CHARS = 300
+SERVICE_KEY_PATTERNS = (
+    re.compile(r'CI\d+_\w+'),
+    re.compile(r'workload ([\w.-]+)'),
+    re.compile(r'on (?:Process|Host) (?:[\w.-]+ )?([\w.-]+)'),
+    re.compile(r'^([\w.]+[_-][\w.-]+)'),
+)
+DETECTED_AT_RE = re.compile(
+    r'Problem detected at:\s*(\d{1,2}:\d{2})\s*(?:\([^)]*\))?\s*(\d{2}\.\d{2}\.\d{4})'
+    r'(?:\s*-\s*(\d{1,2}:\d{2})\s*(?:\([^)]*\))?\s*(\d{2}\.\d{2}\.\d{4}))?'
+)
+
+# Статус проблемы в заголовке перед ее номером:
+# "OPEN P-...", "RESOLVED Custom Alert P-...", "RESOLVED Problem P-...", "RESOLVED | Problem Status:P-..."
+_PROBLEM_STATUS_BEFORE_ID_RE = re.compile(
+    r'\b(OPEN|ACTIVE|RESOLVED|CLOSED)\b[ |]*(?:Custom Alert |Problem (?:Status:)?)?$'
+)
+_PROBLEM_STATUS_WINDOW = 40
+_PROBLEM_STATUS_NORMALIZED = {"OPEN": "OPEN", "ACTIVE": "OPEN", "RESOLVED": "RESOLVED", "CLOSED": "RESOLVED"}
+
+_DIGITS3_RE = re.compile(r'\d{3}')
+_DATE_HEAD_RE = re.compile(r'\d{2}\.\d{2}')
+
+# Варианты для текста, длина которого меняется при lower() (например, «İ»)
+_CASE_INSENSITIVE_FALLBACK = {
+    pattern: re.compile(pattern.pattern, re.IGNORECASE)
+    for pattern in (HTTP_CODE_RE, POST_RE, OPEN_STATUS_RE, RESOLVED_STATUS_RE, ERROR_MESSAGE_RE)
+}
+
+# Цветовые индикаторы и статус-метки в зависимости от статуса
+STATUS_INFO = {
+    "OPEN": {
+        "icon": "🔴",
+        "badge": "🚨 ОТКРЫТ",
+        "color": "**",
+        "border": "─────────────────────────────────────────────────"
+    },
+    "ACTIVE": {
+        "icon": "🔴",
+        "badge": "⚡ АКТИВЕН",
+        "color": "**",
+        "border": "─────────────────────────────────────────────────"
+    },
+    "RESOLVED": {
+        "icon": "🟢",
+        "badge": "✅ РЕШЕН",
+        "color": "**",
+        "border": "─────────────────────────────────────────────────"
+    },
+    "CLOSED": {
+        "icon": "🟢",
+        "badge": "✅ ЗАКРЫТ",
+        "color": "**",
+        "border": "─────────────────────────────────────────────────"
+    },
+    "UNKNOWN": {
+        "icon": "⚪",
+        "badge": "❓ НЕИЗВЕСТЕН",
+        "color": "**",
+        "border": "─────────────────────────────────────────────────"
+    }
+}
+
+# HTTP коды и их значение
+HTTP_CODE_INFO = {
+    "200": {"icon": "✅", "text": "OK"},
+    "400": {"icon": "⚠️", "text": "Некорректный запрос"},
+    "401": {"icon": "🔒", "text": "Неавторизован"},
+    "403": {"icon": "🚫", "text": "Запрещено"},
+    "404": {"icon": "🔍", "text": "Не найдено"},
+    "500": {"icon": "💥", "text": "Внутренняя ошибка сервера"},
+    "502": {"icon": "🔄", "text": "Ошибка шлюза"},
+    "503": {"icon": "🛑", "text": "Сервис недоступен"},
+    "504": {"icon": "⏱️", "text": "Таймаут шлюза"}
+}
+
+
+@dataclass(frozen=True, slots=True)
+class AlertRecord:
+    """Структурированные данные одного алерта. Отсутствующие поля равны None."""
+    text: str
+    status: str = "UNKNOWN"
+    service: Optional[str] = None
+    alert_type: Optional[str] = None
+    http_code: Optional[str] = None
+    timestamp: Optional[str] = None
+    error_message: Optional[str] = None
+    problem_id: Optional[str] = None
+    detected_at: Optional[datetime] = None
+    detected_until: Optional[datetime] = None
+    service_key: Optional[str] = None
+
+
+class AlertParser:
+    """
+    Извлекает все поля алерта из текста и возвращает AlertRecord.
+
+    Для каждого поля берется первое совпадение в тексте. Статус берется из
+    заголовка проблемы (например, "RESOLVED Problem P-..."), а если его нет -
+    OPEN/ACTIVE в любом месте текста имеет приоритет над RESOLVED/CLOSED.
+    """
+
+    def parse(self, alert_text: str) -> AlertRecord:
+        """Разбирает текст алерта и возвращает AlertRecord."""
+        lowered = alert_text.lower()
+        if len(lowered) == len(alert_text):
+            search = lambda pattern, pos=0: pattern.search(lowered, pos)
+            match_at = lambda pattern, pos: pattern.match(lowered, pos)
+        else:
+            # Позиции в копии не совпадают с исходным текстом - ищем без учета регистра
+            search = lambda pattern, pos=0: _CASE_INSENSITIVE_FALLBACK[pattern].search(alert_text, pos)
+            match_at = lambda pattern, pos: pattern.match(alert_text, pos)
+
+        service_match = SERVICE_RE.search(alert_text)
+        alert_type_match = ALERT_TYPE_RE.search(alert_text)
+
+        problem_id, status = self._find_problem(alert_text)
+        if status is None:
+            # Статус в заголовке не найден: RESOLVED/CLOSED ищем только если нет OPEN/ACTIVE.
+            # Слово "open" встречается и в "was open for" закрытых проблем, поэтому это запасной вариант.
+            status = "UNKNOWN"
+            if search(OPEN_STATUS_RE):
+                status = "OPEN"
+            elif search(RESOLVED_STATUS_RE):
+                status = "RESOLVED"
+
+        detected_at, detected_until = self._find_detection_period(alert_text)
+
+        error_match = search(ERROR_MESSAGE_RE)
+
+        return AlertRecord(
+            text=alert_text,
+            status=status,
+            service=service_match.group(1).strip() if service_match else None,
+            alert_type=alert_type_match.group(1).strip() if alert_type_match else None,
+            http_code=self._find_http_code(search, match_at),
+            timestamp=self._find_timestamp(alert_text),
+            error_message=alert_text[error_match.start(1):error_match.end(1)].strip() if error_match else None,
+            problem_id=problem_id,
+            detected_at=detected_at,
+            detected_until=detected_until,
+            service_key=self._find_service_key(alert_text),
+        )
+
+    @staticmethod
+    def _find_problem(alert_text: str) -> tuple[Optional[str], Optional[str]]:
+        """
+        Возвращает номер проблемы (P-...) и ее статус из заголовка.
+        Статус ищется в коротком окне перед каждым номером проблемы.
+        """
+        problem_id = None
+        for id_match in PROBLEM_ID_RE.finditer(alert_text):
+            if problem_id is None:
+                problem_id = id_match.group(0)
+            window = alert_text[max(0, id_match.start() - _PROBLEM_STATUS_WINDOW):id_match.start()]
+            status_match = _PROBLEM_STATUS_BEFORE_ID_RE.search(window)
+            if status_match:
+                return problem_id, _PROBLEM_STATUS_NORMALIZED[status_match.group(1)]
+        return problem_id, None
+
+    @staticmethod
+    def _find_detection_period(alert_text: str) -> tuple[Optional[datetime], Optional[datetime]]:
+        """Время обнаружения проблемы и, если указано, время ее окончания."""
+        match = DETECTED_AT_RE.search(alert_text)
+        if not match:
+            return None, None
+        try:
+            detected_at = datetime.strptime(f"{match.group(2)} {match.group(1)}", "%d.%m.%Y %H:%M")
+            detected_until = None
+            if match.group(3):
+                detected_until = datetime.strptime(f"{match.group(4)} {match.group(3)}", "%d.%m.%Y %H:%M")
+            return detected_at, detected_until
+        except ValueError:
+            return None, None
+
+    @staticmethod
+    def _find_http_code(search, match_at) -> Optional[str]:
+        """
+        Ищет первый из вариантов "HTTP [ERROR ]NNN" и "NNN POST".
+        Второй вариант находим по литералу " post" и проверяем три цифры перед ним.
+        """
+        http_match = search(HTTP_CODE_RE)
+        limit = http_match.start() if http_match else None
+        pos = 0
+        while True:
+            post_match = search(POST_RE, pos)
+            if not post_match:
+                break
+            start = post_match.start() - 3
+            if limit is not None and start >= limit:
+                break
+            if start >= 0:
+                digits_match = match_at(_DIGITS3_RE, start)
+                if digits_match and digits_match.end() == post_match.start():
+                    return digits_match.group(0)
+            pos = post_match.start() + 1
+        return http_match.group(1) if http_match else None
+
+    @staticmethod
+    def _find_service_key(alert_text: str) -> Optional[str]:
+        """
+        Ключ сервиса из предмета алерта (см. SERVICE_KEY_PATTERNS). В заголовке
+        "ПРОМ | АС Рефлекс ..." указана только система мониторинга, поэтому сервис
+        берется из текста после уровня алерта.
+        """
+        level_match = SUBJECT_LEVEL_RE.search(alert_text)
+        if not level_match:
+            return None
+        end = alert_text.find(SUBJECT_END, level_match.end(), level_match.end() + SUBJECT_MAX_CHARS)
+        subject = alert_text[level_match.end():end if end != -1 else level_match.end() + SUBJECT_MAX_CHARS]
+        # В многострочном алерте предмет - первая непустая строка после уровня
+        subject = next((line.strip() for line in subject.splitlines() if line.strip()), "")
+        for pattern in SERVICE_KEY_PATTERNS:
+            match = pattern.search(subject)
+            if match:
+                # Шаблон имени процесса ("skillflow-smartapp-*") - без хвоста "-"
+                return match.group(match.lastindex or 0).rstrip('-.')
+        return None
+
+    @staticmethod
+    def _find_timestamp(alert_text: str) -> Optional[str]:
+        """Ищет первую метку времени вида ДД.ММ.ГГГГ ЧЧ:ММ:СС по ее хвосту ".ГГГГ ЧЧ:ММ:СС"."""
+        for tail_match in TIMESTAMP_TAIL_RE.finditer(alert_text):
+            start = tail_match.start() - 5
+            if start >= 0 and _DATE_HEAD_RE.match(alert_text, start):
+                return alert_text[start:tail_match.end()]
+        return None
+
+
+# Общий экземпляр парсера для повторного использования
+alert_parser = AlertParser()
+
+
+def parse_alert_fields(alert_text: str) -> AlertRecord:
+    """Разбирает текст алерта общим экземпляром AlertParser."""
+    return alert_parser.parse(alert_text)
@@ -0,0 +1,238 @@
+"""Потоковое чтение файлов с алертами: файл отображается в память и делится на алерты по одному."""
+
+import os
+import re
+import mmap
+import codecs
+import logging
+from functools import lru_cache
+from typing import Iterator, Optional
+
+# Логи чтения пишутся в общий лог инструментов
+logger = logging.getLogger('tool_logger')
+
+# Метки порядка байтов (BOM) и соответствующие кодировки.
+# UTF-32 проверяется раньше UTF-16: BOM UTF-32 LE начинается с BOM UTF-16 LE
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+
+# Сколько байт из начала файла просматривается для определения UTF-16 без BOM
+SNIFF_SIZE = 4096
+
+# Размер блока при потоковом декодировании файла
+DECODE_CHUNK_SIZE = 1024 * 1024
+
+# Кодировки, совместимые с ASCII: для них алерты делятся по байтовым шаблонам в UTF-8 и cp1251,
+# а каждый фрагмент декодируется сначала как UTF-8, затем как cp1251
+ASCII_COMPATIBLE_ENCODINGS = ('utf-8', 'cp1251')
+
+
+def sniff_encoding(head: bytes) -> tuple[Optional[str], int]:
+    """
+    Определяет кодировку по началу файла.
+
+    Returns:
+        tuple: (кодировка, длина BOM). Кодировка None означает ASCII-совместимый
+            текст, который декодируется как UTF-8, а при ошибке - как cp1251.
+    """
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return (None if encoding == 'utf-8' else encoding), len(bom)
+
+    # UTF-16 без BOM: в кириллице и латинице старший байт каждого символа повторяется,
+    # для латиницы и цифр он нулевой - нули стоят преимущественно на нечетных (LE) или четных (BE) позициях
+    sample = head[:SNIFF_SIZE - SNIFF_SIZE % 2]
+    if sample:
+        odd_zeros = sample[1::2].count(0)
+        even_zeros = sample[0::2].count(0)
+        half = len(sample) // 2
+        if odd_zeros > half * 0.3 and even_zeros < half * 0.05:
+            return 'utf-16-le', 0
+        if even_zeros > half * 0.3 and odd_zeros < half * 0.05:
+            return 'utf-16-be', 0
+    return None, 0
+
+
+def _encoded_alternatives(words: tuple, encodings: tuple) -> bytes:
+    """Собирает альтернативы байтового шаблона для слов в указанных кодировках."""
+    variants = []
+    for word in words:
+        for encoding in encodings:
+            variant = re.escape(word.encode(encoding))
+            if variant not in variants:
+                variants.append(variant)
+    return b'|'.join(variants)
+
+
+@lru_cache(maxsize=None)
+def alert_start_patterns(encoding: Optional[str] = None) -> tuple[re.Pattern, re.Pattern]:
+    """
+    Байтовые шаблоны начала алерта для кодировки (None - UTF-8 и cp1251).
+
+    Начало алерта - строка, начинающаяся с ПРОМ, PROM или DEV и затем " |",
+    альтернативное начало - строка, начинающаяся с "АС Рефлекс". Начало строки -
+    начало буфера, перевод строки или позиция сразу после BOM.
+    """
+    encodings = ASCII_COMPATIBLE_ENCODINGS if encoding is None else (encoding,)
+    line_starts = [rb'\A', re.escape('\n'.encode(encodings[0]))]
+    line_starts += [rb'(?<=' + re.escape(bom) + rb')' for bom, bom_encoding in BOMS
+                    if bom_encoding in encodings or (encoding is None and bom_encoding == 'utf-8')]
+    line_start = rb'(?:' + b'|'.join(line_starts) + rb')'
+
+    separator = _encoded_alternatives((' |',), encodings)
+    start_re = re.compile(line_start + rb'(?:' + _encoded_alternatives(('ПРОМ', 'PROM', 'DEV'), encodings)
+                          + rb')(?:' + separator + rb')')
+    alt_start_re = re.compile(line_start + rb'(?:' + _encoded_alternatives(('АС Рефлекс',), encodings) + rb')')
+    return start_re, alt_start_re
+
+
+# Шаблоны для ASCII-совместимых файлов
+ALERT_START_RE, ALT_ALERT_START_RE = alert_start_patterns()
+
+
+def decode_alert_bytes(data: bytes, encoding: Optional[str] = None) -> str:
+    """
+    Декодирует фрагмент файла в указанной кодировке.
+    Без кодировки - сначала UTF-8, при ошибке - cp1251.
+    """
+    if encoding is not None:
+        return data.decode(encoding, errors='replace')
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('cp1251')
+
+
+def _code_unit_size(encoding: Optional[str]) -> int:
+    """Размер кодовой единицы: границы алертов в UTF-16/32 должны быть выровнены по ней."""
+    if encoding and encoding.startswith('utf-32'):
+        return 4
+    if encoding and encoding.startswith('utf-16'):
+        return 2
+    return 1
+
+
+def iter_alert_fragments(buffer, pattern: re.Pattern, start: int = 0, end: int = None,
+                         encoding: Optional[str] = None) -> Iterator[str]:
+    """
+    Делит буфер (bytes или mmap) на алерты по границам pattern и выдает их по одному.
+    В памяти одновременно находится только текущий фрагмент.
+    Пустые фрагменты пропускаются.
+    """
+    end = len(buffer) if end is None else end
+    unit = _code_unit_size(encoding)
+    previous = None
+    for match in pattern.finditer(buffer, start, end):
+        if (match.start() - start) % unit:
+            continue
+        if previous is not None:
+            fragment = decode_alert_bytes(buffer[previous:match.start()], encoding).strip()
+            if fragment:
+                yield fragment
+        previous = match.start()
+    if previous is not None:
+        fragment = decode_alert_bytes(buffer[previous:end], encoding).strip()
+        if fragment:
+            yield fragment
+
+
+def _has_aligned_match(buffer, pattern: re.Pattern, start: int, encoding: Optional[str]) -> bool:
+    unit = _code_unit_size(encoding)
+    return any((match.start() - start) % unit == 0 for match in pattern.finditer(buffer, start))
+
+
+def iter_alerts(file_path: str) -> Iterator[str]:
+    """
+    Генератор алертов из файла с ограниченным потреблением памяти.
+
+    Файл читается один раз: он отображается в память (mmap), кодировка
+    определяется по BOM (UTF-8, UTF-16, UTF-32) или по началу файла, алерты
+    ищутся по строкам, начинающимся с ПРОМ, PROM или DEV. Если таких нет -
+    по строкам "АС Рефлекс". Если не найдены и они, весь текст файла выдается
+    как один алерт. Декодируется только текущий фрагмент.
+    """
+    file_size = os.path.getsize(file_path)
+    logger.info(f"Размер файла {file_path}: {file_size} байт")
+
+    # Пустой файл нельзя отобразить в память - анализируем его как один (пустой) алерт
+    if file_size == 0:
+        yield ''
+        return
+
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        encoding, bom_length = sniff_encoding(mm[:SNIFF_SIZE])
+        if encoding is not None:
+            logger.info(f"Кодировка файла {file_path}: {encoding}")
+        start_re, alt_start_re = alert_start_patterns(encoding)
+
+        if _has_aligned_match(mm, start_re, bom_length, encoding):
+            yield from iter_alert_fragments(mm, start_re, bom_length, encoding=encoding)
+        elif _has_aligned_match(mm, alt_start_re, bom_length, encoding):
+            yield from iter_alert_fragments(mm, alt_start_re, bom_length, encoding=encoding)
+        else:
+            logger.info("Не найдены стандартные паттерны алертов, анализируем весь текст как один алерт")
+            yield ''.join(_iter_decoded_chunks(mm, encoding, bom_length))
+
+
+def split_alerts(data: bytes) -> list[str]:
+    """
+    Делит присланный текст (например, тело HTTP-запроса) на алерты по тем же
+    правилам, что и iter_alerts. Пустой текст - пустой список.
+    """
+    encoding, bom_length = sniff_encoding(data[:SNIFF_SIZE])
+    start_re, alt_start_re = alert_start_patterns(encoding)
+    if _has_aligned_match(data, start_re, bom_length, encoding):
+        return list(iter_alert_fragments(data, start_re, bom_length, encoding=encoding))
+    if _has_aligned_match(data, alt_start_re, bom_length, encoding):
+        return list(iter_alert_fragments(data, alt_start_re, bom_length, encoding=encoding))
+    text = decode_alert_bytes(data[bom_length:], encoding).strip()
+    return [text] if text else []
+
+
+def _iter_decoded_chunks(buffer, encoding: Optional[str], start: int,
+                         chunk_size: int = DECODE_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Декодирует буфер блоками инкрементальным декодером (символы на границах блоков не теряются).
+    Для ASCII-совместимого текста буфер сначала проверяется как UTF-8 без сохранения
+    результата; при ошибке используется cp1251.
+    """
+    if encoding is None:
+        encoding = 'utf-8'
+        validator = codecs.getincrementaldecoder('utf-8')()
+        try:
+            for position in range(start, len(buffer), chunk_size):
+                validator.decode(buffer[position:position + chunk_size])
+            validator.decode(b'', final=True)
+        except UnicodeDecodeError:
+            encoding = 'cp1251'
+
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    for position in range(start, len(buffer), chunk_size):
+        text = decoder.decode(buffer[position:position + chunk_size])
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def iter_text_chunks(file_path: str, chunk_size: int = DECODE_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Общий загрузчик текста файлов алертов: файл открывается один раз, кодировка
+    определяется по BOM или содержимому, текст выдается декодированными блоками.
+    """
+    if os.path.getsize(file_path) == 0:
+        return
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        encoding, bom_length = sniff_encoding(mm[:SNIFF_SIZE])
+        yield from _iter_decoded_chunks(mm, encoding, bom_length, chunk_size)
+
+
+def read_alert_text(file_path: str) -> str:
+    """Весь текст файла алертов в любой из поддерживаемых кодировок (UTF-8, cp1251, UTF-16, UTF-32)."""
+    return ''.join(iter_text_chunks(file_path))
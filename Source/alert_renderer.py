@@ -0,0 +1,177 @@
+"""Markdown-представление результатов анализа алертов. Строки формируются только для того, что будет показано."""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from Source.alert_parser import AlertRecord, STATUS_INFO, HTTP_CODE_INFO
+
+# Направления интеграций из каталога эндпоинтов
+DIRECTION_INFO = {
+    "OUT": "📤 исходящий",
+    "IN": "📥 входящий",
+}
+
+# Виды сопоставления пути из алерта с каталогом (Source.endpoint_matcher)
+ENDPOINT_MATCH_TEXT = {
+    "exact": "точное совпадение",
+    "template": "совпадение по шаблону",
+    "prefix": "совпадение по началу пути",
+    "host": "найден по хосту",
+}
+
+
+@dataclass(slots=True)
+class AlertAnalysis:
+    """
+    Результат анализа одного алерта: разобранные поля, эндпоинты каталога,
+    о которых говорит алерт, и ответ бота (если запрашивался).
+    Markdown строится только при вызове render() (или str()).
+    """
+    record: Optional[AlertRecord] = None
+    bot_response: Optional[str] = None
+    error: Optional[str] = None
+    endpoints: tuple = ()
+
+    @property
+    def status(self) -> str:
+        return self.record.status if self.record is not None else "UNKNOWN"
+
+    def render(self) -> str:
+        """Карточка алерта в markdown, с анализом бота, если он есть."""
+        if self.error is not None:
+            return f"⚠️ **Ошибка анализа:** {self.error}"
+        alert_info = render_alert_card(self.record, self.endpoints)
+        if self.bot_response is None:
+            return alert_info
+        return render_bot_analysis(alert_info, self.record, self.bot_response)
+
+    def __str__(self) -> str:
+        return self.render()
+
+
+def render_group_header(group) -> str:
+    """
+    Краткая сводка по проблеме: текущий статус, число фрагментов и период.
+    """
+    status_data = STATUS_INFO.get(group.latest_status, STATUS_INFO["UNKNOWN"])
+    first_seen = group.first_seen.strftime('%d.%m.%Y %H:%M') if group.first_seen else "Не указано"
+    last_seen = group.last_seen.strftime('%d.%m.%Y %H:%M') if group.last_seen else "Не указано"
+    header = f"**Текущий статус**: {status_data['icon']} {group.latest_status} | "
+    header += f"**Фрагментов**: {group.fragment_count} | "
+    header += f"**Первое появление**: {first_seen} | **Последнее**: {last_seen}\n"
+    return header
+
+
+def render_endpoint_rows(endpoints) -> str:
+    """
+    Строки таблицы карточки об эндпоинтах из алерта (EndpointMatch):
+    путь и вид совпадения, интеграция-владелец и направление.
+    """
+    rows = ""
+    for endpoint_match in endpoints:
+        endpoint = endpoint_match.endpoint
+        if endpoint is None:
+            rows += f"| 🔗 **Эндпоинт** | `{endpoint_match.alert_path}` (нет в каталоге) |\n"
+            continue
+        request = endpoint.get('request') or endpoint_match.alert_path or "Не указан"
+        rows += f"| 🔗 **Эндпоинт** | `{request}` ({ENDPOINT_MATCH_TEXT.get(endpoint_match.match, endpoint_match.match)}) |\n"
+        integration = endpoint.get('description') or "Без описания"
+        if endpoint.get('host'):
+            integration += f" ({endpoint['host']})"
+        rows += f"| 🧩 **Интеграция** | {integration} |\n"
+        direction = endpoint.get('direction')
+        if direction:
+            rows += f"| ↔️ **Направление** | {DIRECTION_INFO.get(direction, direction)} |\n"
+    return rows
+
+
+def render_alert_card(record, endpoints=()) -> str:
+    """
+    Формирует карточку алерта в markdown по разобранным данным (без анализа бота).
+    endpoints - эндпоинты каталога, сопоставленные с алертом (EndpointMatch).
+    """
+    http_code = record.http_code if record.http_code is not None else "Неизвестно"
+    service = record.service if record.service is not None else "Неизвестный сервис"
+    alert_type = record.alert_type if record.alert_type is not None else "Неизвестный тип"
+    timestamp = record.timestamp if record.timestamp is not None else "Время не указано"
+    
+    status_data = STATUS_INFO.get(record.status, STATUS_INFO["UNKNOWN"])
+    
+    http_display = f"**{http_code}**"
+    # Convert http_code to string to ensure it works as a dictionary key
+    http_code_str = str(http_code)
+    if http_code_str in HTTP_CODE_INFO:
+        http_display = f"{HTTP_CODE_INFO[http_code_str]['icon']} **{http_code}** ({HTTP_CODE_INFO[http_code_str]['text']})"
+    
+    # Форматирование времени, если оно доступно
+    time_display = "Не указано"
+    if timestamp != "Время не указано":
+        try:
+            dt = datetime.strptime(timestamp, "%d.%m.%Y %H:%M:%S")
+            time_display = f"📅 {dt.strftime('%d.%m.%Y')} ⏰ {dt.strftime('%H:%M:%S')}"
+        except:
+            time_display = timestamp
+    
+    # Красивый вывод информации об алерте в виде карточки с границами
+    alert_info = f"## {status_data['icon']} {status_data['badge']} {status_data['icon']}\n"
+    alert_info += f"{status_data['border']}\n\n"
+    
+    # Информационная таблица с улучшенным форматированием
+    alert_info += f"| 📊 Параметр | 📋 Значение |\n"
+    alert_info += f"|:----------:|:-----------|\n"
+    alert_info += f"| 🏢 **Сервис** | {service} |\n"
+    alert_info += f"| 📝 **Тип** | {alert_type} |\n"
+    alert_info += f"| 🌐 **HTTP код** | {http_display} |\n"
+    alert_info += f"| 🕒 **Время** | {time_display} |\n"
+    
+    # Сообщение об ошибке, если есть
+    if record.error_message is not None:
+        alert_info += f"| ⚠️ **Ошибка** | {record.error_message} |\n"
+    
+    alert_info += render_endpoint_rows(endpoints)
+    
+    # Текст алерта с улучшенным форматированием в виде раскрывающегося блока
+    alert_info += "\n"
+    alert_info += "<details>\n"
+    alert_info += "<summary>📝 Подробности алерта</summary>\n\n"
+    
+    # Форматирование текста алерта для лучшей читаемости
+    formatted_text = record.text.replace("\n\n", "\n")
+    if len(formatted_text) > 300:
+        # Показываем только первые 300 символов с многоточием
+        formatted_text = formatted_text[:300] + "...\n\n[Текст обрезан для краткости]"
+    
+    alert_info += f"```\n{formatted_text}\n```\n"
+    alert_info += "</details>\n"
+    return alert_info
+
+
+def render_bot_analysis(alert_info: str, record, bot_response: str) -> str:
+    """
+    Дополняет карточку алерта анализом бота и рекомендациями.
+    """
+    status = record.status
+    service = record.service if record.service is not None else "Неизвестный сервис"
+    
+    # Компактный вывод с анализом в красивом формате
+    final_output = f"{alert_info}\n"
+    final_output += f"## 🧠 Анализ\n"
+    final_output += f"─────────────────────── 🔍 ───────────────────────\n\n"
+    
+    # Форматирование ответа бота в зависимости от статуса алерта
+    if status == "OPEN" or status == "ACTIVE":
+        final_output += f"⚠️ **ВНИМАНИЕ! Требуется реакция!**\n\n"
+    elif status == "RESOLVED" or status == "CLOSED":
+        final_output += f"✅ **Алерт закрыт. Дополнительных действий не требуется.**\n\n"
+    
+    final_output += f"{bot_response}\n\n"
+    
+    # Добавляем рекомендации в зависимости от статуса и HTTP кода
+    if status == "OPEN" or status == "ACTIVE":
+        if record.http_code in ["500", "502", "503", "504"]:
+            final_output += f"### 📋 Рекомендации:\n\n"
+            final_output += f"1. Проверьте доступность сервиса {service}\n"
+            final_output += f"2. Изучите логи за период, близкий к времени возникновения алерта\n"
+            final_output += f"3. Убедитесь в корректности конфигурации и доступности зависимостей\n"
+    return final_output
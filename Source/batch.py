@@ -0,0 +1,215 @@
+"""Пакетный неинтерактивный анализ файлов с алертами в пуле процессов с выводом в JSONL."""
+
+import os
+import glob
+import json
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from typing import Iterator, Optional
+
+from Source.alert_reader import iter_alerts
+from Source.alert_parser import alert_parser
+from Source.alert_history import alert_hash
+
+logger = logging.getLogger('tool_logger')
+
+# Размер блока при вычислении хэша файла
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Хэши сохраняются на диск после каждых HASH_SAVE_INTERVAL проанализированных файлов
+HASH_SAVE_INTERVAL = 50
+
+# Поля AlertRecord, которые попадают в запись JSONL
+RECORD_FIELDS = ('problem_id', 'status', 'service', 'service_key', 'alert_type', 'http_code', 'timestamp',
+                 'error_message', 'detected_at', 'detected_until')
+
+
+def collect_files(target: str) -> list[str]:
+    """
+    Файлы для анализа: все файлы каталога (рекурсивно) или файлы по glob-шаблону
+    (поддерживается **). Пути отсортированы.
+    """
+    if os.path.isdir(target):
+        paths = [os.path.join(directory, name)
+                 for directory, _, names in os.walk(target) for name in names]
+    else:
+        paths = glob.glob(target, recursive=True)
+    return sorted(os.path.abspath(path) for path in paths if os.path.isfile(path))
+
+
+def file_hash(file_path: str) -> str:
+    """SHA-256 содержимого файла (читается блоками)."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def record_to_dict(record) -> dict:
+    """Поля разобранного алерта для JSON (даты - в ISO 8601)."""
+    result = {}
+    for field in RECORD_FIELDS:
+        value = getattr(record, field)
+        result[field] = value.isoformat() if isinstance(value, datetime) else value
+    return result
+
+
+def analyze_file(file_path: str, known_hash: Optional[str] = None, include_llm: bool = True) -> dict:
+    """
+    Анализ одного файла в рабочем процессе.
+
+    Если хэш содержимого совпадает с known_hash, файл не разбирается.
+
+    Returns:
+        dict: {'file', 'hash', 'skipped', 'records', 'error'}
+    """
+    result = {'file': file_path, 'hash': None, 'skipped': False, 'records': [], 'error': None}
+    try:
+        result['hash'] = file_hash(file_path)
+        if result['hash'] == known_hash:
+            result['skipped'] = True
+            return result
+
+        if include_llm:
+            # Модель создается в каждом рабочем процессе при первом запросе
+            from Source.tools import _build_bot_request, _get_bot_response_functions
+            get_bot_response, _ = _get_bot_response_functions()
+
+        for index, alert_text in enumerate(iter_alerts(file_path)):
+            record = alert_parser.parse(alert_text)
+            data = {'file': file_path, 'file_hash': result['hash'], 'index': index,
+                    'alert_hash': alert_hash(alert_text), **record_to_dict(record)}
+            if include_llm:
+                bot_prompt, structured_data = _build_bot_request(record)
+                data['analysis'] = get_bot_response(bot_prompt, max_tokens=500, alert_data=structured_data)
+            result['records'].append(data)
+    except Exception as e:
+        logger.error(f"Ошибка при пакетном анализе файла {file_path}: {str(e)}", exc_info=True)
+        result['error'] = str(e)
+    return result
+
+
+def load_hashes(state_path: Optional[str]) -> dict:
+    """
+    Хэши файлов, проанализированных в прошлых запусках, по выходным файлам:
+    {выходной файл: {путь: sha256}}. Файл прежнего формата ({путь: sha256}) не знает,
+    в какой выходной файл записаны алерты, поэтому не учитывается.
+    """
+    if not state_path or not os.path.exists(state_path):
+        return {}
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Не удалось загрузить хэши файлов из {state_path}: {str(e)}")
+        return {}
+    if not all(isinstance(hashes, dict) for hashes in state.values()):
+        logger.info(f"Хэши файлов в {state_path} сохранены прежней версией без выходного файла, все файлы будут проанализированы")
+        return {}
+    return state
+
+
+def save_hashes(state_path: Optional[str], state: dict) -> None:
+    """Атомарно записывает хэши файлов по выходным файлам (через временный файл)."""
+    if not state_path:
+        return
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(state_path)), exist_ok=True)
+        tmp_path = f"{state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, state_path)
+    except OSError as e:
+        logger.error(f"Не удалось сохранить хэши файлов в {state_path}: {str(e)}")
+
+
+def iter_file_results(files: list[str], hashes: dict, workers: int, include_llm: bool) -> Iterator[dict]:
+    """
+    Анализирует файлы в пуле процессов и выдает результаты по мере готовности.
+    Одновременно в очереди не больше workers * 2 файлов, чтобы не держать в памяти
+    результаты всего архива.
+    """
+    if workers <= 1:
+        for file_path in files:
+            yield analyze_file(file_path, hashes.get(file_path), include_llm)
+        return
+
+    pending_files = iter(files)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = set()
+        for file_path in pending_files:
+            in_flight.add(executor.submit(analyze_file, file_path, hashes.get(file_path), include_llm))
+            if len(in_flight) >= workers * 2:
+                break
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+                next_file = next(pending_files, None)
+                if next_file is not None:
+                    in_flight.add(executor.submit(analyze_file, next_file, hashes.get(next_file), include_llm))
+
+
+def run_batch(target: str, out_path: str, workers: int = None, include_llm: bool = True,
+              state_path: Optional[str] = None, force: bool = False, history=None) -> dict:
+    """
+    Пакетный анализ: каждая запись JSONL - один алерт. Файлы, содержимое которых
+    не изменилось с прошлого запуска с тем же выходным файлом (по хэшу в state_path),
+    пропускаются, а их записи остаются в выходном файле от прошлых запусков (файл
+    дописывается). Для нового или удаленного выходного файла анализируются все файлы.
+    Записи измененного файла дописываются заново с новым file_hash.
+    Если передано хранилище history (AlertHistory), алерты сохраняются и в него.
+
+    Returns:
+        dict: Статистика запуска (files, analyzed, skipped, failed, alerts)
+    """
+    files = collect_files(target)
+    # Хэши хранятся отдельно для каждого выходного файла: пропущенный файл должен иметь записи именно в нем
+    state = load_hashes(state_path)
+    out_key = os.path.abspath(out_path)
+    if force or not os.path.exists(out_path):
+        state[out_key] = {}
+    hashes = state.setdefault(out_key, {})
+    known_hashes = dict(hashes)
+    workers = workers or os.cpu_count() or 1
+    stats = {'files': len(files), 'analyzed': 0, 'skipped': 0, 'failed': 0, 'alerts': 0}
+    logger.info(f"Пакетный анализ {len(files)} файлов ({target}), процессов: {workers}, LLM: {include_llm}")
+
+    out_dir = os.path.dirname(os.path.abspath(out_path))
+    os.makedirs(out_dir, exist_ok=True)
+    with open(out_path, 'a', encoding='utf-8') as out:
+        try:
+            results = iter_file_results(files, known_hashes, workers, include_llm)
+            _write_results(results, out, state, out_key, stats, state_path, history)
+        finally:
+            save_hashes(state_path, state)
+
+    logger.info(f"Пакетный анализ завершен: {stats}")
+    return stats
+
+
+def _write_results(results: Iterator[dict], out, state: dict, out_key: str, stats: dict,
+                   state_path: Optional[str], history=None) -> None:
+    """Записывает алерты каждого файла в JSONL и запоминает хэши проанализированных файлов для out_key."""
+    hashes = state[out_key]
+    for result in results:
+        if result['skipped']:
+            stats['skipped'] += 1
+            continue
+        if result['error'] is not None:
+            stats['failed'] += 1
+            continue
+        for record in result['records']:
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        out.flush()
+        if history is not None:
+            history.add_dicts(result['records'])
+        stats['analyzed'] += 1
+        stats['alerts'] += len(result['records'])
+        # Хэш запоминается только после записи результатов файла
+        hashes[result['file']] = result['hash']
+        if stats['analyzed'] % HASH_SAVE_INTERVAL == 0:
+            save_hashes(state_path, state)
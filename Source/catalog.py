@@ -0,0 +1,309 @@
+"""Справочники из JSON-файлов (каталог эндпоинтов, глоссарий) с горячей перезагрузкой и предсобранными снимками."""
+
+import gc
+import os
+import sys
+import json
+import hmac
+import time
+import pickle
+import hashlib
+import secrets
+import logging
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger('tool_logger')
+
+# Версия формата снимка: при изменении классов индексов снимки прошлых версий пересобираются
+SNAPSHOT_VERSION = 3
+
+# Начало файла снимка; за ним следуют HMAC-SHA256 содержимого (hex) и перевод строки
+SNAPSHOT_MAGIC = b'catalog-snapshot-hmac-sha256 '
+
+# Файл ключа подписи снимков в каталоге снимков (доступен только владельцу)
+SNAPSHOT_KEY_FILE = '.snapshot_key'
+SNAPSHOT_KEY_BYTES = 32
+
+
+def _stat_key(path: str) -> tuple:
+    """Признаки изменения файла без чтения содержимого: время изменения и размер."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_snapshot_key(directory: str) -> Optional[bytes]:
+    """
+    Ключ подписи снимков из каталога снимков; при первом обращении ключ создается
+    с правами 0600. Если файл ключа доступен группе или другим пользователям
+    (POSIX), возвращается None - снимки не используются.
+    """
+    key_path = os.path.join(directory, SNAPSHOT_KEY_FILE)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(key_path):
+            # Ключ появляется в каталоге только целиком: несколько процессов могут создавать его одновременно
+            tmp_path = f"{key_path}.{os.getpid()}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(secrets.token_bytes(SNAPSHOT_KEY_BYTES))
+            try:
+                os.link(tmp_path, key_path)
+            except FileExistsError:
+                pass
+            finally:
+                os.remove(tmp_path)
+        if os.name == 'posix' and os.stat(key_path).st_mode & 0o077:
+            logger.error(f"Ключ снимков {key_path} доступен другим пользователям, снимки справочников не используются")
+            return None
+        with open(key_path, 'rb') as f:
+            key = f.read()
+    except OSError as e:
+        logger.error(f"Не удалось получить ключ снимков {key_path}: {str(e)}")
+        return None
+    if len(key) < SNAPSHOT_KEY_BYTES:
+        logger.error(f"Ключ снимков {key_path} поврежден, снимки справочников не используются")
+        return None
+    return key
+
+
+def _snapshot_signature(key: bytes, payload: bytes) -> bytes:
+    return hmac.new(key, payload, hashlib.sha256).hexdigest().encode('ascii')
+
+
+def intern_strings(value):
+    """Интернирует строки записей: повторяющиеся хосты, направления и ключи хранятся в одном экземпляре."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return {sys.intern(key): intern_strings(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [intern_strings(item) for item in value]
+    return value
+
+
+def deduplicate_entries(entries: list[dict]) -> list[dict]:
+    """Убирает полностью совпадающие записи, сохраняя порядок первого появления."""
+    seen = set()
+    unique = []
+    for entry in entries:
+        key = json.dumps(entry, ensure_ascii=False, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            unique.append(entry)
+    if len(unique) < len(entries):
+        logger.info(f"Удалено дубликатов записей справочника: {len(entries) - len(unique)}")
+    return unique
+
+
+class Catalog:
+    """
+    Справочник из JSON-файла со списком записей и построенный по нему индекс.
+
+    Обращение к index проверяет время изменения и размер файла не чаще раза
+    в check_interval секунд. Если они изменились, перезагрузка запускается
+    в фоновом потоке: считается хэш содержимого, и индекс перестраивается,
+    только если изменилось содержимое. Новый индекс подменяет старый одним
+    присваиванием, поэтому читатели не ждут перезагрузку: пока она идет,
+    они получают прежний индекс.
+
+    Если задан snapshot_path, собранный индекс (записи без дубликатов,
+    интернированные строки, готовые структуры поиска) сохраняется в pickle.
+    При следующем запуске снимок загружается вместо разбора JSON и
+    построения индекса, если исходный файл не изменился.
+
+    Снимок подписывается HMAC-SHA256 ключом из файла .snapshot_key в каталоге
+    снимков, и pickle загружается только после проверки подписи. Каталог
+    снимков не должен быть доступен на запись другим пользователям: тот, кто
+    может записать в него и снимок, и ключ, выполнит свой код при загрузке.
+    """
+
+    def __init__(self, path: str, index_factory: Callable[[list[dict]], object],
+                 snapshot_path: Optional[str] = None, check_interval: float = 2.0):
+        self.path = path
+        self.index_factory = index_factory
+        self.snapshot_path = snapshot_path
+        self.check_interval = check_interval
+        self._index = None
+        self._stat = None
+        self._hash = None
+        self._checked_at = 0.0
+        self._reload_lock = threading.Lock()
+        self._reload_thread = None
+        self._snapshot_key = None
+
+    @property
+    def index(self):
+        """Текущий индекс справочника (при первом обращении справочник загружается)."""
+        index = self._index
+        if index is None:
+            with self._reload_lock:
+                if self._index is None:
+                    self._load()
+            return self._index
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            # Проверку выполняет один поток, остальные сразу получают текущий индекс.
+            # Блокировка остается занятой до конца фоновой перезагрузки
+            if self._reload_lock.acquire(blocking=False):
+                reloading = False
+                try:
+                    self._checked_at = time.monotonic()
+                    reloading = self._start_reload()
+                finally:
+                    if not reloading:
+                        self._reload_lock.release()
+        return self._index
+
+    def wait_reload(self, timeout: Optional[float] = None) -> None:
+        """Ожидает окончания фоновой перезагрузки, если она идет."""
+        thread = self._reload_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _start_reload(self) -> bool:
+        """Запускает перезагрузку в фоновом потоке, если файл изменился. Возвращает True, если поток запущен."""
+        try:
+            stat = _stat_key(self.path)
+        except OSError as e:
+            logger.error(f"Не удалось проверить справочник {self.path}: {str(e)}")
+            return False
+        if stat == self._stat:
+            return False
+        self._reload_thread = threading.Thread(target=self._reload_in_background, args=(stat,),
+                                               name=f"catalog-reload-{os.path.basename(self.path)}", daemon=True)
+        self._reload_thread.start()
+        return True
+
+    def _reload_in_background(self, stat: tuple) -> None:
+        try:
+            self._reload(stat)
+        except Exception as e:
+            logger.error(f"Ошибка перезагрузки справочника {self.path}: {str(e)}")
+        finally:
+            self._reload_lock.release()
+
+    def _reload(self, stat: tuple) -> None:
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            logger.error(f"Не удалось прочитать справочник {self.path}: {str(e)}")
+            return
+        digest = hashlib.sha256(data).hexdigest()
+        if digest == self._hash:
+            self._stat = stat
+            return
+        try:
+            index = self._build(data, digest, stat)
+        except (ValueError, TypeError) as e:
+            # Файл может быть записан не до конца - остается прежний индекс, проверка повторится
+            logger.error(f"Справочник {self.path} не перезагружен: {str(e)}")
+            return
+        self._index, self._hash, self._stat = index, digest, stat
+        logger.info(f"Справочник {self.path} перезагружен: {len(index)} записей")
+
+    def _load(self) -> None:
+        """Первая загрузка: из снимка, если он соответствует файлу, иначе из JSON."""
+        stat = _stat_key(self.path)
+        snapshot = self._read_snapshot()
+        if snapshot is not None and tuple(snapshot['source_stat']) == stat:
+            self._index, self._hash, self._stat = snapshot['index'], snapshot['source_hash'], stat
+            return
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if snapshot is not None and snapshot['source_hash'] == digest:
+            # Файл перезаписан без изменений - снимок годится, обновляем только признаки файла
+            self._index, self._hash, self._stat = snapshot['index'], digest, stat
+            self._write_snapshot(self._index, digest, stat)
+            return
+        self._index, self._hash, self._stat = self._build(data, digest, stat), digest, stat
+
+    def _build(self, data: bytes, digest: str, stat: tuple):
+        entries = intern_strings(deduplicate_entries(json.loads(data.decode('utf-8'))))
+        index = self.index_factory(entries)
+        self._write_snapshot(index, digest, stat)
+        return index
+
+    def _get_snapshot_key(self) -> Optional[bytes]:
+        if self._snapshot_key is None:
+            self._snapshot_key = load_snapshot_key(os.path.dirname(os.path.abspath(self.snapshot_path)))
+        return self._snapshot_key
+
+    def _read_snapshot(self) -> Optional[dict]:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        key = self._get_snapshot_key()
+        if key is None:
+            return None
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            logger.error(f"Не удалось прочитать снимок справочника {self.snapshot_path}: {str(e)}")
+            return None
+        header, _, payload = data.partition(b'\n')
+        if not header.startswith(SNAPSHOT_MAGIC) or not hmac.compare_digest(
+                header[len(SNAPSHOT_MAGIC):], _snapshot_signature(key, payload)):
+            # Неподписанный или измененный снимок не распаковывается: pickle может выполнить произвольный код
+            logger.warning(f"Подпись снимка справочника {self.snapshot_path} не совпадает, снимок будет пересобран")
+            return None
+        # Снимок состоит из миллионов мелких объектов: сборщик мусора на время загрузки
+        # отключается, иначе он многократно обходит уже загруженные структуры
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            snapshot = pickle.loads(payload)
+        except Exception as e:
+            logger.error(f"Не удалось загрузить снимок справочника {self.snapshot_path}: {str(e)}")
+            return None
+        finally:
+            if gc_enabled:
+                gc.enable()
+        if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('source') != os.path.abspath(self.path):
+            return None
+        return snapshot
+
+    def _write_snapshot(self, index, digest: str, stat: tuple) -> None:
+        """Атомарно записывает подписанный снимок (через временный файл)."""
+        if not self.snapshot_path:
+            return
+        key = self._get_snapshot_key()
+        if key is None:
+            return
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'source': os.path.abspath(self.path),
+            'source_hash': digest,
+            'source_stat': stat,
+            'index': index,
+        }
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.snapshot_path)), exist_ok=True)
+            # Имя временного файла уникально для процесса: снимок могут собирать несколько процессов сразу
+            tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+            payload = pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+            with open(tmp_path, 'wb') as f:
+                f.write(SNAPSHOT_MAGIC + _snapshot_signature(key, payload) + b'\n')
+                f.write(payload)
+            os.replace(tmp_path, self.snapshot_path)
+        except (OSError, pickle.PicklingError, RecursionError) as e:
+            logger.error(f"Не удалось сохранить снимок справочника {self.snapshot_path}: {str(e)}")
+
+
+def create_catalog(data_path: str, index_factory: Callable[[list[dict]], object],
+                   catalog_settings: dict, root_dir: str) -> Catalog:
+    """
+    Создает справочник по разделу catalogs из настроек. Снимок хранится в
+    каталоге snapshot_dir под именем исходного файла. Относительные пути считаются от корня проекта.
+    """
+    if not os.path.isabs(data_path):
+        data_path = os.path.join(root_dir, data_path)
+    snapshot_path = None
+    snapshot_dir = catalog_settings.get("snapshot_dir")
+    if snapshot_dir and catalog_settings.get("snapshots", True):
+        if not os.path.isabs(snapshot_dir):
+            snapshot_dir = os.path.join(root_dir, snapshot_dir)
+        snapshot_path = os.path.join(snapshot_dir, os.path.splitext(os.path.basename(data_path))[0] + '.pickle')
+    return Catalog(data_path, index_factory, snapshot_path, catalog_settings.get("check_interval", 2.0))
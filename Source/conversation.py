@@ -0,0 +1,123 @@
+"""Хранение диалогов агента: контрольные точки в SQLite и ограничение истории последних ходов."""
+
+import os
+import sqlite3
+import logging
+from typing import Optional
+
+logger = logging.getLogger('tool_logger')
+
+# Идентификатор сообщения с кратким содержанием сжатой части диалога
+SUMMARY_MESSAGE_ID = "history_summary"
+SUMMARY_HEADER = "Краткое содержание предыдущей части диалога:"
+
+# Сколько символов вопроса и ответа попадает в краткое содержание одного хода
+QUESTION_SUMMARY_CHARS = 200
+ANSWER_SUMMARY_CHARS = 300
+
+
+def create_checkpointer(conversation_settings: dict, root_dir: str):
+    """
+    Создает хранилище контрольных точек диалога по разделу conversation из настроек.
+
+    checkpointer "sqlite" - диалоги хранятся на диске (нужен пакет langgraph-checkpoint-sqlite),
+    при его отсутствии и при "memory" - в памяти процесса (MemorySaver).
+    Относительный путь к базе считается от корня проекта.
+    """
+    if conversation_settings.get("checkpointer", "sqlite") == "sqlite":
+        try:
+            from langgraph.checkpoint.sqlite import SqliteSaver
+        except ImportError:
+            logger.warning("Пакет langgraph-checkpoint-sqlite не установлен, диалоги хранятся в памяти процесса")
+        else:
+            db_path = conversation_settings.get("db_path", "Logs/conversations.sqlite3")
+            if not os.path.isabs(db_path):
+                db_path = os.path.join(root_dir, db_path)
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            connection = sqlite3.connect(db_path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            logger.info(f"Диалоги агента сохраняются в {db_path}")
+            return SqliteSaver(connection)
+
+    from langgraph.checkpoint.memory import MemorySaver
+    return MemorySaver()
+
+
+def _truncate(text: str, limit: int) -> str:
+    text = ' '.join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def _split_turns(messages: list) -> tuple[Optional[object], list, list]:
+    """
+    Делит историю на краткое содержание (если есть), сообщения до первого вопроса
+    и ходы. Ход начинается с сообщения пользователя и включает вызовы инструментов
+    и ответы, поэтому пары вызов-результат инструмента никогда не разрываются.
+    """
+    summary = None
+    leading = []
+    turns = []
+    for message in messages:
+        if getattr(message, 'id', None) == SUMMARY_MESSAGE_ID:
+            summary = message
+        elif message.type == "human":
+            turns.append([message])
+        elif turns:
+            turns[-1].append(message)
+        else:
+            leading.append(message)
+    return summary, leading, turns
+
+
+def summarize_turn(turn: list) -> str:
+    """Краткое содержание хода без обращения к модели: начало вопроса и последнего ответа."""
+    question = _truncate(turn[0].content, QUESTION_SUMMARY_CHARS)
+    answers = [message for message in turn[1:] if message.type == "ai" and message.content]
+    line = f"- Пользователь: {question}"
+    if answers:
+        line += f"\n  Ответ: {_truncate(answers[-1].content, ANSWER_SUMMARY_CHARS)}"
+    return line
+
+
+def _merge_summary(previous: str, turns: list, max_chars: int) -> str:
+    """Дописывает сжатые ходы к прежнему содержанию; самые старые строки отбрасываются сверх max_chars."""
+    lines = previous.splitlines()[1:] if previous else []
+    lines += [line for turn in turns for line in summarize_turn(turn).splitlines()]
+    # Строка ответа не должна оставаться без своего вопроса
+    while lines and (sum(len(line) + 1 for line in lines) > max_chars or not lines[0].startswith("- ")):
+        lines.pop(0)
+    return "\n".join([SUMMARY_HEADER] + lines)
+
+
+def make_history_hook(max_turns: int = 12, keep_last_turns: int = 8, summary_max_chars: int = 2000):
+    """
+    Создает pre_model_hook для create_react_agent, который ограничивает историю диалога.
+
+    Пока ходов не больше max_turns, история не меняется. Затем в состоянии остаются
+    последние keep_last_turns ходов, а более старые заменяются одним сообщением
+    пользователя с кратким содержанием (не длиннее summary_max_chars). История переписывается
+    в контрольной точке, поэтому размер запроса к модели и потребление памяти
+    не растут с длиной смены.
+    """
+    from langchain_core.messages import HumanMessage, RemoveMessage
+    from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+    keep_last_turns = max(1, min(keep_last_turns, max_turns))
+
+    def compact_history(state) -> dict:
+        messages = state["messages"]
+        summary, leading, turns = _split_turns(messages)
+        if len(turns) <= max_turns:
+            return {}
+
+        dropped, kept = turns[:-keep_last_turns], turns[-keep_last_turns:]
+        summary_text = _merge_summary(summary.content if summary else "", dropped, summary_max_chars)
+        # Краткое содержание передается от имени пользователя с заголовком: история не должна
+        # начинаться с ответа ассистента, а системное сообщение GigaChat допускает только первым
+        compacted = [HumanMessage(content=summary_text, id=SUMMARY_MESSAGE_ID)]
+        compacted += leading + [message for turn in kept for message in turn]
+        logger.info(f"История диалога сжата: {len(dropped)} ходов заменены кратким содержанием, "
+                    f"сообщений {len(messages)} -> {len(compacted)}")
+        return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES)] + compacted}
+
+    return compact_history
@@ -0,0 +1,188 @@
+"""Индекс API-эндпоинтов для быстрого поиска по пути, описанию и хосту."""
+
+import re
+from collections import defaultdict
+from typing import Optional
+
+from Source.endpoint_matcher import (
+    PathTrie, EndpointMatch, MATCH_HOST, extract_paths, extract_hosts,
+)
+
+# rapidfuzz нужен только для нечеткого поиска
+try:
+    from rapidfuzz import fuzz, process
+except ImportError:
+    fuzz = process = None
+
+# Поля эндпоинта, по которым выполняется поиск
+SEARCH_FIELDS = ('request', 'description', 'host')
+
+# Минимальное сходство нечеткого поиска (WRatio, от 0 до 1): бессмысленные запросы
+# ("погода", "xyz123") набирают 0.3-0.45, опечатки и неполные пути - 0.75 и выше
+# Значение по умолчанию для настройки endpoint_fuzzy_threshold
+ENDPOINT_FUZZY_THRESHOLD = 0.7
+
+# Слова - последовательности букв, цифр и подчеркиваний
+_WORD_RE = re.compile(r'\w+')
+_HOST_SEPARATORS_RE = re.compile(r'[.\-:]+')
+
+
+def _trigrams(text: str) -> set:
+    """Множество символьных триграмм строки."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class EndpointIndex:
+    """
+    Инвертированный индекс каталога эндпоинтов, строится один раз при загрузке.
+
+    Содержит токены сегментов пути, слов описания и частей хоста, а также
+    символьные триграммы всех полей. Поиск подстроки возвращает те же
+    эндпоинты и в том же порядке, что и полный перебор каталога, но
+    проверяет только кандидатов из индекса.
+    """
+
+    def __init__(self, endpoints: list[dict]):
+        self.endpoints = endpoints
+        # Поля в нижнем регистре для окончательной проверки кандидатов
+        self._lowered = [
+            tuple(endpoint.get(field, "").lower() for field in SEARCH_FIELDS)
+            for endpoint in endpoints
+        ]
+        # Готовые списки значений каждого поля для пакетного нечеткого сравнения
+        self._choices = [list(values) for values in zip(*self._lowered)] if self._lowered else [[] for _ in SEARCH_FIELDS]
+        self.path_segments = defaultdict(set)
+        self.description_words = defaultdict(set)
+        self.host_tokens = defaultdict(set)
+        self.trigrams = defaultdict(set)
+        # Слова всех полей - для коротких запросов, по которым триграмм нет
+        self.words = defaultdict(set)
+        # Дерево шаблонов путей и хосты - для сопоставления алертов с каталогом
+        self.path_trie = PathTrie([endpoint.get('request', '') for endpoint in endpoints])
+        self.hosts = defaultdict(list)
+
+        for position, (request, description, host) in enumerate(self._lowered):
+            for segment in request.split('/'):
+                if segment:
+                    self.path_segments[segment].add(position)
+            for word in _WORD_RE.findall(description):
+                self.description_words[word].add(position)
+            for token in _HOST_SEPARATORS_RE.split(host):
+                if token:
+                    self.host_tokens[token].add(position)
+            if host:
+                self.hosts[host].append(position)
+            for value in (request, description, host):
+                for trigram in _trigrams(value):
+                    self.trigrams[trigram].add(position)
+                for word in _WORD_RE.findall(value):
+                    self.words[word].add(position)
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def _candidates(self, query: str) -> Optional[set]:
+        """
+        Позиции эндпоинтов, которые могут содержать запрос как подстроку.
+        None означает, что индекс не сужает поиск и нужна проверка всех записей.
+        """
+        if len(query) >= 3:
+            # Подстрока содержит все свои триграммы - пересекаем их списки, начиная с самого короткого
+            postings = sorted((self.trigrams.get(trigram, set()) for trigram in _trigrams(query)), key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                if not candidates:
+                    break
+                candidates &= posting
+            return candidates
+        if _WORD_RE.fullmatch(query):
+            # Короткий запрос из символов слова целиком лежит внутри одного слова поля
+            candidates = set()
+            for word, posting in self.words.items():
+                if query in word:
+                    candidates |= posting
+            return candidates
+        return None
+
+    def search(self, query: str, limit: Optional[int] = None) -> list[dict]:
+        """
+        Эндпоинты, в пути, описании или хосте которых встречается запрос
+        (без учета регистра), в порядке каталога. limit ограничивает число результатов.
+        """
+        query = query.lower().strip()
+        candidates = self._candidates(query)
+        positions = range(len(self.endpoints)) if candidates is None else sorted(candidates)
+
+        results = []
+        for position in positions:
+            if any(query in value for value in self._lowered[position]):
+                results.append(self.endpoints[position])
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+    def fuzzy_search(self, query: str, limit: int = 5,
+                     threshold: float = ENDPOINT_FUZZY_THRESHOLD) -> list[tuple[dict, float]]:
+        """
+        Нечеткий поиск с ранжированием (rapidfuzz): находит эндпоинты при опечатках
+        и неполных путях. Оценка эндпоинта - лучшее сходство по его полям.
+
+        Args:
+            query: Строка запроса
+            limit: Сколько лучших эндпоинтов вернуть
+            threshold: Минимальное сходство от 0 до 1 (endpoint_fuzzy_threshold)
+
+        Returns:
+            Список пар (эндпоинт, сходство от 0 до 1) по убыванию сходства
+        """
+        query = query.lower().strip()
+        if process is None or not query or limit <= 0:
+            return []
+
+        best_scores = {}
+        for choices in self._choices:
+            # Лучшие limit по каждому полю содержат и лучшие limit по максимуму полей
+            for _, score, position in process.extract(
+                query, choices, scorer=fuzz.WRatio, processor=None,
+                limit=limit, score_cutoff=threshold * 100,
+            ):
+                if score > best_scores.get(position, -1):
+                    best_scores[position] = score
+
+        ranked = sorted(best_scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [(self.endpoints[position], score / 100) for position, score in ranked]
+
+    def lookup_token(self, token: str) -> list[dict]:
+        """Эндпоинты, у которых сегмент пути, слово описания или часть хоста точно совпадает с токеном."""
+        token = token.lower().strip()
+        positions = (self.path_segments.get(token, set())
+                     | self.description_words.get(token, set())
+                     | self.host_tokens.get(token, set()))
+        return [self.endpoints[position] for position in sorted(positions)]
+
+    def correlate(self, alert_text: str, limit: int = 3) -> list[EndpointMatch]:
+        """
+        Эндпоинты каталога, о которых говорит алерт: пути запросов из текста
+        сопоставляются с деревом шаблонов путей; если путей нет или они не найдены,
+        эндпоинты ищутся по хостам из текста. Путь, которого нет в каталоге,
+        возвращается с endpoint=None, чтобы отчет показал его как неизвестный.
+        """
+        results = []
+        matched = set()
+        for path in extract_paths(alert_text):
+            path_matches = self.path_trie.match(path)
+            if not path_matches:
+                results.append(EndpointMatch(path, None))
+                continue
+            for position, match in path_matches[:limit]:
+                if position not in matched:
+                    matched.add(position)
+                    results.append(EndpointMatch(path, self.endpoints[position], match))
+
+        if not matched:
+            for host in extract_hosts(alert_text):
+                for position in self.hosts.get(host, ())[:limit]:
+                    if position not in matched:
+                        matched.add(position)
+                        results.append(EndpointMatch(None, self.endpoints[position], MATCH_HOST))
+        return results[:limit]
@@ -0,0 +1,130 @@
+"""Сопоставление путей запросов и хостов из текста алерта с каталогом эндпоинтов."""
+
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+# Путь запроса в алерте: "Dimension=/api/operator/v1/all_chats_status 500 POST".
+# Путь должен начинаться не внутри URL (перед "/" нет букв, точки, двоеточия или "/")
+PATH_RE = re.compile(r'(?<![\w.:/\-])(/[A-Za-z0-9_.~\-]+(?:/[A-Za-z0-9_.~{}\-]+)+)/?')
+# Хост из URL или отдельное доменное имя с точками
+URL_HOST_RE = re.compile(r'https?://([A-Za-z0-9\-.]+)')
+HOST_RE = re.compile(r'(?<![\w\-.])((?:[A-Za-z0-9\-]+\.){2,}[A-Za-z]{2,})(?![\w\-])')
+
+# Шаблоны сегментов пути: версии и идентификаторы сопоставляются с любым значением того же вида
+TEMPLATE_VERSION = "{version}"
+TEMPLATE_ID = "{id}"
+TEMPLATE_ANY = "*"
+_VERSION_SEGMENT_RE = re.compile(r'v\d+(?:\.\d+)*|\d+(?:\.\d+)+')
+_ID_SEGMENT_RE = re.compile(
+    r'\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|[0-9a-f]{16,}|ci\d{6,}'
+)
+_PLACEHOLDER_SEGMENT_RE = re.compile(r'\{[^}]*\}|:\w+')
+
+# Виды совпадений в порядке убывания точности
+MATCH_EXACT = "exact"
+MATCH_TEMPLATE = "template"
+MATCH_PREFIX = "prefix"
+MATCH_HOST = "host"
+
+# Минимальное число сегментов пути каталога для совпадения по префиксу
+MIN_PREFIX_SEGMENTS = 2
+
+
+@dataclass(frozen=True, slots=True)
+class EndpointMatch:
+    """
+    Эндпоинт каталога, найденный по пути или хосту из алерта.
+    endpoint равен None, если путь из алерта в каталоге не найден.
+    """
+    alert_path: Optional[str]
+    endpoint: Optional[dict]
+    match: Optional[str] = None
+
+
+def segment_key(segment: str) -> str:
+    """Ключ сегмента в дереве: шаблон для версий, идентификаторов и подстановок, иначе сам сегмент."""
+    segment = segment.lower()
+    if _PLACEHOLDER_SEGMENT_RE.fullmatch(segment):
+        return TEMPLATE_ANY
+    if _VERSION_SEGMENT_RE.fullmatch(segment):
+        return TEMPLATE_VERSION
+    if _ID_SEGMENT_RE.fullmatch(segment):
+        return TEMPLATE_ID
+    return segment
+
+
+def split_path(path: str) -> list[str]:
+    """Сегменты пути без строки запроса и пустых частей."""
+    return [segment for segment in path.split('?', 1)[0].split('/') if segment]
+
+
+def extract_paths(text: str) -> list[str]:
+    """Пути запросов из текста алерта в порядке появления, без повторов."""
+    return list(dict.fromkeys(match.group(1) for match in PATH_RE.finditer(text)))
+
+
+def extract_hosts(text: str) -> list[str]:
+    """Доменные имена из текста алерта (из URL и отдельные) в нижнем регистре, без повторов."""
+    hosts = [match.group(1) for match in URL_HOST_RE.finditer(text)]
+    hosts += [match.group(1) for match in HOST_RE.finditer(text)]
+    return list(dict.fromkeys(host.lower().rstrip('.') for host in hosts))
+
+
+class _PathNode:
+    __slots__ = ('children', 'endpoints')
+
+    def __init__(self):
+        self.children = {}
+        # (номер эндпоинта, сегменты пути каталога в нижнем регистре)
+        self.endpoints = []
+
+
+class PathTrie:
+    """
+    Дерево сегментов путей каталога. Сегменты-версии (v1, 5.0), идентификаторы
+    (числа, UUID, CI-коды) и подстановки ({id}, :id) хранятся как шаблоны,
+    поэтому /api/operator/v1/chats_status находит в каталоге и /api/operator/v2/chats_status.
+    Поиск идет по одному узлу на сегмент пути, время не зависит от размера каталога.
+    """
+
+    def __init__(self, paths: list[str]):
+        self._root = _PathNode()
+        for position, path in enumerate(paths):
+            segments = split_path(path)
+            if not segments:
+                continue
+            node = self._root
+            for segment in segments:
+                node = node.children.setdefault(segment_key(segment), _PathNode())
+            node.endpoints.append((position, tuple(segment.lower() for segment in segments)))
+
+    def match(self, path: str) -> list[tuple[int, str]]:
+        """
+        Номера эндпоинтов для пути и вид совпадения: exact - путь совпал целиком,
+        template - совпал с точностью до версий и идентификаторов, prefix - путь
+        каталога является началом пути из алерта. Точные совпадения идут первыми.
+        """
+        segments = [segment.lower() for segment in split_path(path)]
+        if not segments:
+            return []
+
+        full_matches = []
+        prefix_matches = []
+        # Обход в ширину по вариантам ключа сегмента: сам сегмент, его шаблон, подстановка
+        nodes = [self._root]
+        for depth, segment in enumerate(segments):
+            keys = dict.fromkeys((segment, segment_key(segment), TEMPLATE_ANY))
+            nodes = [child for node in nodes for key in keys if (child := node.children.get(key)) is not None]
+            if not nodes:
+                break
+            if depth + 1 < len(segments) and depth + 1 >= MIN_PREFIX_SEGMENTS:
+                prefix_matches = [entry for node in nodes for entry in node.endpoints] or prefix_matches
+        else:
+            full_matches = [entry for node in nodes for entry in node.endpoints]
+
+        if full_matches:
+            results = [(position, MATCH_EXACT if catalog_segments == tuple(segments) else MATCH_TEMPLATE)
+                       for position, catalog_segments in full_matches]
+            return sorted(results, key=lambda item: (item[1] != MATCH_EXACT, item[0]))
+        return [(position, MATCH_PREFIX) for position, _ in sorted(prefix_matches)]
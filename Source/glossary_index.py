@@ -0,0 +1,157 @@
+"""Индекс глоссария терминов: точный, префиксный и нечеткий поиск без обращения к модели."""
+
+import re
+from collections import defaultdict
+from typing import Optional
+
+# rapidfuzz нужен только для нечеткого поиска
+try:
+    from rapidfuzz import fuzz, process
+except ImportError:
+    fuzz = process = None
+
+# Слова - последовательности букв, цифр и подчеркиваний
+_WORD_RE = re.compile(r'\w+')
+# Сокращение в скобках после термина: "Автоматизированная система (АС)"
+_PARENTHESES_RE = re.compile(r'\(([^)]*)\)')
+
+# Виды совпадений в порядке убывания точности
+MATCH_EXACT = "exact"
+MATCH_PREFIX = "prefix"
+MATCH_WORDS = "words"
+MATCH_FUZZY = "fuzzy"
+
+
+def normalize_term(text: str) -> str:
+    """Приводит текст к виду для сравнения: casefold, ё -> е, только слова через один пробел."""
+    return ' '.join(_WORD_RE.findall(text.casefold().replace('ё', 'е')))
+
+
+def term_aliases(term: str) -> list[str]:
+    """
+    Нормализованные варианты написания термина: целиком, без пояснения в скобках
+    и само содержимое скобок (обычно сокращение).
+    """
+    aliases = [normalize_term(term), normalize_term(_PARENTHESES_RE.sub(' ', term))]
+    aliases += [normalize_term(inner) for inner in _PARENTHESES_RE.findall(term)]
+    return list(dict.fromkeys(alias for alias in aliases if alias))
+
+
+class _TrieNode:
+    __slots__ = ('children', 'positions')
+
+    def __init__(self):
+        self.children = {}
+        # Термины, у которых есть вариант с префиксом, ведущим в этот узел
+        self.positions = set()
+
+
+class GlossaryIndex:
+    """
+    Индекс глоссария, строится один раз при загрузке.
+
+    - Словарь вариантов написания: точное совпадение за одно обращение.
+    - Префиксное дерево: в него добавлены все варианты термина и их хвосты,
+      начинающиеся с каждого слова, поэтому префикс находит и "система" в
+      "Автоматизированная система". Каждый узел хранит номера терминов своего
+      поддерева, и поиск по префиксу занимает время, пропорциональное его длине.
+    - Инвертированный индекс слов терминов: запрос из нескольких слов в любом порядке.
+    - Нечеткий поиск (rapidfuzz) по вариантам написания - при опечатках.
+    """
+
+    def __init__(self, entries: list[dict]):
+        self.entries = entries
+        self.exact = {}
+        self.words = defaultdict(set)
+        self._root = _TrieNode()
+        self._alias_choices = []
+        self._alias_positions = []
+
+        for position, entry in enumerate(entries):
+            for alias in term_aliases(entry.get('term', '')):
+                self.exact.setdefault(alias, position)
+                self._alias_choices.append(alias)
+                self._alias_positions.append(position)
+                words = alias.split(' ')
+                for start in range(len(words)):
+                    self._insert(' '.join(words[start:]), position)
+                for word in words:
+                    self.words[word].add(position)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _insert(self, key: str, position: int) -> None:
+        node = self._root
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+            node.positions.add(position)
+
+    def prefix_positions(self, prefix: str) -> set:
+        """Номера терминов, у которых какое-либо слово (вместе с продолжением) начинается с prefix."""
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        return node.positions
+
+    def lookup(self, query: str, limit: int = 5, threshold: float = 0.75) -> list[tuple[dict, str, float]]:
+        """
+        Поиск термина. Сначала точное совпадение, затем префикс, затем все слова
+        запроса (допускаются начала слов), затем нечеткое сходство не ниже threshold.
+
+        Returns:
+            Список (запись глоссария, вид совпадения, оценка от 0 до 1)
+        """
+        query = normalize_term(query)
+        if not query or limit <= 0:
+            return []
+
+        position = self.exact.get(query)
+        if position is not None:
+            return [(self.entries[position], MATCH_EXACT, 1.0)]
+
+        positions = self.prefix_positions(query)
+        if positions:
+            return self._ranked(positions, MATCH_PREFIX, limit)
+
+        postings = [self._word_positions(word) for word in query.split(' ')]
+        positions = set.intersection(*postings) if postings else set()
+        if positions:
+            return self._ranked(positions, MATCH_WORDS, limit)
+
+        return self.fuzzy_lookup(query, limit, threshold)
+
+    def _word_positions(self, word: str) -> set:
+        positions = set(self.words.get(word, ()))
+        positions |= self.prefix_positions(word)
+        return positions
+
+    def _ranked(self, positions: set, match: str, limit: int) -> list[tuple[dict, str, float]]:
+        """Более короткие термины точнее соответствуют запросу; при равной длине - порядок глоссария."""
+        ranked = sorted(positions, key=lambda position: (len(self.entries[position].get('term', '')), position))
+        return [(self.entries[position], match, 1.0) for position in ranked[:limit]]
+
+    def fuzzy_lookup(self, query: str, limit: int = 5, threshold: float = 0.75) -> list[tuple[dict, str, float]]:
+        """Нечеткий поиск по вариантам написания терминов (опечатки, другая форма слова)."""
+        query = normalize_term(query)
+        if process is None or not query or limit <= 0:
+            return []
+
+        best_scores = {}
+        for _, score, choice_index in process.extract(
+            query, self._alias_choices, scorer=fuzz.WRatio, processor=None,
+            limit=limit * 3, score_cutoff=threshold * 100,
+        ):
+            position = self._alias_positions[choice_index]
+            if score > best_scores.get(position, -1):
+                best_scores[position] = score
+
+        ranked = sorted(best_scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [(self.entries[position], MATCH_FUZZY, score / 100) for position, score in ranked]
+
+    def get(self, term: str) -> Optional[dict]:
+        """Запись глоссария по точному написанию термина (без учета регистра и ё)."""
+        position = self.exact.get(normalize_term(term))
+        return None if position is None else self.entries[position]
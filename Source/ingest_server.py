@@ -0,0 +1,393 @@
+"""
+Прием алертов по HTTP: система мониторинга отправляет алерты АС Рефлекс POST-запросом,
+они ставятся в ограниченную очередь и анализируются пулом обработчиков, результаты
+дописываются в JSONL. Если очередь заполнена, запрос отклоняется с кодом 429.
+
+Сервер написан на asyncio без сторонних зависимостей и по умолчанию слушает только localhost.
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Optional
+
+from Source.alert_reader import split_alerts
+from Source.alert_history import alert_hash
+from Source.batch import record_to_dict
+
+logger = logging.getLogger('tool_logger')
+
+# Адреса, на которых сервер доступен только с этой машины
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+# Ограничения на запрос: строка запроса и заголовки, число заголовков
+MAX_HEADER_LINE = 8192
+MAX_HEADERS = 100
+# Сколько секунд ждать следующий запрос в открытом соединении
+KEEP_ALIVE_TIMEOUT = 15.0
+# За сколько секунд клиент должен передать заголовки и тело начатого запроса
+READ_TIMEOUT = 10.0
+
+HTTP_REASONS = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    408: "Request Timeout", 411: "Length Required", 413: "Payload Too Large",
+    429: "Too Many Requests", 431: "Request Header Fields Too Large", 503: "Service Unavailable",
+}
+
+
+class BadRequest(Exception):
+    """Запрос нельзя обработать: код ответа и пояснение."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_payload(body: bytes, content_type: str) -> list[str]:
+    """
+    Алерты из тела запроса. JSON: строка, список строк или объект с полем
+    alert, alerts или text. Иначе тело - текст алертов, он делится на алерты
+    по тем же правилам, что и файл.
+    """
+    if content_type.split(';', 1)[0].strip().lower() != 'application/json':
+        return split_alerts(body)
+    try:
+        payload = json.loads(body.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise BadRequest(400, f"Некорректный JSON: {str(e)}")
+    if isinstance(payload, dict):
+        payload = payload.get('alerts', payload.get('alert', payload.get('text')))
+    if isinstance(payload, str):
+        payload = [payload]
+    if not isinstance(payload, list) or not all(isinstance(alert, str) for alert in payload):
+        raise BadRequest(400, "Ожидается текст алерта, список текстов или объект с полем alert, alerts или text")
+    return [alert.strip() for alert in payload if alert.strip()]
+
+
+class JsonlSink:
+    """Запись результатов анализа в JSONL: одна строка на алерт, файл дописывается."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def write(self, data: dict) -> None:
+        line = json.dumps(data, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class IngestServer:
+    """
+    HTTP-сервер приема алертов.
+
+    - POST /alerts - алерты ставятся в очередь (ответ 202 с идентификаторами).
+      Запрос принимается целиком или отклоняется целиком: если в очереди нет места
+      для всех его алертов, ответ 429 с заголовком Retry-After. Запрос, в котором
+      алертов больше, чем помещается в пустую очередь, отклоняется с кодом 413 -
+      повтор ему не поможет.
+    - GET /health - состояние очереди и счетчики.
+    - GET /metrics - метрики процесса в формате Prometheus.
+
+    Обработчики (workers) забирают алерты из очереди и выполняют analyze в пуле
+    потоков того же размера: разбор, сопоставление с каталогом и запрос к модели
+    не блокируют прием новых алертов.
+    """
+
+    def __init__(self, analyze: Callable, sink: JsonlSink, host: str = "127.0.0.1", port: int = 8085,
+                 queue_size: int = 1000, workers: int = 4, max_body_bytes: int = 1024 * 1024,
+                 retry_after: int = 1, read_timeout: float = READ_TIMEOUT, metrics=None):
+        self.analyze = analyze
+        self.sink = sink
+        self.host = host
+        self.port = port
+        self.queue_size = max(1, queue_size)
+        self.workers = max(1, workers)
+        self.max_body_bytes = max_body_bytes
+        self.retry_after = retry_after
+        self.read_timeout = read_timeout
+        self.metrics = metrics
+        self._queue = None
+        self._server = None
+        self._stopping = None
+        self._connections = {}
+        self._counters = {'accepted': 0, 'rejected': 0, 'processed': 0, 'failed': 0, 'in_progress': 0}
+        if metrics is not None:
+            metrics.register_gauges("ingest", self.stats)
+
+    def stats(self) -> dict:
+        """Счетчики для метрик и /health: размер очереди, принятые, отклоненные и обработанные алерты."""
+        depth = self._queue.qsize() if self._queue is not None else 0
+        return {'queue_depth': depth, 'queue_size': self.queue_size, **self._counters}
+
+    # Обработка алертов
+
+    def _process(self, item: dict) -> dict:
+        """Анализ одного алерта в потоке пула; результат сразу записывается в sink."""
+        started = time.perf_counter()
+        result = {'id': item['id'], 'received_at': item['received_at'], 'alert_hash': alert_hash(item['text'])}
+        try:
+            analysis = self.analyze(item['text'])
+            if analysis.error is not None:
+                result['error'] = analysis.error
+            else:
+                result.update(record_to_dict(analysis.record))
+                result['endpoints'] = [
+                    {'alert_path': match.alert_path, 'match': match.match,
+                     'request': match.endpoint.get('request') if match.endpoint else None,
+                     'host': match.endpoint.get('host') if match.endpoint else None,
+                     'direction': match.endpoint.get('direction') if match.endpoint else None}
+                    for match in analysis.endpoints
+                ]
+                result['analysis'] = analysis.bot_response
+        except Exception as e:
+            logger.error(f"Ошибка анализа принятого алерта {item['id']}: {str(e)}", exc_info=True)
+            result['error'] = str(e)
+        result['processed_at'] = datetime.now().isoformat()
+        self.sink.write(result)
+        if self.metrics is not None:
+            self.metrics.observe_latency("ingest", "analyze_alert", time.perf_counter() - started,
+                                         "error" if 'error' in result else "ok")
+        return result
+
+    async def _worker(self) -> None:
+        while True:
+            item = await self._queue.get()
+            self._counters['in_progress'] += 1
+            try:
+                result = await asyncio.to_thread(self._process, item)
+                self._counters['failed' if 'error' in result else 'processed'] += 1
+            except Exception as e:
+                # Ошибка записи результата не должна останавливать обработчик
+                logger.error(f"Ошибка обработчика очереди алертов: {str(e)}", exc_info=True)
+                self._counters['failed'] += 1
+            finally:
+                self._counters['in_progress'] -= 1
+                self._queue.task_done()
+
+    def enqueue(self, alerts: list[str]) -> Optional[list[str]]:
+        """Ставит алерты в очередь. None, если места для всех нет (запрос отклоняется целиком)."""
+        if self._stopping.is_set() or self.queue_size - self._queue.qsize() < len(alerts):
+            self._counters['rejected'] += len(alerts)
+            return None
+        received_at = datetime.now().isoformat()
+        ids = []
+        for text in alerts:
+            item = {'id': uuid.uuid4().hex, 'received_at': received_at, 'text': text}
+            self._queue.put_nowait(item)
+            ids.append(item['id'])
+        self._counters['accepted'] += len(alerts)
+        return ids
+
+    # HTTP
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[tuple]:
+        """Читает один запрос: (метод, путь, заголовки, тело) или None, если клиент закрыл соединение."""
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+        except ValueError:
+            raise BadRequest(431, "Слишком длинная строка запроса")
+        if not request_line:
+            return None
+        parts = request_line.decode('latin-1').split()
+        if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+            raise BadRequest(400, "Некорректная строка запроса")
+        method, target, version = parts
+
+        # Медленный клиент не должен занимать соединение бесконечно
+        try:
+            async with asyncio.timeout(self.read_timeout):
+                headers = await self._read_headers(reader)
+                headers['__version__'] = version
+                length = self._content_length(headers)
+                body = await reader.readexactly(length) if length else b''
+        except TimeoutError:
+            raise BadRequest(408, f"Запрос не получен за {self.read_timeout:g} с")
+        return method.upper(), target.split('?', 1)[0], headers, body
+
+    @staticmethod
+    async def _read_headers(reader: asyncio.StreamReader) -> dict:
+        headers = {}
+        for _ in range(MAX_HEADERS + 1):
+            try:
+                line = await reader.readline()
+            except ValueError:
+                raise BadRequest(431, "Слишком длинный заголовок")
+            if line in (b'\r\n', b'\n', b''):
+                return headers
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        raise BadRequest(431, "Слишком много заголовков")
+
+    def _content_length(self, headers: dict) -> int:
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise BadRequest(411, "Нужен заголовок Content-Length")
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise BadRequest(400, "Некорректный Content-Length")
+        if length < 0:
+            raise BadRequest(400, "Некорректный Content-Length")
+        if length > self.max_body_bytes:
+            raise BadRequest(413, f"Тело запроса больше {self.max_body_bytes} байт")
+        return length
+
+    def _route(self, method: str, path: str, headers: dict, body: bytes) -> tuple:
+        """Ответ на запрос: (код, тело, дополнительные заголовки)."""
+        if path == '/alerts':
+            if method != 'POST':
+                return 405, {'error': "Допустим только POST"}, {'Allow': 'POST'}
+            alerts = parse_payload(body, headers.get('content-type', ''))
+            if not alerts:
+                raise BadRequest(400, "В запросе нет алертов")
+            if len(alerts) > self.queue_size:
+                self._counters['rejected'] += len(alerts)
+                raise BadRequest(413, f"В запросе {len(alerts)} алертов, в очередь помещается не больше {self.queue_size}")
+            ids = self.enqueue(alerts)
+            if ids is None:
+                if self._stopping.is_set():
+                    return 503, {'error': "Сервер останавливается"}, {}
+                return 429, {'error': "Очередь алертов заполнена", 'queue_depth': self._queue.qsize()}, \
+                    {'Retry-After': str(self.retry_after)}
+            return 202, {'accepted': len(ids), 'ids': ids, 'queue_depth': self._queue.qsize()}, {}
+        if path == '/health':
+            if method != 'GET':
+                return 405, {'error': "Допустим только GET"}, {'Allow': 'GET'}
+            return 200, {'status': "stopping" if self._stopping.is_set() else "ok", **self.stats()}, {}
+        if path == '/metrics' and self.metrics is not None:
+            if method != 'GET':
+                return 405, {'error': "Допустим только GET"}, {'Allow': 'GET'}
+            return 200, self.metrics.to_prometheus(), {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+        return 404, {'error': f"Неизвестный путь: {path}"}, {}
+
+    @staticmethod
+    def _response(status: int, body, headers: dict, keep_alive: bool) -> bytes:
+        if isinstance(body, str):
+            data = body.encode('utf-8')
+        else:
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            headers = {'Content-Type': 'application/json; charset=utf-8', **headers}
+        lines = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}",
+                 f"Content-Length: {len(data)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + data
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Соединение обслуживает запросы по очереди, пока клиент его не закроет (keep-alive)."""
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except BadRequest as e:
+                    # После ошибки разбора граница следующего запроса неизвестна - соединение закрывается
+                    writer.write(self._response(e.status, {'error': str(e)}, {}, keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close' \
+                    and headers['__version__'] != 'HTTP/1.0'
+                try:
+                    status, response_body, response_headers = self._route(method, path, headers, body)
+                except BadRequest as e:
+                    status, response_body, response_headers = e.status, {'error': str(e)}, {}
+                writer.write(self._response(status, response_body, response_headers, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    # Запуск и остановка
+
+    async def serve(self, ready: Optional[Callable] = None) -> None:
+        """
+        Запускает прием и обработчики и работает до отмены (Ctrl+C). При остановке
+        новые алерты не принимаются, а уже принятые дообрабатываются.
+        """
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        # asyncio.to_thread использует пул потоков цикла по умолчанию - его размер равен числу обработчиков
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest-worker")
+        loop.set_default_executor(executor)
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_LINE + 2)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Прием алертов на http://{self.host}:{self.port}/alerts, "
+                    f"очередь {self.queue_size}, обработчиков {self.workers}")
+        if ready is not None:
+            ready(self)
+        try:
+            await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._stopping.set()
+            self._server.close()
+            logger.info(f"Остановка приема алертов, в очереди: {self._queue.qsize()}")
+            await self._queue.join()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            # Открытые соединения (keep-alive) закрываются после обработки принятых алертов
+            connections = list(self._connections.items())
+            for writer, _ in connections:
+                writer.close()
+            await asyncio.gather(*(task for _, task in connections), return_exceptions=True)
+            self.sink.close()
+            logger.info(f"Прием алертов остановлен: {self.stats()}")
+
+
+def create_ingest_server(ingest_settings: dict, root_dir: str, analyze: Callable, metrics=None) -> IngestServer:
+    """
+    Создает сервер приема алертов по разделу ingest из настроек.
+    Относительный путь к файлу результатов считается от корня проекта.
+    """
+    sink_path = ingest_settings.get("sink_path", "Logs/ingest_results.jsonl")
+    if not os.path.isabs(sink_path):
+        sink_path = os.path.join(root_dir, sink_path)
+    host = ingest_settings.get("host", "127.0.0.1")
+    if host not in LOOPBACK_HOSTS:
+        logger.warning(f"Прием алертов открыт не только для localhost: {host}")
+    return IngestServer(
+        analyze, JsonlSink(sink_path), host=host,
+        port=ingest_settings.get("port", 8085),
+        queue_size=ingest_settings.get("queue_size", 1000),
+        workers=ingest_settings.get("workers", 4),
+        max_body_bytes=ingest_settings.get("max_body_bytes", 1024 * 1024),
+        retry_after=ingest_settings.get("retry_after", 1),
+        read_timeout=ingest_settings.get("read_timeout", READ_TIMEOUT),
+        metrics=metrics,
+    )
@@ -0,0 +1,253 @@
+"""
+Сменные модели чата для запусков без сети: запись ответов GigaChat в кассету,
+воспроизведение кассеты с искусственной задержкой и детерминированная модель-заглушка.
+
+Модель выбирается параметром backend раздела llm настроек (или переменной
+окружения LLM_BACKEND): gigachat, record, replay, fake.
+"""
+
+import os
+import re
+import abc
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from Source.alert_parser import PROBLEM_ID_RE
+
+logger = logging.getLogger('tool_logger')
+
+BACKENDS = ("gigachat", "record", "replay", "fake")
+
+# Сколько символов запроса повторяет в ответе модель-заглушка
+FAKE_ECHO_CHARS = 80
+
+# Инструмент, который модель-заглушка вызывает для запроса с текстом алерта (номером проблемы)
+FAKE_ALERT_TOOL = "Data Alert Parser"
+
+
+def _tool_names(tools: Optional[list]) -> list[str]:
+    return sorted(tool.get('function', {}).get('name', '') for tool in tools or [])
+
+
+def cassette_key(messages: list[BaseMessage], tools: Optional[list] = None) -> str:
+    """
+    Ключ запроса в кассете: тип, текст и вызовы инструментов каждого сообщения
+    и имена доступных инструментов. Идентификаторы сообщений и время в ключ не входят.
+    """
+    payload = [
+        [message.type, message.content, [(call['name'], call['args']) for call in getattr(message, 'tool_calls', None) or []]]
+        for message in messages
+    ]
+    data = json.dumps([payload, _tool_names(tools)], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class Cassette:
+    """
+    Файл с парами запрос-ответ: {ключ: [ответ, ...]}. Для одного ключа хранится
+    последовательность ответов, при воспроизведении они выдаются по порядку,
+    последний повторяется. Файл перезаписывается атомарно после каждой записи.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries = {}
+        self._positions = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+            logger.info(f"Кассета {path}: {len(self._entries)} запросов")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def append(self, key: str, message: BaseMessage) -> None:
+        with self._lock:
+            self._entries.setdefault(key, []).append(message_to_dict(message))
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+
+    def next(self, key: str) -> Optional[BaseMessage]:
+        with self._lock:
+            responses = self._entries.get(key)
+            if not responses:
+                return None
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            return messages_from_dict([responses[min(position, len(responses) - 1)]])[0]
+
+
+class _OfflineChatModel(BaseChatModel):
+    """Общая часть моделей без обращения к API: привязка инструментов и искусственная задержка."""
+
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _latency(self) -> float:
+        return max(0.0, self.latency + random.uniform(-self.latency_jitter, self.latency_jitter))
+
+    @abc.abstractmethod
+    def _respond(self, messages: list[BaseMessage], tools: Optional[list]) -> AIMessage:
+        """Ответ модели на запрос; tools - привязанные инструменты в формате OpenAI."""
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        delay = self._latency()
+        if delay:
+            time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, kwargs.get('tools')))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        # Задержка не занимает поток, поэтому параллельные запросы ведут себя как сетевые
+        delay = self._latency()
+        if delay:
+            await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, kwargs.get('tools')))])
+
+
+class FakeChatModel(_OfflineChatModel):
+    """
+    Детерминированная модель-заглушка: ответ зависит только от текста запроса.
+    Количество токенов оценивается по числу слов.
+
+    Если к модели привязаны инструменты и последнее сообщение - вопрос пользователя,
+    заглушка вызывает инструмент, названный в вопросе (аргумент - остальной текст
+    вопроса), а для вопроса с номером проблемы - FAKE_ALERT_TOOL. На результат
+    инструмента модель отвечает текстом.
+    """
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-alert-agent"
+
+    def _respond(self, messages, tools) -> AIMessage:
+        prompt = str(messages[-1].content) if messages else ""
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        input_tokens = sum(len(str(message.content).split()) for message in messages)
+        tool_call = self._tool_call(prompt, tools) if messages and messages[-1].type == "human" else None
+        if tool_call is not None:
+            content, tool_calls = "", [{**tool_call, 'id': f"fake-call-{digest}", 'type': "tool_call"}]
+        else:
+            echo = ' '.join(prompt.split())[:FAKE_ECHO_CHARS]
+            content, tool_calls = f"Тестовый ответ {digest}: {echo}", []
+        output_tokens = len(content.split()) + len(tool_calls)
+        return AIMessage(content=content, tool_calls=tool_calls, usage_metadata={
+            'input_tokens': input_tokens, 'output_tokens': output_tokens,
+            'total_tokens': input_tokens + output_tokens,
+        })
+
+    @staticmethod
+    def _tool_call(prompt: str, tools: Optional[list]) -> Optional[dict]:
+        """Вызов инструмента ({name, args}) для вопроса пользователя или None, если вопрос его не требует."""
+        functions = {tool['function']['name']: tool['function'] for tool in tools or [] if 'function' in tool}
+        mentioned = [name for name in functions if name.lower() in prompt.lower()]
+        if mentioned:
+            # Из нескольких названий выбирается самое длинное ("Data Alert Parser", а не "Alert")
+            name = max(mentioned, key=len)
+            argument = re.sub(re.escape(name), ' ', prompt, flags=re.IGNORECASE)
+            argument = ' '.join(argument.split()).strip(' :,-')
+        elif FAKE_ALERT_TOOL in functions and PROBLEM_ID_RE.search(prompt):
+            name, argument = FAKE_ALERT_TOOL, prompt
+        else:
+            return None
+        # Текст передается в первый параметр инструмента; у инструментов без параметров аргументов нет
+        properties = functions[name].get('parameters', {}).get('properties', {})
+        return {'name': name, 'args': {next(iter(properties)): argument} if properties else {}}
+
+
+class ReplayChatModel(_OfflineChatModel):
+    """
+    Воспроизведение ответов из кассеты с искусственной задержкой. Для запроса,
+    которого нет в кассете, отвечает модель-заглушка (fallback_to_fake)
+    или выбрасывается LookupError.
+    """
+
+    cassette: Any
+    fallback_to_fake: bool = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay-alert-agent"
+
+    def _respond(self, messages, tools) -> AIMessage:
+        message = self.cassette.next(cassette_key(messages, tools))
+        if message is not None:
+            return message
+        if not self.fallback_to_fake:
+            raise LookupError(f"В кассете {self.cassette.path} нет ответа на запрос")
+        logger.info("Запроса нет в кассете, отвечает модель-заглушка")
+        return FakeChatModel()._respond(messages, tools)
+
+
+class RecordingChatModel(BaseChatModel):
+    """
+    Запись ответов: запрос передается настоящей модели (inner), ответ
+    сохраняется в кассету под ключом запроса.
+    """
+
+    inner: Any
+    cassette: Any
+    tools: Optional[list] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "recording-alert-agent"
+
+    def bind_tools(self, tools, **kwargs):
+        # Инструменты привязываются к настоящей модели в ее формате, ключ кассеты - по общему формату
+        return RecordingChatModel(inner=self.inner.bind_tools(tools, **kwargs), cassette=self.cassette,
+                                  tools=[convert_to_openai_tool(tool) for tool in tools])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self.inner.invoke(messages, stop=stop, **kwargs)
+        self.cassette.append(cassette_key(messages, self.tools), message)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = await self.inner.ainvoke(messages, stop=stop, **kwargs)
+        self.cassette.append(cassette_key(messages, self.tools), message)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def create_chat_model(llm_settings: dict, root_dir: str, gigachat_factory: Callable[[], BaseChatModel]) -> BaseChatModel:
+    """
+    Создает модель чата по разделу llm настроек. Переменная окружения LLM_BACKEND
+    имеет приоритет над параметром backend. Относительный путь к кассете считается от корня проекта.
+    """
+    backend = os.getenv("LLM_BACKEND") or llm_settings.get("backend", "gigachat")
+    if backend not in BACKENDS:
+        raise ValueError(f"Неизвестная модель чата: {backend}. Допустимые значения: {', '.join(BACKENDS)}")
+    if backend == "gigachat":
+        return gigachat_factory()
+
+    latency = {'latency': llm_settings.get("replay_latency", 0.0),
+               'latency_jitter': llm_settings.get("replay_latency_jitter", 0.0)}
+    logger.info(f"Модель чата: {backend}")
+    if backend == "fake":
+        return FakeChatModel(**latency)
+
+    cassette_path = llm_settings.get("cassette_path", "Logs/llm_cassette.json")
+    if not os.path.isabs(cassette_path):
+        cassette_path = os.path.join(root_dir, cassette_path)
+    cassette = Cassette(cassette_path)
+    if backend == "record":
+        return RecordingChatModel(inner=gigachat_factory(), cassette=cassette)
+    return ReplayChatModel(cassette=cassette, fallback_to_fake=llm_settings.get("replay_fallback_to_fake", True),
+                           **latency)
@@ -0,0 +1,140 @@
+"""Кэш ответов модели для повторяющихся запросов анализа алертов."""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger('tool_logger')
+
+
+class ResponseCache:
+    """
+    LRU-кэш ответов модели с временем жизни записей и счетчиками попаданий.
+
+    Ключ - хэш нормализованного промпта и данных алерта. Если задан
+    persist_path, кэш загружается из JSON-файла при создании и сохраняется
+    в него после каждой новой записи.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600,
+                 persist_path: Optional[str] = None, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self.enabled = enabled and max_entries > 0
+        self.hits = 0
+        self.misses = 0
+        # key -> (время истечения по time.time(), ответ)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if self.enabled and self.persist_path:
+            self._load()
+
+    @staticmethod
+    def make_key(prompt: str, alert_data: dict = None, **params) -> str:
+        """
+        Строит ключ кэша: пробелы в промпте схлопываются, данные алерта
+        и дополнительные параметры сериализуются с сортировкой ключей.
+        """
+        normalized = {
+            'prompt': ' '.join(prompt.split()),
+            'alert_data': alert_data or {},
+            'params': params,
+        }
+        payload = json.dumps(normalized, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Возвращает ответ из кэша или None, если записи нет или она устарела."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: str) -> None:
+        """Сохраняет ответ, вытесняя самые давно использованные записи."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self.persist_path:
+                self._save()
+
+    def clear(self) -> None:
+        """Очищает кэш и счетчики."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            if self.persist_path:
+                self._save()
+
+    def stats(self) -> dict:
+        """Статистика кэша: попадания, промахи, доля попаданий и размер."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'size': len(self._entries),
+            }
+
+    def _load(self) -> None:
+        """Загружает неустаревшие записи из файла кэша."""
+        if not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Не удалось загрузить кэш ответов из {self.persist_path}: {str(e)}")
+            return
+        now = time.time()
+        for key, (expires_at, value) in data.items():
+            if expires_at >= now:
+                self._entries[key] = (expires_at, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        logger.info(f"Загружено {len(self._entries)} записей кэша ответов из {self.persist_path}")
+
+    def _save(self) -> None:
+        """Атомарно записывает кэш в файл (через временный файл)."""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.persist_path)), exist_ok=True)
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(dict(self._entries), f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            logger.error(f"Не удалось сохранить кэш ответов в {self.persist_path}: {str(e)}")
+
+
+def create_response_cache(cache_settings: dict, root_dir: str) -> ResponseCache:
+    """Создает кэш по разделу llm_cache из настроек. Относительный путь считается от корня проекта."""
+    persist_path = cache_settings.get("persist_path")
+    if persist_path and not os.path.isabs(persist_path):
+        persist_path = os.path.join(root_dir, persist_path)
+    return ResponseCache(
+        max_entries=cache_settings.get("max_entries", 1024),
+        ttl_seconds=cache_settings.get("ttl_seconds", 3600),
+        persist_path=persist_path,
+        enabled=cache_settings.get("enabled", True),
+    )
@@ -0,0 +1,278 @@
+"""Вызовы GigaChat с повторами, экспоненциальной задержкой со случайным разбросом и автоматическим выключателем."""
+
+import time
+import random
+import asyncio
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+logger = logging.getLogger('tool_logger')
+
+# Состояния автоматического выключателя
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# HTTP-коды ответа, при которых запрос имеет смысл повторить
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Выключатель, пробный вызов которого занял блок guard в текущем контексте. Контекст
+# наследуют инструменты агента в пуле потоков LangChain и задачи фонового цикла событий
+_held_probe = contextvars.ContextVar('llm_held_probe', default=None)
+
+
+class CircuitOpenError(Exception):
+    """API модели считается недоступным: вызов отклонен без обращения к сети."""
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """
+    Ошибка связана с недоступностью API (сеть, таймаут, 429, 5xx) и запрос можно повторить.
+    Ошибки запроса (400, 401, 422 и т.п.) не повторяются и не размыкают выключатель.
+    """
+    import httpx
+    from gigachat.exceptions import ResponseError
+
+    if isinstance(error, (httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    return isinstance(error, ResponseError) and error.status_code in RETRY_STATUS_CODES
+
+
+def _retry_after(error: BaseException) -> float:
+    """Задержка из заголовка Retry-After ответа 429 (0, если заголовка нет)."""
+    return getattr(error, 'retry_after', 0.0) if getattr(error, 'status_code', None) == 429 else 0.0
+
+
+class CircuitBreaker:
+    """
+    Автоматический выключатель: после failure_threshold подряд неудачных вызовов
+    размыкается на reset_timeout секунд, и вызовы сразу отклоняются. Затем один
+    пробный вызов (полуоткрытое состояние) решает, замкнуть выключатель или снова разомкнуть.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._opened_total = 0
+        self._rejected_total = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Можно ли выполнить вызов. В полуоткрытом состоянии пропускается один пробный вызов."""
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._rejected_total += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("API модели снова доступен, выключатель замкнут")
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._opened_total += 1
+                    logger.warning(f"API модели недоступен ({self._failures} ошибок подряд), "
+                                   f"вызовы отклоняются {self.reset_timeout:g} с")
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Пробный вызов завершился ошибкой запроса (не доступности): следующий вызов тоже будет пробным."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self) -> dict:
+        """Счетчики для метрик: состояние (0 - замкнут, 1 - полуоткрыт, 2 - разомкнут)."""
+        state = self.state
+        with self._lock:
+            return {
+                'state': {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}[state],
+                'consecutive_failures': self._failures,
+                'opened_total': self._opened_total,
+                'rejected_total': self._rejected_total,
+            }
+
+
+class LLMClient:
+    """
+    Обертка вызовов модели: ограниченное число повторов при недоступности API
+    с экспоненциальной задержкой и полным случайным разбросом (full jitter)
+    и общий автоматический выключатель для всех вызовов процесса.
+    """
+
+    def __init__(self, max_retries: int = 2, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+
+    def available(self) -> bool:
+        """False, пока выключатель разомкнут (без учета пробного вызова)."""
+        return self.breaker.state != OPEN
+
+    def _delay(self, attempt: int, error: BaseException) -> float:
+        backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(backoff, _retry_after(error))
+
+    def _before_call(self) -> None:
+        if _held_probe.get() is self.breaker and self.breaker.state == HALF_OPEN:
+            # Вложенный вызов внутри guard, который уже занял пробный вызов, выполняется в его рамках
+            return
+        if not self.breaker.allow():
+            raise CircuitOpenError("API GigaChat временно недоступен")
+
+    def _should_retry(self, error: BaseException, attempt: int) -> bool:
+        """Учитывает ошибку в выключателе и решает, повторять ли вызов."""
+        if not is_retryable_error(error):
+            self.breaker.release_probe()
+            return False
+        if attempt < self.max_retries and self.breaker.state == CLOSED:
+            logger.warning(f"Ошибка вызова модели, попытка {attempt + 1} из {self.max_retries + 1}: {str(error)}")
+            return True
+        self.breaker.record_failure()
+        return False
+
+    @contextmanager
+    def _release_probe_on_interrupt(self):
+        """
+        Прерывание вызова (Ctrl+C, отмена задачи, остановка процесса) не говорит о доступности
+        API: пробный вызов освобождается, иначе выключатель остался бы полуоткрытым навсегда.
+        """
+        try:
+            yield
+        except Exception:
+            raise
+        except BaseException:
+            self.breaker.release_probe()
+            raise
+
+    def call(self, func: Callable, *args, **kwargs):
+        """Синхронный вызов func с повторами. Если выключатель разомкнут - CircuitOpenError."""
+        self._before_call()
+        attempt = 0
+        with self._release_probe_on_interrupt():
+            while True:
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    if not self._should_retry(e, attempt):
+                        raise
+                    time.sleep(self._delay(attempt, e))
+                    attempt += 1
+                    continue
+                self.breaker.record_success()
+                return result
+
+    async def acall(self, func: Callable, *args, **kwargs):
+        """Асинхронный вариант call для корутинных функций (model.ainvoke)."""
+        self._before_call()
+        attempt = 0
+        with self._release_probe_on_interrupt():
+            while True:
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    if not self._should_retry(e, attempt):
+                        raise
+                    await asyncio.sleep(self._delay(attempt, e))
+                    attempt += 1
+                    continue
+                self.breaker.record_success()
+                return result
+
+    @contextmanager
+    def guard(self):
+        """
+        Защита вызова без повторов (ход агента с инструментами повторять нельзя):
+        проверяет выключатель и учитывает исход блока. Если блок занял пробный
+        вызов, вложенные call и acall того же контекста (инструменты агента)
+        выполняются в рамках этой пробы, а не отклоняются.
+        """
+        self._before_call()
+        token = _held_probe.set(self.breaker if self.breaker.state == HALF_OPEN else None)
+        try:
+            with self._release_probe_on_interrupt():
+                try:
+                    yield
+                except Exception as e:
+                    if is_retryable_error(e):
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.release_probe()
+                    raise
+        finally:
+            _held_probe.reset(token)
+        self.breaker.record_success()
+
+
+def model_options(llm_settings: dict) -> dict:
+    """
+    Параметры клиента GigaChat из раздела llm настроек: пул соединений (max_connections),
+    таймаут и адрес API. Повторы выполняет LLMClient, поэтому встроенные повторы отключены.
+    """
+    options = {
+        'model': llm_settings.get("model", "GigaChat-2"),
+        'timeout': llm_settings.get("timeout", 30.0),
+        'max_connections': llm_settings.get("max_connections", 10),
+        'verify_ssl_certs': llm_settings.get("verify_ssl_certs", False),
+        'max_retries': 0,
+    }
+    for key in ("base_url", "auth_url", "access_token"):
+        if llm_settings.get(key):
+            options[key] = llm_settings[key]
+    return options
+
+
+def call_timeout(llm_settings: dict) -> float:
+    """
+    Наибольшее время одного вызова модели с повторами: таймаут запроса на каждую
+    попытку (max_retries + 1) и наибольшая пауза перед каждым повтором.
+    """
+    max_retries = max(0, llm_settings.get("max_retries", 2))
+    return (llm_settings.get("timeout", 30.0) * (max_retries + 1)
+            + llm_settings.get("backoff_max", 8.0) * max_retries)
+
+
+def create_llm_client(llm_settings: dict, root_dir: str) -> LLMClient:
+    """Создает клиент вызовов модели по разделу llm из настроек."""
+    return LLMClient(
+        max_retries=llm_settings.get("max_retries", 2),
+        backoff_base=llm_settings.get("backoff_base", 0.5),
+        backoff_max=llm_settings.get("backoff_max", 8.0),
+        breaker=CircuitBreaker(
+            failure_threshold=llm_settings.get("failure_threshold", 5),
+            reset_timeout=llm_settings.get("reset_timeout", 30.0),
+        ),
+    )
@@ -0,0 +1,293 @@
+"""Метрики задержек и токенов инструментов и вызовов модели с экспортом в формате Prometheus и JSON."""
+
+import os
+import json
+import time
+import logging
+import threading
+import functools
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Optional
+
+logger = logging.getLogger('tool_logger')
+
+# Префикс имен метрик Prometheus
+METRIC_PREFIX = "alert_agent"
+
+# Границы корзин гистограммы задержек, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class LatencyHistogram:
+    """Гистограмма задержек с фиксированными корзинами (как histogram в Prometheus)."""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # Последняя корзина - для значений больше всех границ (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """Накопленные счетчики по верхним границам корзин, включая +Inf."""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float('inf') else f"{bound:g}", total))
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Оценка квантиля по верхней границе корзины (для значений выше последней границы - максимум)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            if total >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+def _usage_from_message(message) -> tuple[int, int]:
+    """Количество токенов запроса и ответа из сообщения модели LangChain (0, если модель их не вернула)."""
+    usage = getattr(message, 'usage_metadata', None)
+    if usage:
+        return usage.get('input_tokens', 0) or 0, usage.get('output_tokens', 0) or 0
+    token_usage = (getattr(message, 'response_metadata', None) or {}).get('token_usage')
+    if token_usage is None:
+        return 0, 0
+    if not isinstance(token_usage, dict):
+        token_usage = getattr(token_usage, '__dict__', {})
+    return token_usage.get('prompt_tokens', 0) or 0, token_usage.get('completion_tokens', 0) or 0
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: dict) -> str:
+    return ','.join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик одного процесса.
+
+    - Задержки: гистограмма на каждую комбинацию (вид, имя, исход), где вид - tool,
+      llm, agent или ingest (анализ алерта, принятого по HTTP), исход - ok, error,
+      cache_hit, coalesced (дождались такого же запроса) или circuit_open
+      (вызов отклонен, пока API модели недоступен).
+    - Токены: счетчики токенов запроса и ответа по имени вызова.
+    - Датчики: значения, которые считываются при экспорте из зарегистрированных
+      функций (например, статистика кэша ответов модели).
+
+    export() записывает текстовый файл в формате Prometheus (для textfile-коллектора
+    node_exporter) и JSON-снимок с оценками квантилей.
+    """
+
+    def __init__(self, prometheus_path: Optional[str] = None, json_path: Optional[str] = None,
+                 enabled: bool = True):
+        self.prometheus_path = prometheus_path
+        self.json_path = json_path
+        self.enabled = enabled
+        self._latency = {}
+        self._tokens = {}
+        self._gauge_providers = {}
+        self._lock = threading.Lock()
+        self._callback_handler = None
+
+    def observe_latency(self, kind: str, name: str, seconds: float, outcome: str = "ok") -> None:
+        """Добавляет замер задержки."""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._latency.get((kind, name, outcome))
+            if histogram is None:
+                histogram = self._latency[(kind, name, outcome)] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def record_tokens(self, name: str, prompt_tokens: int, completion_tokens: int) -> None:
+        """Добавляет количество токенов запроса и ответа."""
+        if not self.enabled or not (prompt_tokens or completion_tokens):
+            return
+        with self._lock:
+            for token_type, count in (("prompt", prompt_tokens), ("completion", completion_tokens)):
+                self._tokens[(name, token_type)] = self._tokens.get((name, token_type), 0) + count
+
+    def record_llm_response(self, name: str, message) -> None:
+        """Учитывает токены из ответа модели (AIMessage)."""
+        self.record_tokens(name, *_usage_from_message(message))
+
+    def register_gauges(self, name: str, provider: Callable[[], dict]) -> None:
+        """Регистрирует функцию, числовые значения словаря которой экспортируются как датчики name_<ключ>."""
+        self._gauge_providers[name] = provider
+
+    @contextmanager
+    def track(self, name: str, kind: str = "tool"):
+        """
+        Замеряет задержку блока кода. Исход можно задать через выдаваемый словарь:
+        call["outcome"] = "cache_hit". Исключение записывается с исходом error.
+        """
+        call = {"outcome": "ok"}
+        started = time.perf_counter()
+        try:
+            yield call
+        except BaseException:
+            call["outcome"] = "error"
+            raise
+        finally:
+            self.observe_latency(kind, name, time.perf_counter() - started, call["outcome"])
+
+    def timed(self, name: str, kind: str = "tool"):
+        """Декоратор: замеряет задержку каждого вызова функции."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.track(name, kind):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def callback_handler(self):
+        """
+        Обработчик обратных вызовов LangChain, который замеряет задержку и токены
+        каждого вызова модели внутри агента. Передается в config={"callbacks": [...]}.
+        """
+        if self._callback_handler is None:
+            from langchain_core.callbacks import BaseCallbackHandler
+
+            registry = self
+
+            class MetricsCallbackHandler(BaseCallbackHandler):
+                def __init__(self):
+                    self._started = {}
+
+                def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+                    self._started[run_id] = time.perf_counter()
+
+                def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+                    self._started[run_id] = time.perf_counter()
+
+                def on_llm_end(self, response, *, run_id, **kwargs):
+                    started = self._started.pop(run_id, None)
+                    if started is not None:
+                        registry.observe_latency("llm", "agent_model", time.perf_counter() - started)
+                    for generations in response.generations:
+                        for generation in generations:
+                            message = getattr(generation, 'message', None)
+                            if message is not None:
+                                registry.record_llm_response("agent_model", message)
+
+                def on_llm_error(self, error, *, run_id, **kwargs):
+                    started = self._started.pop(run_id, None)
+                    if started is not None:
+                        registry.observe_latency("llm", "agent_model", time.perf_counter() - started, "error")
+
+            self._callback_handler = MetricsCallbackHandler()
+        return self._callback_handler
+
+    def _gauges(self) -> dict:
+        """Текущие значения датчиков {имя: значение}."""
+        gauges = {}
+        for prefix, provider in self._gauge_providers.items():
+            try:
+                values = provider()
+            except Exception as e:
+                logger.error(f"Не удалось получить значения датчиков {prefix}: {str(e)}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    gauges[f"{prefix}_{key}"] = value
+        return gauges
+
+    def snapshot(self) -> dict:
+        """Снимок метрик в виде словаря для JSON."""
+        with self._lock:
+            latency = [
+                {
+                    'kind': kind, 'name': name, 'outcome': outcome,
+                    'count': histogram.count,
+                    'sum_seconds': histogram.sum,
+                    'avg_seconds': histogram.sum / histogram.count if histogram.count else None,
+                    'max_seconds': histogram.max,
+                    'p50_seconds': histogram.quantile(0.5),
+                    'p95_seconds': histogram.quantile(0.95),
+                    'p99_seconds': histogram.quantile(0.99),
+                    'buckets': dict(histogram.cumulative()),
+                }
+                for (kind, name, outcome), histogram in sorted(self._latency.items())
+            ]
+            tokens = {}
+            for (name, token_type), count in sorted(self._tokens.items()):
+                tokens.setdefault(name, {})[token_type] = count
+        return {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'latency': latency,
+            'tokens': tokens,
+            'gauges': self._gauges(),
+        }
+
+    def to_prometheus(self) -> str:
+        """Метрики в текстовом формате экспозиции Prometheus."""
+        lines = []
+        latency_name = f"{METRIC_PREFIX}_latency_seconds"
+        tokens_name = f"{METRIC_PREFIX}_tokens_total"
+        with self._lock:
+            lines.append(f"# HELP {latency_name} Latency of tools, model calls and agent turns.")
+            lines.append(f"# TYPE {latency_name} histogram")
+            for (kind, name, outcome), histogram in sorted(self._latency.items()):
+                labels = {'kind': kind, 'name': name, 'outcome': outcome}
+                for bound, count in histogram.cumulative():
+                    lines.append(f"{latency_name}_bucket{{{_format_labels({**labels, 'le': bound})}}} {count}")
+                lines.append(f"{latency_name}_sum{{{_format_labels(labels)}}} {histogram.sum:.6f}")
+                lines.append(f"{latency_name}_count{{{_format_labels(labels)}}} {histogram.count}")
+
+            lines.append(f"# HELP {tokens_name} Prompt and completion tokens used by model calls.")
+            lines.append(f"# TYPE {tokens_name} counter")
+            for (name, token_type), count in sorted(self._tokens.items()):
+                lines.append(f"{tokens_name}{{{_format_labels({'name': name, 'type': token_type})}}} {count}")
+
+        for gauge, value in sorted(self._gauges().items()):
+            gauge_name = f"{METRIC_PREFIX}_{gauge}"
+            lines.append(f"# TYPE {gauge_name} gauge")
+            lines.append(f"{gauge_name} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self) -> None:
+        """Атомарно записывает метрики в файлы Prometheus и JSON (пути из настроек)."""
+        if not self.enabled:
+            return
+        for path, render in ((self.prometheus_path, self.to_prometheus),
+                             (self.json_path, lambda: json.dumps(self.snapshot(), ensure_ascii=False, indent=2))):
+            if not path:
+                continue
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(render())
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.error(f"Не удалось записать метрики в {path}: {str(e)}")
+
+
+def create_metrics(metrics_settings: dict, root_dir: str) -> MetricsRegistry:
+    """Создает реестр метрик по разделу metrics из настроек. Относительные пути считаются от корня проекта."""
+    paths = {}
+    for key in ("prometheus_path", "json_path"):
+        path = metrics_settings.get(key)
+        if path and not os.path.isabs(path):
+            path = os.path.join(root_dir, path)
+        paths[key] = path
+    return MetricsRegistry(enabled=metrics_settings.get("enabled", True), **paths)
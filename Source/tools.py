@@ -1,9 +1,18 @@
-from langchain.tools import Tool
 import re
 import os
+import asyncio
+import itertools
 import logging
 from datetime import datetime, timedelta
-from Source.utils import courses_database  # Импортируем обработанный JSON с эндпоинтами
+from typing import Optional
+from Source.utils import endpoint_catalog, glossary_catalog, settings, response_cache, metrics, alert_history, run_coroutine_sync, LLM_CALL_TIMEOUT  # Импортируем справочники и настройки
+from Source.alert_parser import alert_parser
+from Source.alert_history import parse_history_query
+from Source.glossary_index import MATCH_EXACT, MATCH_FUZZY
+from Source.endpoint_index import ENDPOINT_FUZZY_THRESHOLD
+from Source.alert_reader import iter_alerts
+from Source.alert_groups import group_alerts_by_problem
+from Source.alert_renderer import AlertAnalysis, render_group_header
 
 # Настройка логирования для инструментов
 tool_logger = logging.getLogger('tool_logger')
@@ -25,10 +34,38 @@ file_handler.setFormatter(formatter)
 # Добавление обработчика к логгеру
 tool_logger.addHandler(file_handler)
 
+# Сколько проблем из файла показывать в отчете и сохранять в сведениях о последнем алерте,
+# если max_alerts_to_show не задан в настройках
+DEFAULT_MAX_ALERTS_TO_SHOW = 3
+
+# Предупреждение об устаревшем имени порога нечеткого поиска выводится один раз
+_legacy_threshold_warned = False
+
 # Функция-заглушка на случай, если импорт get_bot_response не удастся
 def fallback_bot_response(prompt, max_tokens=1000, alert_data=None):
     return f"Невозможно получить анализ от бота из-за проблемы с импортом функции get_bot_response. Проверьте структуру проекта и импорты."
 
+async def fallback_abot_response(prompt, max_tokens=1000, alert_data=None):
+    return fallback_bot_response(prompt, max_tokens=max_tokens, alert_data=alert_data)
+
+# Функции запроса к боту импортируются один раз при первом анализе с ботом
+_bot_response_functions = None
+
+def _get_bot_response_functions():
+    """
+    Безопасный импорт get_bot_response и aget_bot_response из Source.agent.
+    Результат запоминается, чтобы не выполнять импорт при каждом анализе.
+    """
+    global _bot_response_functions
+    if _bot_response_functions is None:
+        try:
+            from Source.agent import get_bot_response, aget_bot_response
+            _bot_response_functions = (get_bot_response, aget_bot_response)
+        except ImportError as e:
+            tool_logger.error(f"Не удалось импортировать get_bot_response: {str(e)}")
+            _bot_response_functions = (fallback_bot_response, fallback_abot_response)
+    return _bot_response_functions
+
 def parse_alert(alert_text: str) -> dict:
     """
     Разбираем текст алерта на составляющие части.
@@ -72,6 +109,7 @@ def parse_alert(alert_text: str) -> dict:
     return result
 
 
+@metrics.timed("get_data_alert")
 def get_data_alert(alert_text: str) -> dict:
     """
     Получив текст алерта, разбери его на части, сообщи когда был алерт,
@@ -102,52 +140,149 @@ def get_data_alert(alert_text: str) -> dict:
     return result
 
 
-def find_endpoint_info(query: str) -> str:
+@metrics.timed("find_endpoint_info")
+def find_endpoint_info(query: str, limit: int = None) -> str:
     """
     Поиск информации об API эндпоинтах по запросу пользователя.
-    Использует данные из integration_endpoints.json для формирования ответа.
+    Использует индекс данных из integration_endpoints.json для формирования ответа.
+    limit ограничивает число эндпоинтов в ответе (по умолчанию endpoint_search_limit из настроек).
     """
-    matching_endpoints = []
+    if limit is None:
+        limit = settings.get("endpoint_search_limit")
     
-    # Очистка запроса от лишних символов и приведение к нижнему регистру
-    query = query.lower().strip()
+    # Индекс берется один раз на запрос: перезагрузка справочника не меняет его посреди поиска
+    endpoint_index = endpoint_catalog.index
     
-    # Поиск по эндпоинтам
-    for endpoint in courses_database:
-        # Проверка по URL пути
-        if query in endpoint.get("request", "").lower():
-            matching_endpoints.append(endpoint)
-            continue
-            
-        # Проверка по описанию
-        if query in endpoint.get("description", "").lower():
-            matching_endpoints.append(endpoint)
-            continue
-            
-        # Проверка по хосту
-        if query in endpoint.get("host", "").lower():
-            matching_endpoints.append(endpoint)
-            continue
+    # Берем на один эндпоинт больше лимита, чтобы знать, есть ли еще результаты
+    matching_endpoints = endpoint_index.search(query, limit=limit + 1 if limit else None)
+    has_more = bool(limit) and len(matching_endpoints) > limit
+    if has_more:
+        matching_endpoints = matching_endpoints[:limit]
     
     # Если найдены подходящие эндпоинты, формируем ответ
     if matching_endpoints:
-        result = "Найдены следующие API эндпоинты, соответствующие запросу:\n\n"
+        lines = ["Найдены следующие API эндпоинты, соответствующие запросу:\n"]
         
         for i, endpoint in enumerate(matching_endpoints, 1):
-            result += f"{i}. Запрос: {endpoint.get('request', 'Нет данных')}\n"
-            result += f"   Описание: {endpoint.get('description', 'Нет описания')}\n"
-            result += f"   Хост: {endpoint.get('host', 'Не указан')}\n"
-            result += f"   Направление: {endpoint.get('direction', 'Не указано')}\n\n"
+            lines.append(f"{i}. Запрос: {endpoint.get('request', 'Нет данных')}")
+            lines.append(f"   Описание: {endpoint.get('description', 'Нет описания')}")
+            lines.append(f"   Хост: {endpoint.get('host', 'Не указан')}")
+            lines.append(f"   Направление: {endpoint.get('direction', 'Не указано')}\n")
+        
+        if has_more:
+            lines.append(f"Показаны первые {limit} эндпоинтов. Уточните запрос, чтобы сузить поиск.\n")
             
-        return result
+        return "\n".join(lines) + "\n"
+    
+    # Точных совпадений нет - ранжируем похожие эндпоинты (опечатки, неполные пути)
+    similar_endpoints = endpoint_index.fuzzy_search(
+        query,
+        limit=settings.get("fuzzy_search_limit", 5),
+        threshold=_endpoint_fuzzy_threshold(),
+    )
+    if similar_endpoints:
+        lines = ["Точных совпадений нет. Наиболее похожие API эндпоинты:\n"]
+        
+        for i, (endpoint, score) in enumerate(similar_endpoints, 1):
+            lines.append(f"{i}. Запрос: {endpoint.get('request', 'Нет данных')} (сходство {score:.0%})")
+            lines.append(f"   Описание: {endpoint.get('description', 'Нет описания')}")
+            lines.append(f"   Хост: {endpoint.get('host', 'Не указан')}")
+            lines.append(f"   Направление: {endpoint.get('direction', 'Не указано')}\n")
+        
+        return "\n".join(lines) + "\n"
+    
+    return "По вашему запросу не найдено API эндпоинтов. Попробуйте уточнить запрос или использовать другие ключевые слова."
+
+
+def _endpoint_fuzzy_threshold() -> float:
+    """
+    Порог нечеткого поиска эндпоинтов из настроек. Прежнее имя ключа
+    default_similarity_threshold читается, если новое не задано.
+    """
+    global _legacy_threshold_warned
+    if "endpoint_fuzzy_threshold" in settings:
+        return settings["endpoint_fuzzy_threshold"]
+    if "default_similarity_threshold" in settings:
+        if not _legacy_threshold_warned:
+            tool_logger.warning("Настройка default_similarity_threshold устарела, используйте endpoint_fuzzy_threshold")
+            _legacy_threshold_warned = True
+        return settings["default_similarity_threshold"]
+    return ENDPOINT_FUZZY_THRESHOLD
+
+
+@metrics.timed("lookup_glossary_term")
+def lookup_glossary_term(query: str) -> str:
+    """
+    Поиск определения термина в глоссарии (architect_glossary.json):
+    точное совпадение, начало термина, слова термина или похожее написание.
+    """
+    matches = glossary_catalog.index.lookup(query, limit=settings.get("fuzzy_search_limit", 5))
+    if not matches:
+        return "Термин не найден в глоссарии. Попробуйте другую формулировку или сокращение."
+    
+    entry, match, _ = matches[0]
+    if match == MATCH_EXACT:
+        return f"{entry['term']}: {entry['description']}\n"
+    
+    if match == MATCH_FUZZY:
+        lines = ["Точного совпадения нет. Похожие термины глоссария:\n"]
     else:
-        return "По вашему запросу не найдено API эндпоинтов. Попробуйте уточнить запрос или использовать другие ключевые слова."
+        lines = ["Найдены термины глоссария:\n"]
+    for i, (entry, match, score) in enumerate(matches, 1):
+        similarity = f" (сходство {score:.0%})" if match == MATCH_FUZZY else ""
+        lines.append(f"{i}. {entry['term']}{similarity}: {entry['description']}")
+    return "\n".join(lines) + "\n"
+
+
+@metrics.timed("query_alert_history")
+def query_alert_history(query: str) -> str:
+    """
+    Агрегатные запросы к истории проанализированных алертов (SQLite).
+    Формат запроса: "service=skillflow period=7d status=OPEN group_by=http_code".
+    """
+    try:
+        params = parse_history_query(query)
+    except ValueError as e:
+        return f"Не удалось разобрать запрос к истории: {str(e)}"
+    
+    result = alert_history.query(**params)
+    if not result['total']:
+        return "В истории нет алертов, подходящих под запрос."
+    
+    filters = ", ".join(
+        f"{key}={value.strftime('%d.%m.%Y %H:%M') if isinstance(value, datetime) else value}"
+        for key, value in params.items() if key not in ('group_by', 'limit')
+    )
+    lines = [f"История алертов ({filters or 'без фильтров'}):\n"]
+    lines.append(f"Всего алертов: {result['total']}")
+    for status, count in sorted(result['by_status'].items(), key=lambda item: -item[1]):
+        lines.append(f"   {status}: {count}")
+    if result['first_detected']:
+        lines.append(f"Первое обнаружение: {result['first_detected'].replace('T', ' ')}")
+        lines.append(f"Последнее обнаружение: {result['last_detected'].replace('T', ' ')}")
+    if result['groups']:
+        lines.append(f"\nПо полю {params['group_by']}:")
+        for i, (value, count) in enumerate(result['groups'], 1):
+            lines.append(f"{i}. {value if value is not None else 'Не указано'}: {count}")
+    return "\n".join(lines) + "\n"
 
 
 def analyze_file_alert(file_path: str = None) -> str:
     """
     Анализ алерта из файла one_line_alert.txt или указанного пути.
-    Читает содержимое файла и анализирует его.
+    Читает содержимое файла и анализирует его. Алерты файла сохраняются в историю.
+    """
+    return analyze_file_alert_with_groups(file_path, history=alert_history)[0]
+
+
+@metrics.timed("analyze_file_alert")
+def analyze_file_alert_with_groups(file_path: str = None, history=None) -> tuple[str, Optional[list]]:
+    """
+    Анализ файла алертов, как analyze_file_alert, с разобранными группами проблем.
+    Если передано хранилище history (AlertHistory), алерты файла сохраняются в него.
+
+    Returns:
+        tuple: (отчет в markdown, группы проблем из файла или None, если файл не проанализирован)
     """
     try:
         tool_logger.info("Вызов функции analyze_file_alert")
@@ -162,81 +297,54 @@ def analyze_file_alert(file_path: str = None) -> str:
         if not os.path.exists(file_path):
             error_msg = f"Файл не найден: {file_path}"
             tool_logger.error(error_msg)
-            return error_msg
+            return error_msg, None
         
-        # Читаем содержимое файла
+        # Алерты читаются из файла по одному, без загрузки всего файла в память
         tool_logger.info(f"Чтение файла: {file_path}")
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                alert_text = f.read()
-        except UnicodeDecodeError:
-            # Если возникла ошибка чтения в UTF-8, пробуем альтернативную кодировку
-            with open(file_path, 'r', encoding='cp1251') as f:
-                alert_text = f.read()
-        
-        tool_logger.info(f"Прочитано {len(alert_text)} символов из файла")
-        
-        # Используем более точный паттерн для разделения алертов
-        # Ищем строки, которые начинаются с ПРОМ, PROM или DEV, затем |
-        alert_starts = re.finditer(r'(?:^|\n)(?:ПРОМ|PROM|DEV) \|', alert_text)
-        alert_positions = [match.start() for match in alert_starts]
-        
-        # Если не найдено ни одного алерта с префиксом, проверяем альтернативные паттерны
-        if not alert_positions:
-            # Альтернативный паттерн - ищем строки, начинающиеся с "АС Рефлекс"
-            alt_alert_starts = re.finditer(r'(?:^|\n)АС Рефлекс', alert_text)
-            alert_positions = [match.start() for match in alt_alert_starts]
-            
-            # Если все еще нет совпадений, просто анализируем весь текст как один алерт
-            if not alert_positions:
-                tool_logger.info("Не найдены стандартные паттерны алертов, анализируем весь текст как один алерт")
-                return analyze_single_alert(alert_text)
-        
-        # Разделяем текст на отдельные алерты
-        alerts = []
-        for i in range(len(alert_positions)):
-            start = alert_positions[i]
-            # Если это последний алерт, берем текст до конца файла
-            end = alert_positions[i+1] if i < len(alert_positions) - 1 else len(alert_text)
-            alert_fragment = alert_text[start:end].strip()
-            if alert_fragment:  # Проверяем, что фрагмент не пустой
-                alerts.append(alert_fragment)
-        
-        tool_logger.info(f"Найдено {len(alerts)} алертов в файле")
-        
-        # Если найден только один алерт, анализируем его напрямую
-        if len(alerts) == 1:
-            return analyze_single_alert(alerts[0])
-        
-        # Анализируем каждый алерт и формируем сводный результат
-        results = []
-        open_count = 0
-        resolved_count = 0
-        unknown_count = 0
-        
-        for i, alert in enumerate(alerts, 1):
-            tool_logger.info(f"Анализ алерта #{i}")
-            
-            # Проверяем статус алерта более точно
-            is_open_alert = "OPEN" in alert or "ACTIVE" in alert
-            is_resolved_alert = "RESOLVED" in alert or "CLOSED" in alert
-            
-            # Подсчет статусов алертов
-            if is_open_alert:
-                open_count += 1
-                tool_logger.info(f"Алерт #{i} определен как OPEN")
-            elif is_resolved_alert:
-                resolved_count += 1
-                tool_logger.info(f"Алерт #{i} определен как RESOLVED")
-            else:
-                unknown_count += 1
-                tool_logger.info(f"Алерт #{i} имеет неизвестный статус")
-                
-            # Анализируем только первые 2 алерта детально, для остальных упрощенный вывод
-            include_bot = (i == 1) or (is_open_alert and i <= 2)
-            
-            result = analyze_single_alert(alert, include_bot_analysis=include_bot)
-            results.append(f"### 📋 Алерт #{i}\n{result}")
+        alerts = iter_alerts(file_path)
+        
+        # Заглядываем на два алерта вперед: если алерт один, анализируем его напрямую
+        first_alert = next(alerts, None)
+        second_alert = next(alerts, None)
+        if second_alert is None:
+            analysis = analyze_single_alert(first_alert if first_alert is not None else "", history=history)
+            records = [analysis.record] if first_alert is not None and analysis.record is not None else []
+            return analysis.render(), group_alerts_by_problem(records)
+        
+        # Фрагменты об одной проблеме (OPEN/RESOLVED, несколько компонентов) объединяются в группу,
+        # для каждой показанной группы выполняется не более одного анализа бота
+        max_alerts_to_show = settings.get("max_alerts_to_show", DEFAULT_MAX_ALERTS_TO_SHOW)
+        bot_analysis_limit = settings.get("bot_analysis_limit", 2)
+        fragments_counter = itertools.count(1)
+        records = (
+            alert_parser.parse(alert)
+            for alert, _ in zip(itertools.chain((first_alert, second_alert), alerts), fragments_counter)
+        )
+        # Все разобранные алерты пакетами сохраняются в историю
+        if history is not None:
+            records = history.record_stream(records, source=file_path)
+        groups = group_alerts_by_problem(records, keep_records=max_alerts_to_show)
+        alerts_count = next(fragments_counter) - 1
+        tool_logger.info(f"Найдено {alerts_count} алертов о {len(groups)} проблемах")
+        
+        # Подсчет статусов проблем по последнему фрагменту каждой
+        open_count = sum(1 for group in groups if group.latest_status == "OPEN")
+        resolved_count = sum(1 for group in groups if group.latest_status == "RESOLVED")
+        unknown_count = len(groups) - open_count - resolved_count
+        
+        # Анализ бота для первой проблемы и активных проблем в пределах лимита
+        groups_to_show = groups[:max_alerts_to_show]
+        alerts_to_show = [
+            (group.latest_record.text, i == 1 or (group.latest_status == "OPEN" and i <= bot_analysis_limit))
+            for i, group in enumerate(groups_to_show, 1)
+        ]
+        
+        # Запросы к боту для отображаемых проблем выполняются параллельно, порядок сохраняется.
+        # Markdown строится только для показываемых проблем
+        results = [
+            f"### 📋 Проблема {group.problem_id or f'#{i}'}\n{render_group_header(group)}\n{analysis.render()}"
+            for i, (group, analysis) in enumerate(zip(groups_to_show, analyze_alerts_concurrently(alerts_to_show)), 1)
+        ]
         
         # Создаем красивую сводную информацию
         now = datetime.now().strftime('%d.%m.%Y %H:%M')
@@ -248,251 +356,217 @@ def analyze_file_alert(file_path: str = None) -> str:
         summary += f"## Статистика алертов\n"
         summary += f"| Категория | Количество |\n"
         summary += f"|:---------:|:----------:|\n"
-        summary += f"| **Всего алертов** | {len(alerts)} |\n"
+        summary += f"| **Всего алертов** | {alerts_count} |\n"
+        summary += f"| **Уникальных проблем** | {len(groups)} |\n"
         summary += f"| **Активных** 🔴 | {open_count} |\n"
         summary += f"| **Решенных** 🟢 | {resolved_count} |\n"
         summary += f"| **Неизвестных** ⚪ | {unknown_count} |\n\n"
         
         if open_count > 0:
-            summary += f"⚠️ **Внимание:** В файле обнаружено {open_count} активных алертов, требующих внимания.\n\n"
+            summary += f"⚠️ **Внимание:** В файле обнаружено {open_count} активных проблем, требующих внимания.\n\n"
             
         if resolved_count > 0:
-            summary += f"✅ **Информация:** {resolved_count} алертов уже разрешены и не требуют действий.\n\n"
+            summary += f"✅ **Информация:** {resolved_count} проблем уже разрешены и не требуют действий.\n\n"
         
-        # Объединяем только первые 3 алерта для экономии токенов
-        max_alerts_to_show = min(3, len(results))
-        combined_result = f"{summary}\n## Анализ по алертам\n\n" + "\n\n".join(results[:max_alerts_to_show])
+        # Объединяем только первые проблемы для экономии токенов
+        combined_result = f"{summary}\n## Анализ по проблемам\n\n" + "\n\n".join(results)
         
-        if len(results) > 3:
-            combined_result += f"\n\n> ... и еще {len(results) - 3} алертов (не показаны для экономии токенов)"
+        if len(groups) > max_alerts_to_show:
+            combined_result += f"\n\n> ... и еще {len(groups) - max_alerts_to_show} проблем (не показаны для экономии токенов)"
         
-        tool_logger.info(f"Успешно завершен анализ {len(alerts)} алертов")
+        tool_logger.info(f"Успешно завершен анализ {alerts_count} алертов")
+        tool_logger.info(f"Статистика кэша ответов модели: {response_cache.stats()}")
         
-        return combined_result
+        return combined_result, groups
             
     except Exception as e:
         error_message = f"Ошибка анализа файла: {str(e)}"
         tool_logger.error(error_message, exc_info=True)
-        return f"⚠️ **Ошибка анализа файла:** {str(e)}"
+        return f"⚠️ **Ошибка анализа файла:** {str(e)}", None
+
+
+def _build_bot_request(record) -> tuple[str, dict]:
+    """
+    Формирует промпт и структурированные данные алерта для get_bot_response.
+    """
+    http_code = record.http_code if record.http_code is not None else "Неизвестно"
+    service = record.service if record.service is not None else "Неизвестный сервис"
+    alert_type = record.alert_type if record.alert_type is not None else "Неизвестный тип"
+    
+    # Создаем улучшенный промпт для бота с учетом статуса алерта
+    bot_prompt = f"""
+Статус алерта: {record.status}, 
+Сервис: {service}, 
+Тип: {alert_type},
+HTTP код: {http_code}.
+
+Кратко проанализируй данный алерт (до 100 слов).
+"""
+    # Создаем структурированные данные для анализа (расширенная версия)
+    structured_data = {
+        'status': record.status,
+        'service': service,
+        'alert_type': alert_type,
+        'http_code': record.http_code,
+        'timestamp': record.timestamp
+    }
+    return bot_prompt, structured_data
+
+
+def _correlate_endpoints(record) -> tuple:
+    """
+    Сопоставляет пути запросов и хосты из текста алерта с каталогом эндпоинтов.
+    Ошибка каталога не должна мешать анализу алерта - тогда эндпоинтов нет.
+    """
+    try:
+        return tuple(endpoint_catalog.index.correlate(record.text))
+    except Exception as e:
+        tool_logger.error(f"Не удалось сопоставить алерт с каталогом эндпоинтов: {str(e)}")
+        return ()
 
 
-def analyze_single_alert(alert_text, include_bot_analysis=True):
+def analyze_single_alert(alert_text, include_bot_analysis=True, history=None) -> AlertAnalysis:
     """
     Анализ отдельного алерта.
-    Извлекает детали алерта и генерирует структурированный вывод.
+    Извлекает детали алерта и возвращает компактный результат (AlertAnalysis);
+    markdown формируется при вызове render() или str(). Если передано хранилище
+    history (AlertHistory), алерт сохраняется в него.
     """
     tool_logger.info("Анализ одиночного алерта")
     
     try:
-        # Извлечение деталей алерта
-        http_code_match = re.search(r'HTTP (?:ERROR )?(\d{3})|(\d{3}) POST', alert_text, re.IGNORECASE)
-        http_code = http_code_match.group(1) if http_code_match and http_code_match.group(1) else http_code_match.group(2) if http_code_match else "Неизвестно"
-        
-        # Извлекаем детали о сервисе и типе алерта
-        service_match = re.search(r'(?:ПРОМ|PROM|DEV) \| ([^|]+)', alert_text)
-        service = service_match.group(1).strip() if service_match else "Неизвестный сервис"
-        
-        # Извлекаем тип алерта и проверяем содержит ли он в себе информацию о статусе
-        alert_type_match = re.search(r'\| ([^|]+) \|', alert_text)
-        alert_type = alert_type_match.group(1).strip() if alert_type_match else "Неизвестный тип"
-        
-        # Извлекаем информацию о времени из алерта - упрощенный вариант
-        timestamp_match = re.search(r'(\d{2}\.\d{2}\.\d{4} \d{2}:\d{2}:\d{2})', alert_text)
-        timestamp = timestamp_match.group(1) if timestamp_match else "Время не указано"
-        
-        # Определение статуса алерта
-        status = "UNKNOWN"
-        if re.search(r'(?:OPEN|ACTIVE)', alert_text, re.IGNORECASE):
-            status = "OPEN"
-        elif re.search(r'(?:RESOLVED|CLOSED)', alert_text, re.IGNORECASE):
-            status = "RESOLVED"
-        
-        # Улучшенные цветовые индикаторы и статус-метки в зависимости от статуса
-        status_info = {
-            "OPEN": {
-                "icon": "🔴",
-                "badge": "🚨 ОТКРЫТ",
-                "color": "**",
-                "border": "─────────────────────────────────────────────────"
-            },
-            "ACTIVE": {
-                "icon": "🔴",
-                "badge": "⚡ АКТИВЕН",
-                "color": "**",
-                "border": "─────────────────────────────────────────────────"
-            },
-            "RESOLVED": {
-                "icon": "🟢",
-                "badge": "✅ РЕШЕН",
-                "color": "**",
-                "border": "─────────────────────────────────────────────────"
-            },
-            "CLOSED": {
-                "icon": "🟢",
-                "badge": "✅ ЗАКРЫТ",
-                "color": "**",
-                "border": "─────────────────────────────────────────────────"
-            },
-            "UNKNOWN": {
-                "icon": "⚪",
-                "badge": "❓ НЕИЗВЕСТЕН",
-                "color": "**",
-                "border": "─────────────────────────────────────────────────"
-            }
-        }
-        
-        status_data = status_info.get(status, status_info["UNKNOWN"])
-        
-        # Определяем HTTP код и его значение
-        http_code_info = {
-            "200": {"icon": "✅", "text": "OK"},
-            "400": {"icon": "⚠️", "text": "Некорректный запрос"},
-            "401": {"icon": "🔒", "text": "Неавторизован"},
-            "403": {"icon": "🚫", "text": "Запрещено"},
-            "404": {"icon": "🔍", "text": "Не найдено"},
-            "500": {"icon": "💥", "text": "Внутренняя ошибка сервера"},
-            "502": {"icon": "🔄", "text": "Ошибка шлюза"},
-            "503": {"icon": "🛑", "text": "Сервис недоступен"},
-            "504": {"icon": "⏱️", "text": "Таймаут шлюза"}
-        }
-        
-        http_display = f"**{http_code}**"
-        # Convert http_code to string to ensure it works as a dictionary key
-        http_code_str = str(http_code)
-        if http_code_str in http_code_info:
-            http_display = f"{http_code_info[http_code_str]['icon']} **{http_code}** ({http_code_info[http_code_str]['text']})"
-        
-        # Форматирование времени, если оно доступно
-        time_display = "Не указано"
-        if timestamp != "Время не указано":
-            try:
-                dt = datetime.strptime(timestamp, "%d.%m.%Y %H:%M:%S")
-                time_display = f"📅 {dt.strftime('%d.%m.%Y')} ⏰ {dt.strftime('%H:%M:%S')}"
-            except:
-                time_display = timestamp
-        
-        # Красивый вывод информации об алерте в виде карточки с границами
-        alert_info = f"## {status_data['icon']} {status_data['badge']} {status_data['icon']}\n"
-        alert_info += f"{status_data['border']}\n\n"
-        
-        # Информационная таблица с улучшенным форматированием
-        alert_info += f"| 📊 Параметр | 📋 Значение |\n"
-        alert_info += f"|:----------:|:-----------|\n"
-        alert_info += f"| 🏢 **Сервис** | {service} |\n"
-        alert_info += f"| 📝 **Тип** | {alert_type} |\n"
-        alert_info += f"| 🌐 **HTTP код** | {http_display} |\n"
-        alert_info += f"| 🕒 **Время** | {time_display} |\n"
-        
-        # Извлечение сообщения об ошибке, если есть
-        error_msg_match = re.search(r'Error message: (.*?)(?:\n|$)', alert_text, re.IGNORECASE)
-        if error_msg_match:
-            error_message = error_msg_match.group(1).strip()
-            alert_info += f"| ⚠️ **Ошибка** | {error_message} |\n"
-        
-        # Текст алерта с улучшенным форматированием в виде раскрывающегося блока
-        alert_info += "\n"
-        alert_info += "<details>\n"
-        alert_info += "<summary>📝 Подробности алерта</summary>\n\n"
-        
-        # Форматирование текста алерта для лучшей читаемости
-        formatted_text = alert_text.replace("\n\n", "\n")
-        if len(formatted_text) > 300:
-            # Показываем только первые 300 символов с многоточием
-            formatted_text = formatted_text[:300] + "...\n\n[Текст обрезан для краткости]"
-        
-        alert_info += f"```\n{formatted_text}\n```\n"
-        alert_info += "</details>\n"
+        # Извлечение деталей алерта за один вызов парсера
+        record = alert_parser.parse(alert_text)
+        if history is not None:
+            history.save([record], source="analyze_single_alert")
+        # Эндпоинты и интеграции из каталога, о которых говорит алерт
+        endpoints = _correlate_endpoints(record)
         
         # Если полный анализ с ботом не требуется, возвращаем только структурированную информацию
         if not include_bot_analysis:
-            return alert_info
+            return AlertAnalysis(record, endpoints=endpoints)
+        
+        bot_prompt, structured_data = _build_bot_request(record)
         
-        # Создаем улучшенный промпт для бота с учетом статуса алерта
-        bot_prompt = f"""
-Статус алерта: {status}, 
-Сервис: {service}, 
-Тип: {alert_type},
-HTTP код: {http_code}.
-
-Кратко проанализируй данный алерт (до 100 слов).
-"""
         # Получаем ответ от бота
-        tool_logger.info(f"Запрашиваем анализ у бота для алерта со статусом {status}")
-        
-        # Создаем структурированные данные для анализа (расширенная версия)
-        structured_data = {
-            'status': status,
-            'service': service,
-            'alert_type': alert_type,
-            'http_code': http_code if http_code != "Неизвестно" else None,
-            'timestamp': timestamp if timestamp != "Время не указано" else None
-        }
-        
-        # Безопасный импорт get_bot_response
-        try:
-            from Source.agent import get_bot_response
-        except ImportError as e:
-            tool_logger.error(f"Не удалось импортировать get_bot_response: {str(e)}")
-            get_bot_response = fallback_bot_response
-            
+        tool_logger.info(f"Запрашиваем анализ у бота для алерта со статусом {record.status}")
+        
+        get_bot_response, _ = _get_bot_response_functions()
+        
         # Передаем структурированные данные в get_bot_response
         bot_response = get_bot_response(bot_prompt, max_tokens=500, alert_data=structured_data)
         
-        # Компактный вывод с анализом в красивом формате
-        final_output = f"{alert_info}\n"
-        final_output += f"## 🧠 Анализ\n"
-        final_output += f"─────────────────────── 🔍 ───────────────────────\n\n"
+        tool_logger.info("Анализ алерта успешно завершен")
+        return AlertAnalysis(record, bot_response, endpoints=endpoints)
+        
+    except Exception as e:
+        error_message = f"Ошибка при анализе алерта: {str(e)}"
+        tool_logger.error(error_message, exc_info=True)
+        return AlertAnalysis(error=str(e))
+
+
+async def analyze_single_alert_async(alert_text, include_bot_analysis=True, semaphore=None) -> AlertAnalysis:
+    """
+    Асинхронный вариант analyze_single_alert: запрос к боту выполняется через
+    aget_bot_response и ограничивается семафором, если он передан.
+    """
+    tool_logger.info("Асинхронный анализ одиночного алерта")
+    
+    try:
+        record = alert_parser.parse(alert_text)
+        endpoints = _correlate_endpoints(record)
+        
+        if not include_bot_analysis:
+            return AlertAnalysis(record, endpoints=endpoints)
         
-        # Форматирование ответа бота в зависимости от статуса алерта
-        if status == "OPEN" or status == "ACTIVE":
-            final_output += f"⚠️ **ВНИМАНИЕ! Требуется реакция!**\n\n"
-        elif status == "RESOLVED" or status == "CLOSED":
-            final_output += f"✅ **Алерт закрыт. Дополнительных действий не требуется.**\n\n"
+        bot_prompt, structured_data = _build_bot_request(record)
+        tool_logger.info(f"Запрашиваем анализ у бота для алерта со статусом {record.status}")
         
-        final_output += f"{bot_response}\n\n"
+        _, aget_bot_response = _get_bot_response_functions()
         
-        # Добавляем рекомендации в зависимости от статуса и HTTP кода
-        if status == "OPEN" or status == "ACTIVE":
-            if http_code in ["500", "502", "503", "504"]:
-                final_output += f"### 📋 Рекомендации:\n\n"
-                final_output += f"1. Проверьте доступность сервиса {service}\n"
-                final_output += f"2. Изучите логи за период, близкий к времени возникновения алерта\n"
-                final_output += f"3. Убедитесь в корректности конфигурации и доступности зависимостей\n"
+        if semaphore is None:
+            bot_response = await aget_bot_response(bot_prompt, max_tokens=500, alert_data=structured_data)
+        else:
+            async with semaphore:
+                bot_response = await aget_bot_response(bot_prompt, max_tokens=500, alert_data=structured_data)
         
         tool_logger.info("Анализ алерта успешно завершен")
-        return final_output
+        return AlertAnalysis(record, bot_response, endpoints=endpoints)
         
     except Exception as e:
         error_message = f"Ошибка при анализе алерта: {str(e)}"
         tool_logger.error(error_message, exc_info=True)
-        return f"⚠️ **Ошибка анализа:** {str(e)}"
+        return AlertAnalysis(error=str(e))
 
 
-# Создаем инструмент на основе функции get_data_alert
-get_data_alert_tool = Tool(
-    name="Data Alert Parser",
-    func=get_data_alert,
-    description="Получаю текст алерта и возвращаю разбор данных."
-)
+def analyze_alerts_concurrently(alerts, max_concurrency=None) -> list[AlertAnalysis]:
+    """
+    Анализирует несколько алертов с параллельными запросами к боту.
+    
+    Args:
+        alerts: Список пар (текст алерта, нужен ли анализ бота)
+        max_concurrency: Максимум одновременных запросов к модели
+            (по умолчанию llm_max_concurrency из настроек)
+    
+    Returns:
+        Результаты анализа в исходном порядке алертов
+    """
+    if not alerts:
+        return []
+    if max_concurrency is None:
+        max_concurrency = settings.get("llm_max_concurrency", 4)
+    
+    async def analyze_all():
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        return await asyncio.gather(*(
+            analyze_single_alert_async(alert_text, include_bot, semaphore)
+            for alert_text, include_bot in alerts
+        ))
+    
+    tool_logger.info(f"Параллельный анализ {len(alerts)} алертов (не более {max_concurrency} запросов одновременно)")
+    # Запросы выполняются волнами по max_concurrency, каждая не дольше одного вызова модели с повторами
+    waves = -(-len(alerts) // max(1, max_concurrency))
+    return run_coroutine_sync(analyze_all(), timeout=LLM_CALL_TIMEOUT * waves)
 
-# Создаем инструмент для поиска информации об API эндпоинтах
-find_endpoint_info_tool = Tool(
-    name="API Endpoint Info",
-    func=find_endpoint_info,
-    description="Ищу информацию об API эндпоинтах по запросу пользователя."
-)
 
-# Создаем инструмент для анализа алерта из файла
-analyze_file_alert_tool = Tool(
-    name="File Alert Analyzer",
-    func=analyze_file_alert,
-    description="Анализирую алерт из файла one_line_alert.txt и предоставляю результаты анализа."
+# Инструменты агента: имя, функция и описание для модели. Объекты Tool (LangChain)
+# создаются только при сборке агента (get_agent_tools), поэтому импорт модуля
+# скриптами разбора алертов не загружает LangChain, а функции вызываются напрямую
+AGENT_TOOLS = (
+    # Разбор данных алерта
+    ("Data Alert Parser", get_data_alert,
+     "Получаю текст алерта и возвращаю разбор данных."),
+    # Поиск информации об API эндпоинтах
+    ("API Endpoint Info", find_endpoint_info,
+     "Ищу информацию об API эндпоинтах по запросу пользователя."),
+    # Запросы к истории алертов
+    ("Alert History", query_alert_history, (
+        "Отвечаю на вопросы об истории алертов (сколько раз, как часто, какие коды ошибок). "
+        "Формат запроса: пары ключ=значение через пробел: service=<имя сервиса или его часть, например skillflow>, "
+        "status=OPEN|RESOLVED, http_code=500, problem_id=P-123, period=24h|7d|2w|all, "
+        "since=ДД.ММ.ГГГГ, until=ДД.ММ.ГГГГ, group_by=service|status|http_code|problem_id|day, limit=10. "
+        "Пример: service=skillflow period=7d group_by=day"
+    )),
+    # Поиск терминов в глоссарии
+    ("Glossary", lookup_glossary_term,
+     "Объясняю значение термина или сокращения (АС, AI-агент, автономность и т.п.) по глоссарию. На вход - сам термин."),
+    # Анализ алерта из файла
+    ("File Alert Analyzer", analyze_file_alert,
+     "Анализирую алерт из файла one_line_alert.txt и предоставляю результаты анализа."),
 )
 
-# Инструменты для экспорта
-get_data_alert = get_data_alert_tool
-find_endpoint_info = find_endpoint_info_tool
-analyze_file_alert = analyze_file_alert_tool
+_agent_tools = None
+
+def get_agent_tools() -> list:
+    """
+    Инструменты агента в виде LangChain Tool, создаются при первом вызове.
+    """
+    global _agent_tools
+    if _agent_tools is None:
+        from langchain_core.tools import Tool
+        _agent_tools = [Tool(name=name, func=func, description=description)
+                        for name, func, description in AGENT_TOOLS]
+    return _agent_tools
 
 # Функция для тестирования нашего инструмента
 if __name__ == "__main__":
@@ -523,7 +597,7 @@ if __name__ == "__main__":
     # Вызов инструмента
     try:
         print("\nТестирование инструмента get_data_alert:")
-        result = get_data_alert.invoke(alert_text)
+        result = get_data_alert(alert_text)
         print(result)
     except Exception as e:
         print(f"Ошибка при вызове get_data_alert: {str(e)}")
@@ -2,6 +2,15 @@
 
 import os
 import json
+import asyncio
+import threading
+from Source.llm_cache import create_response_cache
+from Source.endpoint_index import EndpointIndex
+from Source.glossary_index import GlossaryIndex
+from Source.catalog import create_catalog
+from Source.metrics import create_metrics
+from Source.alert_history import create_alert_history
+from Source.llm_client import create_llm_client, call_timeout
 
 # Определение корневого пути проекта
 root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -22,9 +31,85 @@ def load_database(file_path: str) -> list[dict]:
     with open(file_path, 'r', encoding='utf-8') as file:
         return json.load(file)
 
-# Путь к базе данных курсов из settings.json
+# Справочники загружаются при первом обращении и перезагружаются при изменении файла
+# (раздел catalogs в настройках): каталог эндпоинтов из course_data_path и глоссарий
+catalog_settings = settings.get("catalogs", {})
 course_data_path = os.path.join(root_dir, settings["course_data_path"])
-courses_database = load_database(course_data_path)
+endpoint_catalog = create_catalog(course_data_path, EndpointIndex, catalog_settings, root_dir)
+glossary_data_path = os.path.join(root_dir, settings["glossary_data_path"])
+glossary_catalog = create_catalog(glossary_data_path, GlossaryIndex, catalog_settings, root_dir)
 
+def __getattr__(name):
+    """
+    Совместимость со старым импортом `from Source.utils import endpoint_index, courses_database`:
+    возвращается текущий индекс справочника на момент обращения.
+    """
+    if name == "endpoint_index":
+        return endpoint_catalog.index
+    if name == "courses_database":
+        return endpoint_catalog.index.endpoints
+    if name == "glossary_index":
+        return glossary_catalog.index
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
+# Кэш ответов модели (раздел llm_cache в настройках)
+response_cache = create_response_cache(settings.get("llm_cache", {}), root_dir)
 
+# Метрики задержек и токенов (раздел metrics в настройках); статистика кэша экспортируется как датчики
+metrics = create_metrics(settings.get("metrics", {}), root_dir)
+metrics.register_gauges("llm_cache", response_cache.stats)
+
+# История разобранных алертов в SQLite (раздел history в настройках), база открывается при первом обращении
+alert_history = create_alert_history(settings.get("history", {}), root_dir)
+
+# Повторы и автоматический выключатель вызовов модели (раздел llm в настройках)
+llm_client = create_llm_client(settings.get("llm", {}), root_dir)
+
+# Наибольшее время одного вызова модели с повторами: по нему ограничивается ожидание корутин
+LLM_CALL_TIMEOUT = call_timeout(settings.get("llm", {}))
+metrics.register_gauges("llm_circuit", llm_client.breaker.stats)
+
+
+
+
+
+# Фоновый цикл событий для асинхронных запросов из синхронного кода.
+# Один долгоживущий цикл позволяет асинхронному HTTP-клиенту модели
+# переиспользовать соединения между вызовами.
+_background_loop = None
+_background_thread = None
+_background_loop_lock = threading.Lock()
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """Возвращает фоновый цикл событий, запуская его в отдельном потоке при первом вызове."""
+    global _background_loop, _background_thread
+    with _background_loop_lock:
+        if _background_loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="async-llm-loop", daemon=True)
+            thread.start()
+            _background_loop, _background_thread = loop, thread
+    return _background_loop
+
+def run_coroutine_sync(coro, timeout: float = None):
+    """
+    Выполняет корутину в фоновом цикле событий и возвращает ее результат.
+
+    Ожидание ограничено timeout секунд (по умолчанию LLM_CALL_TIMEOUT - один вызов
+    модели со всеми повторами); по истечении корутина отменяется и выбрасывается
+    TimeoutError. Вызов из потока самого фонового цикла выбрасывает RuntimeError:
+    цикл не смог бы выполнить корутину, пока поток ждет ее результат.
+    """
+    loop = get_background_loop()
+    if threading.current_thread() is _background_thread:
+        coro.close()
+        raise RuntimeError("run_coroutine_sync вызван из потока фонового цикла событий: "
+                           "ожидание результата заблокировало бы цикл, используйте await")
+    if timeout is None:
+        timeout = LLM_CALL_TIMEOUT
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result(timeout)
+    except TimeoutError:
+        future.cancel()
+        raise TimeoutError(f"Корутина не завершилась за {timeout:g} с и отменена") from None
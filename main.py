@@ -2,10 +2,14 @@
 
 # Импорты
 import os
+import sys
 import logging
+import argparse
 from datetime import datetime
-from Source.agent import agent
-from Source.tools import analyze_file_alert
+from Source.agent import get_agent
+from Source.tools import analyze_file_alert_with_groups, analyze_single_alert, DEFAULT_MAX_ALERTS_TO_SHOW
+from Source.utils import settings, root_dir, metrics, llm_client, alert_history
+from Source.alert_follower import create_follower
 
 # Настройка логирования
 def setup_logging():
@@ -77,6 +81,69 @@ def select_alert_file():
         else:
             print("❌ Некорректный выбор. Пожалуйста, введите число от 1 до 3.")
 
+def follow_alert_file(file_path: str, logger):
+    """
+    Слежение за файлом алертов: анализируются только новые алерты,
+    дописанные в файл. Позиция в файле сохраняется между запусками.
+    Остановка - Ctrl+C.
+    """
+    follow_settings = settings.get("follow", {})
+    follower = create_follower(file_path, follow_settings, root_dir)
+    print(f"\n👀 Слежение за файлом: {os.path.basename(file_path)} (Ctrl+C для остановки)")
+    logger.info(f"Начато слежение за файлом: {file_path}")
+    
+    analyzed_count = 0
+    try:
+        for alert_text in follower.follow(poll_interval=follow_settings.get("poll_interval", 1.0)):
+            analyzed_count += 1
+            # Новые алерты из файла сохраняются в историю
+            result = analyze_single_alert(alert_text, history=alert_history)
+            print("🤖 :", result)
+            logger.info(f"Бот (новый алерт #{analyzed_count}): {result}")
+    except KeyboardInterrupt:
+        print(f"\n⏹ Слежение остановлено. Проанализировано новых алертов: {analyzed_count}")
+        logger.info(f"Слежение за файлом {file_path} остановлено, новых алертов: {analyzed_count}")
+
+def stream_agent_response(agent, user_input: str, config: dict, logger) -> str:
+    """
+    Вызов агента с потоковым выводом: токены ответа модели печатаются по мере
+    генерации, вызовы инструментов - отдельными строками.
+    
+    Returns:
+        str: Полный текст итогового ответа (для лога)
+    """
+    answer_parts = []
+    announced_tool_calls = set()
+    printing = False
+    for chunk, metadata in agent.stream({"messages": [("user", user_input)]}, config=config, stream_mode="messages"):
+        node = metadata.get("langgraph_node")
+        if node == "tools" and chunk.type == "tool":
+            logger.info(f"Инструмент {chunk.name} выполнен")
+            print(f"   ✅ {chunk.name}: готово")
+            continue
+        # Токены моделей внутри инструментов (анализ алертов ботом) в консоль не выводятся
+        if node != "agent" or chunk.type not in ("AIMessageChunk", "ai"):
+            continue
+        for tool_call in getattr(chunk, "tool_call_chunks", None) or []:
+            if tool_call.get("name") and tool_call.get("id") not in announced_tool_calls:
+                announced_tool_calls.add(tool_call.get("id"))
+                if printing:
+                    print()
+                    printing = False
+                # Текст до вызова инструмента - промежуточный, в итоговый ответ не входит
+                answer_parts = []
+                logger.info(f"Вызов инструмента: {tool_call['name']}")
+                print(f"🔧 Вызов инструмента: {tool_call['name']}...", flush=True)
+        if isinstance(chunk.content, str) and chunk.content:
+            if not printing:
+                print("🤖 : ", end="", flush=True)
+                printing = True
+            print(chunk.content, end="", flush=True)
+            answer_parts.append(chunk.content)
+    if printing:
+        print()
+    return "".join(answer_parts)
+
 # Основной цикл общения с агентом
 def chat(thread_id: str):
     """
@@ -90,13 +157,21 @@ def chat(thread_id: str):
     alert_analyzed = False
     last_alert_file = ""
     
-    config = {"configurable": {"thread_id": thread_id}}
+    # Агент и модель создаются при первом обращении
+    agent = get_agent()
+    from Source.alert_context import remember_alert, summarize_alert_groups
+    # Обработчик метрик замеряет задержку и токены каждого вызова модели внутри агента
+    config = {"configurable": {"thread_id": thread_id}, "callbacks": [metrics.callback_handler()]}
+    stream_responses = settings.get("conversation", {}).get("stream_responses", True)
+    # Отчет по файлу и сведения о последнем алерте описывают одни и те же проблемы
+    max_alerts_to_show = settings.get("max_alerts_to_show", DEFAULT_MAX_ALERTS_TO_SHOW)
     welcome_message = "Добро пожаловать в терминал общения с GigaChat!"
     instructions = """Напишите Ваш запрос или введите 'exit' для выхода.
     
 📄 Для анализа файлов с алертами введите 'файл' или 'анализ файла алерта'
 📋 После анализа алерта можно запросить информацию о нем через 'последний алерт'
-🔄 Для повторного анализа последнего алерта введите 'повторный анализ'"""
+🔄 Для повторного анализа последнего алерта введите 'повторный анализ'
+👀 Для анализа только новых алертов, дописываемых в файл, введите 'слежение'"""
     
     print(welcome_message)
     print(instructions)
@@ -105,6 +180,8 @@ def chat(thread_id: str):
     
     while True:
         try:
+            # Метрики предыдущего хода выгружаются в Logs/ (Prometheus и JSON)
+            metrics.export()
             user_input = input("\n>>: ")
             logger.info(f"Пользователь: {user_input}")
             
@@ -126,35 +203,19 @@ def chat(thread_id: str):
                     print(f"\n📄 Анализ файла: {os.path.basename(selected_file)}")
                     logger.info(f"Выбран файл для анализа: {selected_file}")
                     
-                    result = analyze_file_alert.invoke(selected_file)
+                    result, groups = analyze_file_alert_with_groups(selected_file, history=alert_history)
                     print("🤖 :", result)
                     logger.info(f"Бот (прямой вызов): {result}")
                     
-                    # Читаем оригинальный текст алерта для сохранения
-                    original_alert_text = ""
-                    try:
-                        with open(selected_file, 'r', encoding='utf-8') as alert_file:
-                            original_alert_text = alert_file.read()
-                            alert_analyzed = True  # Отмечаем, что алерт был проанализирован
-                            last_alert_file = selected_file
-                    except Exception as e:
-                        logger.error(f"Ошибка при чтении оригинального алерта: {str(e)}")
-                        original_alert_text = "Текст алерта не удалось прочитать"
-                    
-                    # Сохраняем анализ алерта в контексте диалога для дальнейшего взаимодействия
-                    save_to_context = f"""Я проанализировал алерт из файла {os.path.basename(selected_file)}. 
-
-Оригинальный текст алерта:
-```
-{original_alert_text}
-```
-
-Результат анализа:
-{result}"""
+                    alert_analyzed = True  # Отмечаем, что алерт был проанализирован
+                    last_alert_file = selected_file
                     
-                    # Добавляем результат анализа в историю диалога
+                    # Краткие сведения об алерте строятся по группам из отчета и записываются
+                    # в состояние диалога без обращения к модели
                     try:
-                        response = agent.invoke({"messages": [("user", "Сохрани информацию о проанализированном алерте:"), ("assistant", save_to_context)]}, config=config)
+                        if groups is None:
+                            raise ValueError("файл алертов не проанализирован")
+                        remember_alert(agent, config, summarize_alert_groups(selected_file, groups, max_alerts_to_show))
                         logger.info("Результат анализа алерта сохранен в истории диалога с ботом")
                         print("📋 Информация об алерте сохранена в памяти бота. Вы можете задавать вопросы по этому алерту.")
                     except Exception as e:
@@ -175,32 +236,15 @@ def chat(thread_id: str):
                     try:
                         print(f"\n📄 Повторный анализ файла: {os.path.basename(last_alert_file)}")
                         
-                        result = analyze_file_alert.invoke(last_alert_file)
+                        result, groups = analyze_file_alert_with_groups(last_alert_file, history=alert_history)
                         print("🤖 :", result)
                         logger.info(f"Бот (повторный вызов): {result}")
                         
                         # Обновляем сохраненную информацию об алерте
                         try:
-                            with open(last_alert_file, 'r', encoding='utf-8') as alert_file:
-                                original_alert_text = alert_file.read()
-                        except Exception as e:
-                            logger.error(f"Ошибка при чтении оригинального алерта: {str(e)}")
-                            original_alert_text = "Текст алерта не удалось прочитать"
-                        
-                        # Сохраняем обновленный анализ алерта в контексте диалога
-                        save_to_context = f"""Я повторно проанализировал алерт из файла {os.path.basename(last_alert_file)}. 
-
-Оригинальный текст алерта:
-```
-{original_alert_text}
-```
-
-Результат анализа:
-{result}"""
-                        
-                        # Добавляем результат анализа в историю диалога
-                        try:
-                            response = agent.invoke({"messages": [("user", "Сохрани обновленную информацию о проанализированном алерте:"), ("assistant", save_to_context)]}, config=config)
+                            if groups is None:
+                                raise ValueError("файл алертов не проанализирован")
+                            remember_alert(agent, config, summarize_alert_groups(last_alert_file, groups, max_alerts_to_show))
                             logger.info("Обновленный результат анализа алерта сохранен в истории диалога с ботом")
                             print("📋 Обновленная информация об алерте сохранена в памяти бота.")
                         except Exception as e:
@@ -218,6 +262,18 @@ def chat(thread_id: str):
                     logger.info("Запрос на повторный анализ отклонен - алерт не был проанализирован")
                     continue
             
+            # Слежение за файлом: анализ только новых алертов вместо повторного анализа всего файла
+            if user_input.lower() in ["слежение", "следить за файлом", "слежение за файлом"]:
+                try:
+                    selected_file = select_alert_file()
+                    follow_alert_file(selected_file, logger)
+                    alert_analyzed = True
+                    last_alert_file = selected_file
+                except Exception as e:
+                    logger.error(f"Ошибка при слежении за файлом: {str(e)}", exc_info=True)
+                    print("🤖 :", f"Произошла ошибка при слежении за файлом: {str(e)}")
+                continue
+            
             # Проверяем, если пользователь запрашивает информацию о последнем алерте
             if user_input.lower() in ["последний алерт", "расскажи о последнем алерте", "что там с алертом", "данные алерта"]:
                 logger.info("Пользователь запрашивает информацию о последнем проанализированном алерте")
@@ -234,14 +290,24 @@ def chat(thread_id: str):
             # Формируем безопасную кодировку ввода
             safe_input = user_input.encode('utf-8', errors='replace').decode('utf-8')
             
-            # Вызов агента для получения ответа
-            response = agent.invoke({"messages": [("user", safe_input)]}, config=config)
+            # Пока API модели недоступен, запрос не отправляется
+            if not llm_client.available():
+                unavailable_message = "GigaChat временно недоступен, повторите запрос позже."
+                print("🤖 :", unavailable_message)
+                logger.warning(f"Бот: {unavailable_message}")
+                continue
             
-            # Получение ответа бота
-            bot_response = response["messages"][-1].content
+            # Вызов агента: с потоковым выводом ответ печатается по мере генерации
+            with metrics.track("agent_invoke", kind="agent"), llm_client.guard():
+                if stream_responses:
+                    bot_response = stream_agent_response(agent, safe_input, config, logger)
+                else:
+                    response = agent.invoke({"messages": [("user", safe_input)]}, config=config)
+                    # Получение ответа бота
+                    bot_response = response["messages"][-1].content
+                    print("🤖 :", bot_response)
             
-            # Вывод ответа и логирование
-            print("🤖 :", bot_response)
+            # Логирование полного ответа
             logger.info(f"Бот: {bot_response}")
             
         except KeyboardInterrupt:
@@ -254,6 +320,97 @@ def chat(thread_id: str):
             error_message = f"Произошла ошибка: {str(e)}"
             print(error_message)
             logger.error(f"Ошибка при обработке запроса: {str(e)}", exc_info=True)
+    
+    metrics.export()
+
+def analyze_command(args):
+    """
+    Неинтерактивный пакетный анализ: python main.py analyze <каталог|glob> [--workers N] [--no-llm] [--out results.jsonl]
+    """
+    from Source.batch import run_batch
+    
+    batch_settings = settings.get("batch", {})
+    state_path = args.state or batch_settings.get("state_path")
+    if state_path and not os.path.isabs(state_path):
+        state_path = os.path.join(root_dir, state_path)
+    
+    stats = run_batch(args.target, args.out, workers=args.workers, include_llm=not args.no_llm,
+                      state_path=state_path, force=args.force, history=alert_history)
+    print(f"✅ Файлов: {stats['files']}, проанализировано: {stats['analyzed']}, "
+          f"без изменений: {stats['skipped']}, с ошибками: {stats['failed']}, алертов: {stats['alerts']}")
+    print(f"📄 Результаты: {args.out}")
+    return 1 if stats['failed'] else 0
+
+def serve_command(args):
+    """
+    Прием алертов по HTTP: python main.py serve [--port N] [--workers N] [--queue-size N] [--no-llm] [--out results.jsonl]
+    """
+    import asyncio
+    from Source.ingest_server import create_ingest_server
+    
+    ingest_settings = dict(settings.get("ingest", {}))
+    for key, value in (("host", args.host), ("port", args.port), ("workers", args.workers),
+                       ("queue_size", args.queue_size), ("sink_path", args.out)):
+        if value is not None:
+            ingest_settings[key] = value
+    include_bot_analysis = not args.no_llm and ingest_settings.get("include_bot_analysis", True)
+    server = create_ingest_server(
+        ingest_settings, root_dir,
+        # Принятые алерты сохраняются в историю
+        analyze=lambda alert_text: analyze_single_alert(alert_text, include_bot_analysis=include_bot_analysis,
+                                                        history=alert_history),
+        metrics=metrics,
+    )
+    
+    def ready(server):
+        print(f"📡 Прием алертов: POST http://{server.host}:{server.port}/alerts "
+              f"(очередь {server.queue_size}, обработчиков {server.workers}, LLM: {include_bot_analysis})")
+        print(f"📄 Результаты: {server.sink.path} (Ctrl+C для остановки)")
+    
+    try:
+        asyncio.run(server.serve(ready))
+    except KeyboardInterrupt:
+        pass
+    stats = server.stats()
+    print(f"\n⏹ Прием остановлен. Принято: {stats['accepted']}, отклонено: {stats['rejected']}, "
+          f"обработано: {stats['processed']}, с ошибками: {stats['failed']}")
+    metrics.export()
+    return 0
+
+def main(argv=None):
+    """
+    Точка входа: без аргументов - интерактивный чат, analyze - пакетный анализ файлов,
+    serve - прием алертов по HTTP.
+    """
+    parser = argparse.ArgumentParser(description="Агент анализа алертов на основе GigaChat")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    chat_parser = subparsers.add_parser("chat", help="Интерактивный чат с агентом (по умолчанию)")
+    chat_parser.add_argument("--thread-id", default="SberAX_consultant", help="Идентификатор диалога")
+    
+    analyze_parser = subparsers.add_parser("analyze", help="Пакетный анализ каталога или glob-шаблона файлов с алертами")
+    analyze_parser.add_argument("target", help="Каталог (рекурсивно) или glob-шаблон, например 'archive/**/*.txt'")
+    analyze_parser.add_argument("--workers", type=int, default=None, help="Количество процессов (по умолчанию - число CPU)")
+    analyze_parser.add_argument("--no-llm", action="store_true", help="Только разбор алертов, без анализа модели")
+    analyze_parser.add_argument("--out", default="results.jsonl", help="Файл JSONL для записей об алертах (дописывается)")
+    analyze_parser.add_argument("--state", default=None, help="Файл хэшей проанализированных файлов (по умолчанию из настроек)")
+    analyze_parser.add_argument("--force", action="store_true", help="Анализировать и неизмененные файлы")
+    
+    serve_parser = subparsers.add_parser("serve", help="Прием алертов по HTTP (POST /alerts) с анализом в фоне")
+    serve_parser.add_argument("--host", default=None, help="Адрес (по умолчанию из настроек, 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, default=None, help="Порт (по умолчанию из настроек)")
+    serve_parser.add_argument("--workers", type=int, default=None, help="Количество обработчиков очереди")
+    serve_parser.add_argument("--queue-size", type=int, default=None, help="Размер очереди; при заполнении ответ 429")
+    serve_parser.add_argument("--no-llm", action="store_true", help="Только разбор алертов, без анализа модели")
+    serve_parser.add_argument("--out", default=None, help="Файл JSONL для результатов (дописывается)")
+    
+    args = parser.parse_args(argv)
+    if args.command == "analyze":
+        return analyze_command(args)
+    if args.command == "serve":
+        return serve_command(args)
+    chat(getattr(args, "thread_id", "SberAX_consultant"))
+    return 0
 
 if __name__ == "__main__":
-    chat('SberAX_consultant')
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Тесты кратких сведений о последнем алерте: сведения строятся по тем же
+проблемам, что показаны в отчете по файлу.
+
+Запуск: python test_alert_context.py (или через pytest).
+"""
+import os
+import sys
+import logging
+import tempfile
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('test_alert_context')
+
+# Добавляем директорию проекта в пути поиска модулей
+project_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(project_dir)
+
+# Анализ бота выполняет модель-заглушка, без обращения к GigaChat
+os.environ.setdefault("LLM_BACKEND", "fake")
+
+from Source.tools import analyze_file_alert_with_groups, analyze_single_alert, DEFAULT_MAX_ALERTS_TO_SHOW
+from Source.alert_context import summarize_alert_groups
+from Source.alert_history import AlertHistory
+
+PROBLEM_IDS = [f"P-30000{i}" for i in range(1, 6)]
+
+
+def _write_alerts(directory: str, problem_ids: list) -> str:
+    file_path = os.path.join(directory, 'alerts.txt')
+    with open(file_path, 'w', encoding='utf-8') as f:
+        for problem_id in problem_ids:
+            f.write(f"ПРОМ | АС Рефлекс RESOLVED {problem_id} | Dimension=/api/v1/status 500 POST\n")
+    return file_path
+
+
+def test_summary_describes_reported_problems():
+    """Сведения о последнем алерте содержат те же проблемы, что и отчет, без повторного чтения файла."""
+    history = AlertHistory(':memory:')
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = _write_alerts(directory, PROBLEM_IDS)
+        report, groups = analyze_file_alert_with_groups(file_path, history=history)
+        # Файл удален: сведения строятся только по группам из анализа
+        os.remove(file_path)
+        summary = summarize_alert_groups(file_path, groups, DEFAULT_MAX_ALERTS_TO_SHOW)
+
+    shown = PROBLEM_IDS[:DEFAULT_MAX_ALERTS_TO_SHOW]
+    assert [problem['problem_id'] for problem in summary['problems']] == shown, summary['problems']
+    assert all(f"Проблема {problem_id}" in report for problem_id in shown)
+    assert not any(f"Проблема {problem_id}" in report for problem_id in PROBLEM_IDS[len(shown):])
+    assert summary['problems_count'] == len(PROBLEM_IDS) and summary['alerts_count'] == len(PROBLEM_IDS)
+    assert summary['status_counts'] == {'RESOLVED': len(PROBLEM_IDS)}
+    # Алерты файла сохранены в переданную историю
+    assert history.query()['total'] == len(PROBLEM_IDS)
+
+
+def test_single_alert_and_missing_file():
+    """Файл с одним алертом дает одну группу, отсутствующий файл - отчет об ошибке без групп."""
+    history = AlertHistory(':memory:')
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = _write_alerts(directory, PROBLEM_IDS[:1])
+        _, groups = analyze_file_alert_with_groups(file_path, history=history)
+        assert [group.problem_id for group in groups] == PROBLEM_IDS[:1]
+        assert history.query()['total'] == 1
+
+        report, groups = analyze_file_alert_with_groups(os.path.join(directory, 'missing.txt'))
+        assert groups is None and "Файл не найден" in report
+
+
+def test_history_is_written_only_when_passed():
+    """Анализ алерта сохраняет его только в явно переданную историю."""
+    history = AlertHistory(':memory:')
+    alert_text = f"ПРОМ | АС Рефлекс OPEN {PROBLEM_IDS[0]} | Dimension=/api/v1/status 500 POST"
+    analysis = analyze_single_alert(alert_text, include_bot_analysis=False)
+    assert analysis.record.problem_id == PROBLEM_IDS[0] and history.query()['total'] == 0
+    analyze_single_alert(alert_text, include_bot_analysis=False, history=history)
+    assert history.query(problem_id=PROBLEM_IDS[0])['total'] == 1
+
+
+def main():
+    """
+    Запускает проверки и возвращает код завершения
+    """
+    failed = False
+    for test in (test_summary_describes_reported_problems, test_single_alert_and_missing_file,
+                 test_history_is_written_only_when_passed):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"❌ {test.__name__}: {str(e)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
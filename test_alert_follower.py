@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Тесты режима слежения за файлом алертов: сохранение смещения между запусками.
+
+Запуск: python test_alert_follower.py (или через pytest).
+"""
+import os
+import sys
+import logging
+import tempfile
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('test_alert_follower')
+
+# Добавляем директорию проекта в пути поиска модулей
+project_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(project_dir)
+
+from Source.alert_follower import AlertFollower, FollowState
+
+ALERTS = [
+    "ПРОМ | АС Рефлекс OPEN P-100001 | первый алерт",
+    "ПРОМ | АС Рефлекс OPEN P-100002 | второй алерт",
+    "ПРОМ | АС Рефлекс RESOLVED P-100001 | третий алерт",
+]
+
+
+def _write_alerts(directory: str, encoding: str = 'utf-8') -> str:
+    file_path = os.path.join(directory, 'alerts.txt')
+    with open(file_path, 'w', encoding=encoding) as f:
+        f.write('\n'.join(ALERTS) + '\n')
+    return file_path
+
+
+def _follower(file_path: str, state_path: str) -> AlertFollower:
+    return AlertFollower(file_path, FollowState(state_path), idle_flush_seconds=None)
+
+
+def test_interrupted_alert_is_delivered_again():
+    """Алерт, анализ которого прервали, выдается повторно после перезапуска."""
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = _write_alerts(directory)
+        state_path = os.path.join(directory, 'state.json')
+
+        with _follower(file_path, state_path) as follower:
+            alerts = follower.poll()
+            assert next(alerts) == ALERTS[0]
+            # Остановка процесса во время анализа первого алерта
+            alerts.close()
+
+        with _follower(file_path, state_path) as follower:
+            alerts = follower.poll()
+            assert next(alerts) == ALERTS[0]
+            # Первый алерт обработан - потребитель запросил следующий
+            assert next(alerts) == ALERTS[1]
+            alerts.close()
+
+        with _follower(file_path, state_path) as follower:
+            # Второй алерт тоже прерван; последний завершается только началом следующего или по таймауту
+            assert list(follower.poll()) == [ALERTS[1]]
+            follower.idle_flush_seconds = 0
+            assert list(follower.poll()) == [ALERTS[2]]
+
+        with _follower(file_path, state_path) as follower:
+            assert list(follower.poll()) == []
+
+
+def test_utf16_file_is_split_into_alerts():
+    """В UTF-16, UTF-32 и cp1251 алерты делятся так же, как в iter_alerts, в том числе дописанные."""
+    from Source.alert_reader import iter_alerts
+
+    # Кодировка файла и кодировка дописываемого текста (без повторного BOM)
+    for encoding, append_encoding in (('utf-16', 'utf-16-le'), ('utf-16-be', 'utf-16-be'),
+                                      ('utf-32', 'utf-32-le'), ('cp1251', 'cp1251')):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = _write_alerts(directory, encoding)
+            with _follower(file_path, os.path.join(directory, 'state.json')) as follower:
+                assert list(follower.poll()) == ALERTS[:2], encoding
+                with open(file_path, 'ab') as f:
+                    f.write("ПРОМ | АС Рефлекс OPEN P-100003 | четвертый алерт\n".encode(append_encoding))
+                assert list(follower.poll()) == [ALERTS[2]], encoding
+                follower.idle_flush_seconds = 0
+                alerts = list(follower.poll())
+            assert alerts == ["ПРОМ | АС Рефлекс OPEN P-100003 | четвертый алерт"], f"{encoding}: {alerts}"
+            assert not any('\x00' in alert for alert in alerts)
+
+    sample_path = os.path.join(project_dir, 'TestAlerts', 'sample_alert.txt')
+    with AlertFollower(sample_path, FollowState(), idle_flush_seconds=0) as follower:
+        # Последний алерт выдается на опросе, когда файл не изменился с прошлого
+        alerts = list(follower.poll()) + list(follower.poll())
+    assert alerts == list(iter_alerts(sample_path))
+
+
+def main():
+    """
+    Запускает проверки и возвращает код завершения
+    """
+    failed = False
+    for test in (test_interrupted_alert_is_delivered_again, test_utf16_file_is_split_into_alerts):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"❌ {test.__name__}: {str(e)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+Тесты истории алертов: фильтр и группировка по сервису на алертах из TestAlerts
+и использование индексов.
+
+Запуск: python test_alert_history.py (или через pytest).
+"""
+import os
+import sys
+import glob
+import sqlite3
+import logging
+import tempfile
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('test_alert_history')
+
+# Добавляем директорию проекта в пути поиска модулей
+project_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(project_dir)
+
+from Source.alert_reader import iter_alerts
+from Source.alert_parser import alert_parser
+from Source.alert_history import AlertHistory, parse_history_query
+
+TEST_ALERTS = sorted(glob.glob(os.path.join(project_dir, 'TestAlerts', '*.txt')))
+
+
+def _history(db_path: str = ':memory:') -> AlertHistory:
+    """История с алертами из всех файлов TestAlerts (повторы одного текста сохраняются один раз)."""
+    history = AlertHistory(db_path)
+    for file_path in TEST_ALERTS:
+        history.add_records((alert_parser.parse(alert) for alert in iter_alerts(file_path)), source=file_path)
+    return history
+
+
+def test_service_filter_finds_parsed_alerts():
+    """service=skillflow находит алерты skillflow из TestAlerts по токенам ключа сервиса."""
+    history = _history()
+    result = history.query(**parse_history_query("service=skillflow"))
+    # skillflow-smartapp (P-250444398) и CI05272529_skillflow_pod_failed в двух форматах (P-250458962)
+    assert result['total'] == 3, result
+    assert history.query(service='SkillFlow')['total'] == 3
+    assert history.query(service='skill')['total'] == 3
+    assert history.query(service='skillflow smartapp')['total'] == 1
+    assert history.query(service='cccore')['total'] == 1
+    assert history.query(service='uwptextapp')['total'] == 2
+    assert history.query(service='погода')['total'] == 0
+    # Имя системы мониторинга из заголовка не считается сервисом
+    assert history.query(service='рефлекс')['total'] == 0
+
+
+def test_group_by_service_uses_service_key():
+    """group_by=service группирует по сервису, а не по заголовку с номером проблемы."""
+    history = _history()
+    groups = dict(history.query(group_by='service')['groups'])
+    assert groups == {
+        "CI05272529_skillflow_pod_failed": 2,
+        "CI02858346_cccore_общий_main_metric": 1,
+        "skillflow-smartapp": 1,
+        "uwptextapp": 1,
+        "uwptextapp_memory_issues": 1,
+    }, groups
+
+
+def test_service_filter_uses_index():
+    """Запросы с фильтром по сервису выполняются поиском по таблице токенов, а не полным перебором."""
+    history = _history()
+    connection = history._connect()
+    statements = []
+    connection.set_trace_callback(statements.append)
+    history.query(service='skillflow', group_by='http_code')
+    connection.set_trace_callback(None)
+
+    assert len(statements) == 3, statements
+    for statement in statements:
+        plan = " ".join(row[-1] for row in connection.execute(f"EXPLAIN QUERY PLAN {statement}"))
+        assert "SEARCH alert_service_tokens USING PRIMARY KEY" in plan, f"{statement}: {plan}"
+        assert "SCAN alerts" not in plan, f"{statement}: {plan}"
+
+
+def test_existing_database_is_migrated():
+    """В базе прежней версии добавляется столбец ключа сервиса, прежние индексы по service удаляются."""
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'history.db')
+        with sqlite3.connect(db_path) as connection:
+            connection.executescript("""
+                CREATE TABLE alerts (id INTEGER PRIMARY KEY, alert_hash TEXT NOT NULL UNIQUE, problem_id TEXT,
+                    status TEXT NOT NULL, service TEXT, service_lc TEXT, alert_type TEXT, http_code TEXT,
+                    detected_at TEXT, detected_until TEXT, error_message TEXT, source TEXT, recorded_at TEXT NOT NULL);
+                CREATE INDEX idx_alerts_service ON alerts(service);
+                CREATE INDEX idx_alerts_service_lc ON alerts(service_lc);
+            """)
+        connection.close()
+
+        history = _history(db_path)
+        assert history.query(service='skillflow')['total'] == 3
+        history.close()
+        with sqlite3.connect(db_path) as connection:
+            indexes = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        connection.close()
+        assert "idx_alerts_service_key" in indexes, indexes
+        assert not indexes & {"idx_alerts_service", "idx_alerts_service_lc"}, indexes
+
+
+def main():
+    """
+    Запускает проверки и возвращает код завершения
+    """
+    failed = False
+    for test in (test_service_filter_finds_parsed_alerts, test_group_by_service_uses_service_key,
+                 test_service_filter_uses_index, test_existing_database_is_migrated):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"❌ {test.__name__}: {str(e)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
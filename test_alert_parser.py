@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+Тесты разбора алертов: номер проблемы и группировка фрагментов по нему.
+
+Запуск: python test_alert_parser.py (или через pytest).
+"""
+import os
+import sys
+import logging
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('test_alert_parser')
+
+# Добавляем директорию проекта в пути поиска модулей
+project_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(project_dir)
+
+from Source.alert_parser import alert_parser
+from Source.alert_groups import group_alerts_by_problem
+
+
+def test_problem_id_is_whole_word():
+    """Части других слов ("HTTP-500", "APP-123") не считаются номером проблемы."""
+    for text in ("ПРОМ | OPEN HTTP-500 на сервисе skillflow",
+                 "ПРОМ | OPEN ошибка APP-123 в приложении",
+                 "ПРОМ | OPEN код TP-42"):
+        record = alert_parser.parse(text)
+        assert record.problem_id is None, f"{text!r}: номер проблемы {record.problem_id}"
+
+
+def test_problem_id_and_status_from_header():
+    """Номер проблемы и статус берутся из заголовка, в том числе после "Status:"."""
+    record = alert_parser.parse("ПРОМ | АС Рефлекс OPEN P-250433353 | HTTP-500 ошибка")
+    assert record.problem_id == "P-250433353"
+    assert record.status == "OPEN"
+    record = alert_parser.parse("ПРОМ | АС Рефлекс | RESOLVED | Problem Status:P-250458962")
+    assert record.problem_id == "P-250458962"
+
+
+def test_http_error_alerts_are_not_grouped_together():
+    """Разные алерты с "HTTP-500" без номера проблемы остаются отдельными группами."""
+    records = [alert_parser.parse(f"ПРОМ | OPEN HTTP-500 на сервисе {service}")
+               for service in ("skillflow", "cccore", "skillflow")]
+    groups = group_alerts_by_problem(records)
+    assert len(groups) == 3
+    assert all(group.problem_id is None for group in groups)
+
+
+def main():
+    """
+    Запускает проверки и возвращает код завершения
+    """
+    failed = False
+    for test in (test_problem_id_is_whole_word, test_problem_id_and_status_from_header,
+                 test_http_error_alerts_are_not_grouped_together):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"❌ {test.__name__}: {str(e)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
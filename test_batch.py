@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Тесты пакетного анализа: пропуск неизмененных файлов учитывает выходной файл.
+
+Запуск: python test_batch.py (или через pytest).
+"""
+import os
+import sys
+import json
+import shutil
+import logging
+import tempfile
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('test_batch')
+
+# Добавляем директорию проекта в пути поиска модулей
+project_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(project_dir)
+
+from Source.batch import run_batch, collect_files, file_hash
+
+TEST_ALERTS = os.path.join(project_dir, 'TestAlerts')
+
+
+def _read_files(out_path: str) -> set:
+    """Файлы, записи которых есть в выходном JSONL."""
+    with open(out_path, 'r', encoding='utf-8') as f:
+        return {json.loads(line)['file'] for line in f if line.strip()}
+
+
+def test_new_output_gets_all_records():
+    """Повторный запуск в новый выходной файл записывает в него алерты всех файлов."""
+    with tempfile.TemporaryDirectory() as directory:
+        alerts_dir = os.path.join(directory, 'alerts')
+        shutil.copytree(TEST_ALERTS, alerts_dir)
+        state_path = os.path.join(directory, 'state.json')
+        first_out = os.path.join(directory, 'first.jsonl')
+        second_out = os.path.join(directory, 'second.jsonl')
+
+        first = run_batch(alerts_dir, first_out, workers=1, include_llm=False, state_path=state_path)
+        assert first['analyzed'] == first['files'] > 0, first
+
+        # Тот же выходной файл: неизмененные файлы пропускаются
+        repeated = run_batch(alerts_dir, first_out, workers=1, include_llm=False, state_path=state_path)
+        assert repeated['skipped'] == repeated['files'], repeated
+
+        second = run_batch(alerts_dir, second_out, workers=1, include_llm=False, state_path=state_path)
+        assert second['skipped'] == 0, second
+        assert _read_files(second_out) == _read_files(first_out), second
+
+        # Удаленный выходной файл создается заново со всеми записями
+        os.remove(first_out)
+        recreated = run_batch(alerts_dir, first_out, workers=1, include_llm=False, state_path=state_path)
+        assert recreated['skipped'] == 0, recreated
+        assert _read_files(first_out) == _read_files(second_out)
+
+
+def test_legacy_state_is_ignored():
+    """Хэши прежнего формата без выходного файла не приводят к пропуску файлов."""
+    with tempfile.TemporaryDirectory() as directory:
+        alerts_dir = os.path.join(directory, 'alerts')
+        shutil.copytree(TEST_ALERTS, alerts_dir)
+        out_path = os.path.join(directory, 'out.jsonl')
+        state_path = os.path.join(directory, 'state.json')
+        run_batch(alerts_dir, out_path, workers=1, include_llm=False)
+        with open(state_path, 'w', encoding='utf-8') as f:
+            json.dump({path: file_hash(path) for path in collect_files(alerts_dir)}, f)
+
+        stats = run_batch(alerts_dir, out_path, workers=1, include_llm=False, state_path=state_path)
+        assert stats['skipped'] == 0, stats
+
+
+def main():
+    """
+    Запускает проверки и возвращает код завершения
+    """
+    failed = False
+    for test in (test_new_output_gets_all_records, test_legacy_state_is_ignored):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"❌ {test.__name__}: {str(e)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
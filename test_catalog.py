@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""
+Тесты горячей перезагрузки справочников: перестроение индекса в фоне.
+
+Запуск: python test_catalog.py (или через pytest).
+"""
+import os
+import sys
+import json
+import time
+import pickle
+import logging
+import tempfile
+import threading
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('test_catalog')
+
+# Добавляем директорию проекта в пути поиска модулей
+project_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(project_dir)
+
+from Source.catalog import Catalog, SNAPSHOT_KEY_FILE
+
+
+class SlowIndex(list):
+    """Индекс-список, сборку которого можно задержать до разрешения release."""
+
+    release = None
+
+    def __init__(self, entries):
+        if SlowIndex.release is not None:
+            SlowIndex.release.wait(5)
+        super().__init__(entries)
+
+
+class CountingIndex(list):
+    """Индекс-список, считающий свои сборки."""
+
+    builds = 0
+
+    def __init__(self, entries):
+        CountingIndex.builds += 1
+        super().__init__(entries)
+
+
+class Exploit:
+    """Объект, который при распаковке из pickle создает файл-маркер."""
+
+    def __init__(self, marker: str):
+        self.marker = marker
+
+    def __reduce__(self):
+        return open, (self.marker, 'w')
+
+
+def _write(path: str, entries: list) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(entries, f)
+
+
+def test_reload_runs_in_background():
+    """Пока новый индекс собирается, читатели без ожидания получают прежний."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'catalog.json')
+        _write(path, [{'name': 'old'}])
+        catalog = Catalog(path, SlowIndex, check_interval=0)
+        old_index = catalog.index
+        assert old_index == [{'name': 'old'}]
+
+        SlowIndex.release = threading.Event()
+        try:
+            _write(path, [{'name': 'new'}, {'name': 'newer'}])
+            started = time.monotonic()
+            for _ in range(3):
+                assert catalog.index is old_index
+            assert time.monotonic() - started < 1.0, "читатель ждал перезагрузку"
+            assert catalog._reload_thread.is_alive()
+        finally:
+            SlowIndex.release.set()
+            SlowIndex.release = None
+        catalog.wait_reload(5)
+        assert catalog.index == [{'name': 'new'}, {'name': 'newer'}]
+
+
+def test_broken_file_keeps_previous_index():
+    """Недописанный файл не заменяет индекс; после исправления файла индекс перезагружается."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'catalog.json')
+        _write(path, [{'name': 'old'}])
+        catalog = Catalog(path, SlowIndex, check_interval=0)
+        old_index = catalog.index
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('[{"name": ')
+        catalog.index
+        catalog.wait_reload(5)
+        assert catalog.index is old_index
+        catalog.wait_reload(5)
+
+        _write(path, [{'name': 'fixed'}])
+        catalog.index
+        catalog.wait_reload(5)
+        assert catalog.index == [{'name': 'fixed'}]
+
+
+def test_tampered_snapshot_is_not_unpickled():
+    """Снимок без верной подписи не распаковывается, а пересобирается из JSON."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'catalog.json')
+        snapshot_path = os.path.join(directory, 'snapshots', 'catalog.pickle')
+        marker = os.path.join(directory, 'pwned')
+        _write(path, [{'name': 'entry'}])
+        CountingIndex.builds = 0
+
+        Catalog(path, CountingIndex, snapshot_path).index
+        assert Catalog(path, CountingIndex, snapshot_path).index == [{'name': 'entry'}]
+        assert CountingIndex.builds == 1, "подписанный снимок должен загружаться без сборки"
+        key_path = os.path.join(directory, 'snapshots', SNAPSHOT_KEY_FILE)
+        if os.name == 'posix':
+            assert os.stat(key_path).st_mode & 0o777 == 0o600, oct(os.stat(key_path).st_mode)
+
+        # Подпись от прежнего содержимого, содержимое подменено
+        with open(snapshot_path, 'rb') as f:
+            header = f.readline()
+        with open(snapshot_path, 'wb') as f:
+            f.write(header + pickle.dumps(Exploit(marker)))
+        assert Catalog(path, CountingIndex, snapshot_path).index == [{'name': 'entry'}]
+        assert not os.path.exists(marker)
+        assert CountingIndex.builds == 2
+
+        # Неподписанный pickle прежнего формата
+        with open(snapshot_path, 'wb') as f:
+            pickle.dump(Exploit(marker), f)
+        assert Catalog(path, CountingIndex, snapshot_path).index == [{'name': 'entry'}]
+        assert not os.path.exists(marker)
+        assert CountingIndex.builds == 3
+
+
+def main():
+    """
+    Запускает проверки и возвращает код завершения
+    """
+    failed = False
+    for test in (test_reload_runs_in_background, test_broken_file_keeps_previous_index,
+                 test_tampered_snapshot_is_not_unpickled):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"❌ {test.__name__}: {str(e)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Тесты ограничения истории диалога: сжатие старых ходов в краткое содержание.
+
+Запуск: python test_conversation.py (или через pytest).
+"""
+import os
+import sys
+import logging
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('test_conversation')
+
+# Добавляем директорию проекта в пути поиска модулей
+project_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(project_dir)
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.graph.message import add_messages
+
+from Source.conversation import SUMMARY_HEADER, SUMMARY_MESSAGE_ID, make_history_hook
+
+
+def _turn(number: int) -> list:
+    """Ход с вызовом инструмента: вопрос, вызов, результат, ответ."""
+    call_id = f"call-{number}"
+    return [
+        HumanMessage(content=f"Вопрос {number}", id=f"human-{number}"),
+        AIMessage(content="", id=f"call-ai-{number}",
+                  tool_calls=[{'name': 'Glossary', 'args': {'__arg1': 'АС'}, 'id': call_id}]),
+        ToolMessage(content=f"Результат {number}", tool_call_id=call_id, id=f"tool-{number}"),
+        AIMessage(content=f"Ответ {number}", id=f"ai-{number}"),
+    ]
+
+
+def _compact(hook, messages: list) -> list:
+    """Применяет обновление хука к истории так же, как это делает граф агента."""
+    update = hook({"messages": messages})
+    return add_messages(messages, update["messages"]) if update else messages
+
+
+def test_compacted_history_starts_with_user_message():
+    """После сжатия история начинается с сообщения пользователя, а не с ответа ассистента."""
+    hook = make_history_hook(max_turns=3, keep_last_turns=2)
+    messages = [message for number in range(1, 6) for message in _turn(number)]
+    compacted = _compact(hook, messages)
+
+    summary = compacted[0]
+    assert summary.id == SUMMARY_MESSAGE_ID and isinstance(summary, HumanMessage), type(summary).__name__
+    assert summary.content.startswith(SUMMARY_HEADER)
+    assert "Вопрос 1" in summary.content and "Ответ 3" in summary.content
+    assert "Вопрос 4" not in summary.content
+    # Остались последние два хода целиком, пары вызов-результат не разорваны
+    assert [message.id for message in compacted[1:]] == [message.id for message in _turn(4) + _turn(5)]
+
+
+def test_summary_is_merged_on_next_compaction():
+    """При повторном сжатии краткое содержание дополняется, а сообщение остается одно и первым."""
+    hook = make_history_hook(max_turns=3, keep_last_turns=2)
+    messages = [message for number in range(1, 6) for message in _turn(number)]
+    messages = _compact(hook, messages)
+    for number in range(6, 8):
+        messages = _compact(hook, messages + _turn(number))
+
+    summaries = [message for message in messages if message.id == SUMMARY_MESSAGE_ID]
+    assert len(summaries) == 1 and messages[0] is summaries[0]
+    assert isinstance(messages[0], HumanMessage)
+    assert "Вопрос 1" in messages[0].content and "Вопрос 5" in messages[0].content
+    assert not any(isinstance(message, AIMessage) for message in messages[:2])
+    assert messages[1].id == "human-6"
+
+
+def test_short_history_is_not_changed():
+    """Пока ходов не больше max_turns, хук ничего не меняет."""
+    hook = make_history_hook(max_turns=3, keep_last_turns=2)
+    messages = [message for number in range(1, 4) for message in _turn(number)]
+    assert hook({"messages": messages}) == {}
+
+
+def main():
+    """
+    Запускает проверки и возвращает код завершения
+    """
+    failed = False
+    for test in (test_compacted_history_starts_with_user_message, test_summary_is_merged_on_next_compaction,
+                 test_short_history_is_not_changed):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"❌ {test.__name__}: {str(e)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Тесты поиска API эндпоинтов: нечеткий поиск находит эндпоинты при опечатках
+и не предлагает "похожие" эндпоинты для бессмысленных запросов.
+
+Запуск: python test_endpoint_search.py (или через pytest).
+"""
+import os
+import sys
+import logging
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('test_endpoint_search')
+
+# Добавляем директорию проекта в пути поиска модулей
+project_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(project_dir)
+
+from Source.endpoint_index import EndpointIndex, ENDPOINT_FUZZY_THRESHOLD
+
+ENDPOINTS = [
+    {'request': '/ufs-logger-parameters-ng/parameters', 'direction': 'OUT',
+     'host': 'sb.config.ufsul.ca.sbrf.ru', 'description': 'Запрос СУП параметров у платформы'},
+    {'request': '/ufs-session-master-direct/rest/v3/inner/getSessionsMetadata', 'direction': 'OUT',
+     'host': 'sb.session.ufsul.ca.sbrf.ru', 'description': 'Получение метаданных сессий'},
+    {'request': '/ufs-session-master/rest/v3/inner/getSessionStorage', 'direction': 'OUT',
+     'host': '', 'description': 'Получение данных сессии'},
+    {'request': '/api/operator/v2/chats_status', 'direction': 'IN',
+     'host': '', 'description': 'Запрос на получение статуса наличия активных чатов пользователя'},
+    {'request': '/api/rating/v1/state', 'direction': 'IN',
+     'host': '', 'description': 'Запрос на получение данных о состоянии оценки'},
+]
+
+
+def test_typos_find_endpoints():
+    """Опечатки и неполные пути находят нужный эндпоинт первым."""
+    index = EndpointIndex(ENDPOINTS)
+    for query, expected in (("getSesionMetadata", ENDPOINTS[1]),
+                            ("получение метаданых сессии", ENDPOINTS[1]),
+                            ("/ufs-session-master/rest/v3/inner/getSessionStorag", ENDPOINTS[2]),
+                            ("/api/operator/v1/all_chat_status", ENDPOINTS[3]),
+                            ("ufs-loger", ENDPOINTS[0])):
+        results = index.fuzzy_search(query)
+        assert results and results[0][0] is expected, f"{query!r}: {results}"
+
+
+def test_nonsense_finds_nothing():
+    """Для запросов, не связанных с каталогом, похожих эндпоинтов нет."""
+    index = EndpointIndex(ENDPOINTS)
+    for query in ("погода", "xyz123", "привет как дела", "a"):
+        results = index.fuzzy_search(query)
+        assert results == [], f"{query!r}: {[(endpoint['request'], score) for endpoint, score in results]}"
+
+
+def test_legacy_threshold_setting_is_read():
+    """Прежний ключ default_similarity_threshold используется, если новый не задан."""
+    from Source import tools
+    saved = dict(tools.settings)
+    try:
+        tools.settings.pop("endpoint_fuzzy_threshold", None)
+        tools.settings.pop("default_similarity_threshold", None)
+        assert tools._endpoint_fuzzy_threshold() == ENDPOINT_FUZZY_THRESHOLD
+
+        tools.settings["default_similarity_threshold"] = 0.8
+        assert tools._endpoint_fuzzy_threshold() == 0.8
+
+        tools.settings["endpoint_fuzzy_threshold"] = 0.9
+        assert tools._endpoint_fuzzy_threshold() == 0.9
+    finally:
+        tools.settings.clear()
+        tools.settings.update(saved)
+
+
+def main():
+    """
+    Запускает проверки и возвращает код завершения
+    """
+    failed = False
+    for test in (test_typos_find_endpoints, test_nonsense_finds_nothing, test_legacy_threshold_setting_is_read):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"❌ {test.__name__}: {str(e)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -152,7 +152,7 @@ def test_file_analyzer(test_multi_alerts=False):
     try:
         print("Ожидайте, идет анализ...")
         start_time = time.time()
-        result = analyze_file_alert.invoke(file_path)
+        result = analyze_file_alert(file_path)
         execution_time = time.time() - start_time
         print(f"\n✅ Успешно получен результат анализа (за {execution_time:.2f} сек):\n")
         print(result)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Тест времени запуска: модули разбора алертов должны импортироваться быстро
+и не тянуть LangChain, LangGraph и клиент GigaChat.
+
+Запуск: python test_import_budget.py (или через pytest).
+Бюджет в миллисекундах можно переопределить переменной окружения IMPORT_BUDGET_MS.
+"""
+import os
+import sys
+import json
+import logging
+import subprocess
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('test_import_budget')
+
+project_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Бюджет суммарного времени импорта модулей разбора алертов, мс
+IMPORT_BUDGET_MS = float(os.environ.get('IMPORT_BUDGET_MS', 100))
+
+# Модули, которые нужны скриптам, работающим только с разбором алертов
+PARSER_MODULES = ['Source.alert_parser', 'Source.alert_reader']
+
+# Модуль инструментов, который импортируют скрипты анализа алертов (test_custom_alert.py,
+# test_file_analyzer.py, бенчмарки): вместе со справочниками, кэшем и историей алертов
+TOOLS_MODULES = ['Source.tools']
+
+# Бюджет времени импорта модуля инструментов, мс
+TOOLS_IMPORT_BUDGET_MS = float(os.environ.get('TOOLS_IMPORT_BUDGET_MS', 200))
+
+# Тяжелые зависимости, которые не должны загружаться при импорте
+HEAVY_MODULES = ['langchain_gigachat', 'gigachat', 'langgraph', 'langchain_core']
+
+# Количество замеров: берем лучший, чтобы уменьшить влияние шума
+MEASURE_RUNS = 3
+
+
+def measure_import(modules):
+    """
+    Импортирует модули в отдельном интерпретаторе с -X importtime.
+
+    Returns:
+        tuple: (время импорта каждого модуля в мкс, множество загруженных модулей)
+    """
+    code = (
+        "import sys, json\n"
+        + "".join(f"import {module}\n" for module in modules)
+        + "print(json.dumps(sorted(sys.modules)))"
+    )
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=project_dir, capture_output=True, text=True, check=True,
+    )
+    # Формат строк: "import time: self [us] | cumulative | imported package"
+    timings = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        timings[name.strip()] = int(cumulative)
+    return timings, set(json.loads(completed.stdout))
+
+
+def heavy_modules_loaded(loaded_modules):
+    """Тяжелые зависимости (и их подмодули) среди загруженных модулей."""
+    return sorted(
+        name for name in loaded_modules
+        if any(name == heavy or name.startswith(heavy + '.') for heavy in HEAVY_MODULES)
+    )
+
+
+def test_parser_import_budget():
+    """Импорт модулей разбора алертов укладывается в бюджет и не загружает LangChain."""
+    best_ms = None
+    for _ in range(MEASURE_RUNS):
+        timings, loaded_modules = measure_import(PARSER_MODULES)
+        total_ms = sum(timings.get(module, 0) for module in PARSER_MODULES) / 1000
+        best_ms = total_ms if best_ms is None else min(best_ms, total_ms)
+
+    logger.info(f"Импорт {', '.join(PARSER_MODULES)}: {best_ms:.1f} мс (бюджет {IMPORT_BUDGET_MS:.0f} мс)")
+    assert not heavy_modules_loaded(loaded_modules), \
+        f"Модули разбора загружают тяжелые зависимости: {heavy_modules_loaded(loaded_modules)}"
+    assert best_ms <= IMPORT_BUDGET_MS, \
+        f"Импорт модулей разбора занял {best_ms:.1f} мс, бюджет {IMPORT_BUDGET_MS:.0f} мс"
+
+
+def test_tools_import_budget():
+    """
+    Импорт Source.tools (путь скриптов анализа алертов) укладывается в бюджет и не загружает
+    LangChain: инструменты агента создаются только при сборке агента.
+    """
+    best_ms = None
+    for _ in range(MEASURE_RUNS):
+        timings, loaded_modules = measure_import(TOOLS_MODULES)
+        total_ms = sum(timings.get(module, 0) for module in TOOLS_MODULES) / 1000
+        best_ms = total_ms if best_ms is None else min(best_ms, total_ms)
+
+    logger.info(f"Импорт {', '.join(TOOLS_MODULES)}: {best_ms:.1f} мс (бюджет {TOOLS_IMPORT_BUDGET_MS:.0f} мс)")
+    assert not heavy_modules_loaded(loaded_modules), \
+        f"Модуль инструментов загружает тяжелые зависимости: {heavy_modules_loaded(loaded_modules)}"
+    assert best_ms <= TOOLS_IMPORT_BUDGET_MS, \
+        f"Импорт модуля инструментов занял {best_ms:.1f} мс, бюджет {TOOLS_IMPORT_BUDGET_MS:.0f} мс"
+
+
+def test_agent_import_is_lazy():
+    """Импорт Source.agent не создает модель и не загружает GigaChat и LangGraph."""
+    _, loaded_modules = measure_import(['Source.agent'])
+    assert not heavy_modules_loaded(loaded_modules), \
+        f"Импорт Source.agent загружает тяжелые зависимости: {heavy_modules_loaded(loaded_modules)}"
+
+
+def main():
+    """
+    Запускает проверки и возвращает код завершения
+    """
+    failed = False
+    for test in (test_parser_import_budget, test_tools_import_budget, test_agent_import_is_lazy):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"❌ {test.__name__}: {str(e)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+"""
+Тесты приема алертов по HTTP локальным клиентом: прием (202), заполненная
+очередь (429), некорректный запрос (400), слишком большой пакет (413)
+и медленный клиент (408).
+
+Запуск: python test_ingest_server.py (или через pytest).
+"""
+import os
+import sys
+import json
+import socket
+import asyncio
+import logging
+import tempfile
+import threading
+import http.client
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('test_ingest_server')
+
+# Добавляем директорию проекта в пути поиска модулей
+project_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(project_dir)
+
+from Source.alert_parser import alert_parser
+from Source.alert_renderer import AlertAnalysis
+from Source.ingest_server import IngestServer, JsonlSink
+
+ALERT = "ПРОМ | АС Рефлекс OPEN P-250433353 | Dimension=/api/operator/v1/all_chats_status 500 POST"
+
+
+class RunningServer:
+    """Сервер в отдельном потоке со своим циклом событий; анализ ждет разрешения release."""
+
+    def __init__(self, directory: str, **options):
+        self.release = threading.Event()
+        self.sink_path = os.path.join(directory, 'results.jsonl')
+        self.server = IngestServer(self._analyze, JsonlSink(self.sink_path), port=0, **options)
+        self._started = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.start()
+        self._started.wait(5)
+
+    def _analyze(self, alert_text):
+        self.release.wait(5)
+        return AlertAnalysis(alert_parser.parse(alert_text))
+
+    def _run(self):
+        self._task = self._loop.create_task(self.server.serve(lambda server: self._started.set()))
+        try:
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        self._loop.close()
+
+    def request(self, method: str, path: str, body=None, content_type: str = 'text/plain'):
+        connection = http.client.HTTPConnection('127.0.0.1', self.server.port, timeout=5)
+        try:
+            data = body.encode('utf-8') if isinstance(body, str) else body
+            connection.request(method, path, body=data, headers={'Content-Type': content_type})
+            response = connection.getresponse()
+            return response.status, dict(response.getheaders()), json.loads(response.read() or b'null')
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.release.set()
+        self._loop.call_soon_threadsafe(self._task.cancel)
+        self._thread.join(10)
+
+    def results(self) -> list[dict]:
+        with open(self.sink_path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+
+def test_accepted_alerts_are_analyzed():
+    """202: алерты из текста и из JSON принимаются, результаты анализа попадают в JSONL."""
+    with tempfile.TemporaryDirectory() as directory:
+        running = RunningServer(directory, queue_size=10, workers=2)
+        running.release.set()
+        try:
+            status, _, body = running.request('POST', '/alerts', ALERT + "\n" + ALERT.replace("P-250433353", "P-250433354"))
+            assert status == 202 and body['accepted'] == 2, (status, body)
+            status, _, body = running.request('POST', '/alerts', json.dumps({'alerts': [ALERT]}), 'application/json')
+            assert status == 202 and body['accepted'] == 1, (status, body)
+        finally:
+            running.stop()
+        results = running.results()
+        assert len(results) == 3
+        assert {result['problem_id'] for result in results} == {"P-250433353", "P-250433354"}
+        assert running.server.stats()['processed'] == 3
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    """429 с Retry-After, пока очередь заполнена; 413, если пакет не поместится и в пустую очередь."""
+    with tempfile.TemporaryDirectory() as directory:
+        running = RunningServer(directory, queue_size=2, workers=1, retry_after=3)
+        try:
+            # Один алерт у обработчика, два в очереди
+            for _ in range(3):
+                status, _, _ = running.request('POST', '/alerts', ALERT)
+                assert status == 202
+            status, headers, body = running.request('POST', '/alerts', ALERT)
+            assert status == 429 and headers.get('Retry-After') == '3', (status, headers)
+            assert body['queue_depth'] == 2
+
+            status, headers, body = running.request('POST', '/alerts', json.dumps([ALERT] * 3), 'application/json')
+            assert status == 413 and 'Retry-After' not in headers, (status, headers)
+        finally:
+            running.stop()
+        assert running.server.stats()['rejected'] == 4
+
+
+def test_bad_requests():
+    """400 на некорректный JSON и пустой запрос, 405 и 404 на другие методы и пути."""
+    with tempfile.TemporaryDirectory() as directory:
+        running = RunningServer(directory, queue_size=2, workers=1)
+        try:
+            assert running.request('POST', '/alerts', '{bad', 'application/json')[0] == 400
+            assert running.request('POST', '/alerts', json.dumps({'alerts': [1, 2]}), 'application/json')[0] == 400
+            assert running.request('POST', '/alerts', '  ')[0] == 400
+            assert running.request('GET', '/alerts')[0] == 405
+            assert running.request('GET', '/unknown')[0] == 404
+            status, _, body = running.request('GET', '/health')
+            assert status == 200 and body['accepted'] == 0
+        finally:
+            running.stop()
+
+
+def test_slow_client_is_disconnected():
+    """408: клиент, не передавший заголовки и тело за read_timeout, отключается."""
+    with tempfile.TemporaryDirectory() as directory:
+        running = RunningServer(directory, read_timeout=0.2)
+        try:
+            with socket.create_connection(('127.0.0.1', running.server.port), timeout=5) as client:
+                client.sendall(b"POST /alerts HTTP/1.1\r\nContent-Length: 100\r\n\r\npartial")
+                response = client.recv(4096)
+                assert response.startswith(b"HTTP/1.1 408"), response[:40]
+                assert client.recv(4096) == b"", "соединение не закрыто"
+        finally:
+            running.stop()
+
+
+def main():
+    """
+    Запускает проверки и возвращает код завершения
+    """
+    failed = False
+    for test in (test_accepted_alerts_are_analyzed, test_full_queue_is_rejected_with_retry_after,
+                 test_bad_requests, test_slow_client_is_disconnected):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"❌ {test.__name__}: {str(e)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+"""
+Тесты повторов и автоматического выключателя вызовов GigaChat на локальном
+сервере-заглушке API: недоступность (503), восстановление, ошибки запроса
+и прерывание пробного вызова.
+
+Запуск: python test_llm_client.py (или через pytest).
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('test_llm_client')
+
+# Добавляем директорию проекта в пути поиска модулей
+project_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(project_dir)
+
+from Source.llm_client import (
+    CircuitBreaker, CircuitOpenError, LLMClient, model_options, call_timeout, CLOSED, OPEN, HALF_OPEN,
+)
+
+# Ответ заглушки в формате API GigaChat
+STUB_ANSWER = "ответ заглушки"
+
+
+class StubAPI:
+    """Локальный сервер, отвечающий на запросы к модели заданным HTTP-кодом."""
+
+    def __init__(self):
+        self.status = 200
+        self.hits = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('content-length', 0)))
+                stub.hits += 1
+                if stub.status == 200:
+                    body = json.dumps({
+                        "choices": [{"message": {"role": "assistant", "content": STUB_ANSWER},
+                                     "index": 0, "finish_reason": "stop"}],
+                        "created": 1, "model": "GigaChat-2", "object": "chat.completion",
+                        "usage": {"prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8},
+                    }).encode('utf-8')
+                else:
+                    body = b'{"message": "stub error"}'
+                self.send_response(stub.status)
+                self.send_header('content-type', 'application/json')
+                self.send_header('content-length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeClock:
+    """Управляемые часы для выключателя."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _model(stub):
+    from langchain_gigachat.chat_models import GigaChat
+    return GigaChat(**model_options({'base_url': stub.url, 'access_token': 'stub', 'timeout': 2}))
+
+
+def _call_error(client, func, *args):
+    """Исключение вызова через client (None, если вызов прошел успешно)."""
+    try:
+        client.call(func, *args)
+    except Exception as e:
+        return e
+    return None
+
+
+def _client(clock=time.monotonic, failure_threshold=2, reset_timeout=30.0):
+    return LLMClient(max_retries=1, backoff_base=0.001, backoff_max=0.005,
+                     breaker=CircuitBreaker(failure_threshold, reset_timeout, clock=clock))
+
+
+def test_unavailable_api_opens_breaker_and_recovers():
+    """503 повторяется, после failure_threshold ошибок вызовы отклоняются без сети, затем API восстанавливается."""
+    stub = StubAPI()
+    clock = FakeClock()
+    client = _client(clock)
+    model = _model(stub)
+    try:
+        stub.status = 503
+        for _ in range(2):
+            error = _call_error(client, model.invoke, "вопрос")
+            assert error is not None and not isinstance(error, CircuitOpenError), f"ожидалась ошибка 503: {error!r}"
+        # Каждый вызов - первая попытка и один повтор
+        assert stub.hits == 4, f"запросов к API: {stub.hits}"
+        assert client.breaker.state == OPEN and not client.available()
+
+        assert isinstance(_call_error(client, model.invoke, "вопрос"), CircuitOpenError)
+        assert stub.hits == 4, "при разомкнутом выключателе запрос ушел в сеть"
+
+        stub.status = 200
+        clock.now += 30.0
+        assert client.breaker.state == HALF_OPEN
+        assert client.call(model.invoke, "вопрос").content == STUB_ANSWER
+        assert client.breaker.state == CLOSED
+    finally:
+        stub.close()
+
+
+def test_request_errors_do_not_open_breaker():
+    """Ошибки запроса (400) не повторяются и не размыкают выключатель."""
+    stub = StubAPI()
+    client = _client()
+    model = _model(stub)
+    try:
+        stub.status = 400
+        for _ in range(3):
+            error = _call_error(client, model.invoke, "вопрос")
+            assert error is not None and not isinstance(error, CircuitOpenError), f"ожидалась ошибка 400: {error!r}"
+        assert stub.hits == 3, f"запросов к API: {stub.hits}"
+        assert client.breaker.state == CLOSED
+    finally:
+        stub.close()
+
+
+def test_interrupted_probe_is_released():
+    """Прерванный пробный вызов (Ctrl+C, отмена задачи) не оставляет выключатель полуоткрытым навсегда."""
+    clock = FakeClock()
+    client = _client(clock, failure_threshold=1, reset_timeout=10.0)
+    client.breaker.record_failure()
+    clock.now += 10.0
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    try:
+        client.call(interrupted)
+    except KeyboardInterrupt:
+        pass
+    assert client.call(lambda: "ok") == "ok"
+
+    client.breaker.record_failure()
+    clock.now += 10.0
+
+    async def cancelled():
+        raise asyncio.CancelledError
+
+    try:
+        asyncio.run(client.acall(cancelled))
+    except asyncio.CancelledError:
+        pass
+    with client.guard():
+        pass
+    assert client.breaker.state == CLOSED
+
+    client.breaker.record_failure()
+    clock.now += 10.0
+    try:
+        with client.guard():
+            raise KeyboardInterrupt
+    except KeyboardInterrupt:
+        pass
+    assert client.call(lambda: "ok") == "ok"
+
+
+def test_nested_calls_share_guard_probe():
+    """Вызовы модели из инструментов внутри хода агента (guard) не отклоняются, пока ход держит пробный вызов."""
+    from langchain_core.tools import Tool
+    from langgraph.prebuilt import create_react_agent
+    from Source.llm_backends import FakeChatModel
+
+    clock = FakeClock()
+    client = _client(clock, failure_threshold=1, reset_timeout=10.0)
+
+    def reopen():
+        client.breaker.record_failure()
+        clock.now += 10.0
+        assert client.breaker.state == HALF_OPEN
+
+    # Вложенные вызовы в том же потоке и в цикле событий
+    reopen()
+    with client.guard():
+        assert client.call(lambda: "ok") == "ok"
+
+        async def answer():
+            return "ok"
+
+        assert asyncio.run(client.acall(answer)) == "ok"
+    assert client.breaker.state == CLOSED
+
+    # Инструмент агента выполняется в пуле потоков LangChain
+    reopen()
+    results = []
+    tool = Tool(name="Bot", func=lambda text: results.append(_call_error(client, lambda: "ok")) or "готово",
+                description="Вызов модели из инструмента")
+    agent = create_react_agent(model=FakeChatModel(), tools=[tool])
+    with client.guard():
+        agent.invoke({'messages': [("user", "Bot: вопрос")]})
+    assert results == [None], f"вложенный вызов отклонен: {results}"
+    assert client.breaker.state == CLOSED
+
+    # Поток вне хода агента пробный вызов не получает
+    reopen()
+    errors = []
+    with client.guard():
+        thread = threading.Thread(target=lambda: errors.append(_call_error(client, lambda: "ok")))
+        thread.start()
+        thread.join()
+    assert isinstance(errors[0], CircuitOpenError), errors
+
+
+def test_run_coroutine_sync_timeout_and_loop_thread():
+    """Ожидание корутины ограничено таймаутом, а вызов из потока фонового цикла сразу выбрасывает ошибку."""
+    from Source.utils import run_coroutine_sync, get_background_loop, LLM_CALL_TIMEOUT
+
+    assert call_timeout({"timeout": 10, "max_retries": 2, "backoff_max": 4}) == 38
+    assert LLM_CALL_TIMEOUT > 0
+
+    cancelled = threading.Event()
+
+    async def hang():
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    started = time.monotonic()
+    try:
+        run_coroutine_sync(hang(), timeout=0.2)
+        assert False, "ожидалась ошибка TimeoutError"
+    except TimeoutError:
+        pass
+    assert time.monotonic() - started < 5
+    assert cancelled.wait(5), "корутина не отменена после таймаута"
+
+    async def answer():
+        return "ok"
+
+    def from_loop_thread(result):
+        try:
+            result.set_result(run_coroutine_sync(answer()))
+        except Exception as e:
+            result.set_result(e)
+
+    outcome = Future()
+    get_background_loop().call_soon_threadsafe(from_loop_thread, outcome)
+    assert isinstance(outcome.result(5), RuntimeError), outcome.result()
+    assert run_coroutine_sync(answer()) == "ok"
+
+
+def main():
+    """
+    Запускает проверки и возвращает код завершения
+    """
+    failed = False
+    for test in (test_unavailable_api_opens_breaker_and_recovers, test_request_errors_do_not_open_breaker,
+                 test_interrupted_probe_is_released, test_nested_calls_share_guard_probe,
+                 test_run_coroutine_sync_timeout_and_loop_thread):
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed = True
+            print(f"❌ {test.__name__}: {str(e)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())